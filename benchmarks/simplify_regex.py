@@ -0,0 +1,154 @@
+"""
+Сравнение упрощения регулярных выражений: однопроходного по дереву (simplify_regex)
+и прежних замен до неподвижной точки (_simplify_regex_rewrite, перенесено сюда из src).
+
+Запуск из корня репозитория: python benchmarks/simplify_regex.py [--sizes 100 1000 10000 100000]
+Для каждого размера строится случайное выражение с избыточностью (лишние скобки, ε, ∅,
+повторы альтернатив) и печатаются длины результатов, время и совпадение языка на коротких словах.
+"""
+import argparse
+import itertools
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from automata_operations import simplify_regex
+
+ALPHABET = "ab"
+
+
+def _simplify_regex_rewrite(regex: str) -> str:
+    """
+    Прежнее упрощение заменами по регулярным выражениям до неподвижной точки — база для сравнения.
+    Не сохраняет язык в некоторых случаях (например, (ab*)* -> ab*), поэтому в src его нет.
+    """
+    if regex in (None, "∅", "ε"):
+        return regex
+
+    # Защита от зацикливания – применяем правила, пока выражение меняется
+    prev = None
+    while prev != regex:
+        prev = regex
+
+        # 1. (a) -> a
+        regex = re.sub(r'\(([a-zA-Z0-9ε])\)', r'\1', regex)
+
+        # 2. ε* -> ε
+        regex = re.sub(r'ε\*', 'ε', regex)
+
+        # 3. (expr)* где expr уже содержит * -> убираем внешнюю звезду (например (a*)* -> a*)
+        def unwrap_star(match):
+            inner = match.group(1)
+            return inner if inner.endswith('*') else match.group(0)
+        regex = re.sub(r'\(([^()]+)\)\*', unwrap_star, regex)
+
+        # 4. ∅|a -> a, a|∅ -> a
+        regex = re.sub(r'∅\|([^()|]+)', r'\1', regex)
+        regex = re.sub(r'([^()|]+)\|∅', r'\1', regex)
+
+        # 5. aε -> a, εa -> a
+        regex = re.sub(r'([^()|ε])ε|ε([^()|ε])', r'\1\2', regex)
+
+        # 6. ((a)) -> (a) -> a 
+        while re.search(r'\(\([^()]+\)\)', regex):
+            regex = re.sub(r'\(\(([^()]+)\)\)', r'(\1)', regex)
+
+        # 7. (ε|X*) -> X*  и  ε|X* -> X*
+        pattern2 = r'(?:\(ε\|([^()|]+)\*\)|ε\|([^()|]+)\*)'
+        def replace2(match):
+            group = match.group(1) or match.group(2)
+            return f"{group}*"
+        regex = re.sub(pattern2, replace2, regex)
+
+        # 8. (ε|X(X*)) -> X* 
+        pattern1 = r'(?:\(ε\|([^()|*]+)\(\1\*\)\)|ε\|([^()|*]+)\(\2\*\))'
+        def replace1(match):
+            group = match.group(1) or match.group(2)
+            return f"{group}*"
+        regex = re.sub(pattern1, replace1, regex)
+
+        # 9. X|X -> X 
+        def dedup_alt(match):
+            a = match.group(1)
+            b = match.group(2)
+            return a if a == b else match.group(0)
+        regex = re.sub(r'\(([^()|]+)\|([^()|]+)\)', dedup_alt, regex)
+
+        # 10. (X)Y -> XY, X(Y) -> XY
+        regex = re.sub(r'\(([^()|*]+)\)([^()|*])', r'\1\2', regex)  # (X)Y
+        regex = re.sub(r'([^()|*])\(([^()|*]+)\)', r'\1\2', regex)  # X(Y)
+
+        # 11. X** -> X* 
+        regex = re.sub(r'([^()|*]+)\*\*', r'\1*', regex)
+    return regex
+
+
+def noisy_regex(size: int, rng: random.Random) -> str:
+    """Случайное выражение примерно из size символов с типичной для исключения состояний избыточностью."""
+    if size <= 1:
+        return rng.choice(ALPHABET + "ε")
+    left_size = rng.randint(1, size - 1)
+    left, right = noisy_regex(left_size, rng), noisy_regex(size - left_size, rng)
+    match rng.randrange(7):
+        case 0:
+            return f"({left}|{right})"
+        case 1:
+            return f"({left}|{left})"
+        case 2:
+            return f"{left}({right})"
+        case 3:
+            return f"({left})*"
+        case 4:
+            return f"(ε|{left}({left})*)"
+        case 5:
+            return f"(∅|{left}){right}ε"
+        case _:
+            return f"(({left}){right})"
+
+
+def _matcher(regex: str):
+    if regex == "∅":
+        return lambda word: False
+    pattern = re.compile(regex.replace("ε", "(?:)").replace("∅", "[^\\s\\S]"))
+    return lambda word: pattern.fullmatch(word) is not None
+
+
+def same_language(first: str, second: str, max_length: int = 5) -> bool:
+    first, second = _matcher(first), _matcher(second)
+    return all(
+        first(word) == second(word)
+        for length in range(max_length + 1)
+        for word in map(''.join, itertools.product(ALPHABET, repeat=length))
+    )
+
+
+def measure(simplify, regex: str):
+    start = time.perf_counter()
+    result = simplify(regex)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'размер':>8} {'вход':>8} | {'дерево':>8} {'время, с':>9} {'язык':>5} | {'замены':>8} {'время, с':>9} {'язык':>5}")
+    for size in args.sizes:
+        regex = noisy_regex(size, rng)
+        row = [f"{size:>8} {len(regex):>8}"]
+        for simplify in (simplify_regex, _simplify_regex_rewrite):
+            result, seconds = measure(simplify, regex)
+            check = same_language(regex, result) if len(regex) <= 2000 else None
+            row.append(f"{len(result):>8} {seconds:>9.4f} {'-' if check is None else 'да' if check else 'НЕТ':>5}")
+        print(" | ".join(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Сравнение эвристик порядка исключения состояний (ELIMINATION_HEURISTICS)
+на сгенерированном корпусе случайных НКА.
+
+Запуск из корня репозитория: python benchmarks/state_elimination.py [--sizes 10 20 40] [--count 20]
+Для каждого числа состояний печатаются медианный и средний размер выражения
+(символы и операторы, см. regex_ast) и суммарное время конвертации.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from automata.fa.nfa import NFA
+from automata_operations import ELIMINATION_HEURISTICS, _eliminate_states
+
+ALPHABET = "ab"
+
+
+def random_nfa(state_count: int, out_degree: float, rng: random.Random) -> NFA:
+    """Связный НКА: цепочка через все состояния плюс в среднем out_degree случайных переходов из каждого."""
+    states = [f"q{i}" for i in range(state_count)]
+    transitions = {state: {} for state in states}
+    for ind, state in enumerate(states):
+        targets = [states[(ind + 1) % state_count]]
+        targets += rng.sample(states, min(state_count, max(0, round(rng.gauss(out_degree - 1, 1)))))
+        for target in targets:
+            symbol = "" if rng.random() < 0.05 else rng.choice(ALPHABET)
+            transitions[state].setdefault(symbol, set()).add(target)
+    final_states = set(rng.sample(states, max(1, state_count // 5)))
+    return NFA(states=set(states), input_symbols=set(ALPHABET), transitions=transitions,
+               initial_state=states[0], final_states=final_states)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 20, 40, 80])
+    parser.add_argument("--count", type=int, default=20, help="автоматов каждого размера")
+    parser.add_argument("--degree", type=float, default=2.0, help="средняя исходящая степень")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'состояний':>9} {'эвристика':>15} {'медиана':>12} {'среднее':>12} {'время, с':>9}")
+    for size in args.sizes:
+        rng = random.Random(args.seed + size)
+        corpus = [random_nfa(size, args.degree, rng) for _ in range(args.count)]
+        for heuristic in ELIMINATION_HEURISTICS:
+            sizes = []
+            start = time.perf_counter()
+            for nfa in corpus:
+                sizes.append(_eliminate_states(nfa, heuristic).size)
+            seconds = time.perf_counter() - start
+            print(f"{size:>9} {heuristic:>15} {statistics.median(sizes):>12.3g} "
+                  f"{statistics.mean(sizes):>12.3g} {seconds:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from flet import Colors, Text, TextField, canvas, ElevatedButton, Container, Slider
+from flet import Colors, Text, TextField, canvas, ElevatedButton, Container, Slider, Checkbox
 from dataclasses import dataclass, field
 from typing import Set
 
@@ -19,11 +19,21 @@ class ApplicationState:
     min_canvas_scale: float = 0.5
     max_canvas_scale: float = 2.0
     canvas_scale_step: float = 0.1
+    view_offset_x: float = 0.0
+    view_offset_y: float = 0.0
+    pan_origin: tuple = None
+    drag_origin: tuple = None
+    last_drag_render: float = 0.0
+    layout_generation: int = 0
 
     debug_mode: bool = False 
     current_states: Set[str] = field(default_factory=set) 
     input_string: str = ""
     input_position: int = 0 
+    debug_trace: object = None
+    auto_playing: bool = False
+    autoplay_interval: float = 1.0
+    autoplay_stop: object = None
     
 
 
@@ -41,10 +51,15 @@ class ApplicationUI:
     
     open_file_picker = None
     save_file_picker = None
+    batch_file_picker = None
+    batch_save_results = Checkbox(label="Сохранять результат по строкам", value=False)
 
     debug_step_back_btn = ElevatedButton("Назад")
     debug_step_forward_btn = ElevatedButton("Вперед")
     debug_continue_btn = ElevatedButton("Продолжить")
+    debug_position_slider = Slider(min=0, max=1, value=0, divisions=1)
+    debug_position_field = TextField(value="0", width=70)
+    debug_speed_slider = Slider(min=1, max=20, value=1, divisions=19)
     debug_status_text = Text("")
     debug_panel = Container(visible=False)
 
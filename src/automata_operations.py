@@ -1,180 +1,152 @@
 from __future__ import annotations
 
 from automata.fa.nfa import NFA
-from automata_visualizer import automaton_to_graph
+from automata_visualizer import automaton_to_graph, start_background_layout
 from application_state import EPSILON_SYMBOL
-import re
+from graph_history import ReplaceGraph
+from regex_ast import EMPTY, EMPTY_SET_SYMBOL, EPSILON, Regex, concat, parse, star, symbol, to_string, union
+import heapq
 
-EMPTY_SET_SYMBOL = "∅"
 
-def _is_wrapped(regex: str) -> bool:
-    if not regex.startswith("(") or not regex.endswith(")"):
-        return False
-
-    depth = 0
-    for ind, char in enumerate(regex):
-        if char == "(":
-            depth += 1
-        elif char == ")":
-            depth -= 1
-
-        if depth == 0 and ind != len(regex) - 1:
-            return False
-
-    return depth == 0
+# Порядок исключения состояний: чем меньше вес, тем раньше исключается (см. _ELIMINATION_WEIGHTS)
+ELIMINATION_HEURISTICS = ("min_weight", "delgado_morais", "min_fill")
 
 
-def _wrap_if_needed(regex: str) -> str:
-    if len(regex) <= 1:
-        return regex
-
-    if _is_wrapped(regex):
-        return regex
+def _min_weight(state, in_edges, out_edges, loops) -> int:
+    """Кол-во входящих * кол-во исходящих переходов — столько путей появится после исключения."""
+    return len(in_edges[state]) * len(out_edges[state])
 
-    return f"({regex})"
 
+def _delgado_morais_weight(state, in_edges, out_edges, loops) -> int:
+    """
+    Вес Дельгадо — Мораиша: насколько вырастет суммарный размер выражений,
+    если исключить состояние (каждое входящее повторится по разу на исходящее и наоборот).
+    """
+    incoming, outgoing = in_edges[state], out_edges[state]
+    loop_size = loops[state].size if state in loops else 0
+    return (
+        sum(regex.size for regex in incoming.values()) * (len(outgoing) - 1)
+        + sum(regex.size for regex in outgoing.values()) * (len(incoming) - 1)
+        + loop_size * (len(incoming) * len(outgoing) - 1)
+    )
 
-def _union_regex(left: str | None, right: str | None) -> str | None:
-    if left is None:
-        return right
-    if right is None:
-        return left
-    if left == right:
-        return left
-    return f"{left}|{right}"
 
+def _min_fill_weight(state, in_edges, out_edges, loops) -> int:
+    """Сколько новых переходов (которых еще нет между соседями) появится после исключения."""
+    return sum(
+        1
+        for start in in_edges[state]
+        for end in out_edges[state]
+        if start != end and end not in out_edges[start]
+    )
 
-def _concat_regex(*parts: str | None) -> str | None:
-    filtered_parts = [part for part in parts if part not in (None, EPSILON_SYMBOL)]
 
-    if any(part is None for part in parts):
-        return None
-    if not filtered_parts:
-        return EPSILON_SYMBOL
+_ELIMINATION_WEIGHTS = {
+    "min_weight": _min_weight,
+    "delgado_morais": _delgado_morais_weight,
+    "min_fill": _min_fill_weight,
+}
 
-    return ''.join(_wrap_if_needed(part) for part in filtered_parts)
 
+def nfa_to_regex_state_elimination(nfa: NFA, heuristic: str = "delgado_morais") -> str:
+    """
+    Конвертация исключением состояний. Порядок исключения задается эвристикой
+    из ELIMINATION_HEURISTICS; вес пересчитывается после каждого исключения.
+    """
+    # Конструкторы regex_ast уже упрощают выражение; строка собирается один раз в конце
+    return to_string(_eliminate_states(nfa, heuristic))
 
-def _star_regex(regex: str | None) -> str:
-    if regex is None or regex == EPSILON_SYMBOL:
-        return EPSILON_SYMBOL
-    if len(regex) == 1:
-        return f"{regex}*"
-    if regex.endswith("*") and _is_wrapped(regex[:-1]):
-        return regex
-    return f"{_wrap_if_needed(regex)}*"
 
+def _eliminate_states(nfa: NFA, heuristic: str = "delgado_morais") -> Regex:
+    """Исключение состояний над разреженными картами входящих и исходящих переходов."""
+    if heuristic not in _ELIMINATION_WEIGHTS:
+        raise ValueError(f"Неизвестная эвристика исключения состояний: {heuristic}")
+    state_weight = _ELIMINATION_WEIGHTS[heuristic]
 
-def nfa_to_regex_state_elimination(nfa: NFA) -> str:
-    """Конвертация с учетом весов состояний (кол-во входящих * кол-во исходящих переходов) для оптимизации порядка исключения."""
     new_start, new_final = "__S__", "__F__"
-    states = sorted(nfa.states, key=str)
-    all_states = [new_start, *states, new_final]
-    
-    trans = {(s, e): None for s in all_states for e in all_states}
-    
+    # out_edges[s][e] и in_edges[e][s] — одно и то же выражение (узел regex_ast); петли хранятся отдельно
+    out_edges = {state: {} for state in (new_start, *nfa.states, new_final)}
+    in_edges = {state: {} for state in out_edges}
+    loops = {}
+
+    def add(start, end, regex):
+        if start == end:
+            loops[start] = union(loops.get(start, EMPTY), regex)
+        else:
+            out_edges[start][end] = in_edges[end][start] = union(out_edges[start].get(end, EMPTY), regex)
+
     for s, s_trans in nfa.transitions.items():
         for symb, targets in s_trans.items():
-            char = EPSILON_SYMBOL if symb == '' else symb
+            char = EPSILON if symb == '' else symbol(symb)
             for t in targets:
-                trans[(s, t)] = _union_regex(trans[(s, t)], char)
+                add(s, t, char)
 
-    trans[(new_start, nfa.initial_state)] = EPSILON_SYMBOL
+    add(new_start, nfa.initial_state, EPSILON)
     for f in nfa.final_states:
-        trans[(f, new_final)] = _union_regex(trans[(f, new_final)], EPSILON_SYMBOL)
+        add(f, new_final, EPSILON)
 
-    # Удаление по весам (In * Out)
-    def get_weight(state):
-        in_d = sum(1 for s in all_states if trans[(s, state)] and s != state)
-        out_d = sum(1 for e in all_states if trans[(state, e)] and e != state)
-        return in_d * out_d
+    def weight(state):
+        return state_weight(state, in_edges, out_edges, loops)
 
-    elimination_order = sorted(states, key=get_weight)
+    # Куча с ленивым обновлением: после исключения соседи добавляются заново с новым весом,
+    # а запись с устаревшим весом при извлечении возвращается в кучу с текущим
+    order = {state: ind for ind, state in enumerate(sorted(nfa.states, key=str))}
+    heap = [(weight(state), order[state], state) for state in order]
+    heapq.heapify(heap)
 
-    for q_elim in elimination_order:
-        remaining = [s for s in all_states if s != q_elim]
-        loop = trans[(q_elim, q_elim)]
-        
-        for s in remaining:
-            if not trans[(s, q_elim)]: continue
-            for e in remaining:
-                if not trans[(q_elim, e)]: continue
-                
-                path = _concat_regex(trans[(s, q_elim)], _star_regex(loop), trans[(q_elim, e)])
-                trans[(s, e)] = _union_regex(trans[(s, e)], path)
-        
-        for s in all_states:
-            trans[(s, q_elim)] = trans[(q_elim, s)] = None
+    while heap:
+        w, _, q_elim = heapq.heappop(heap)
+        if q_elim not in in_edges:
+            continue
+        current = weight(q_elim)
+        if w != current:
+            heapq.heappush(heap, (current, order[q_elim], q_elim))
+            continue
+
+        loop = star(loops.pop(q_elim, EMPTY))
+        sources = in_edges.pop(q_elim)
+        targets = out_edges.pop(q_elim)
+        for s in sources:
+            del out_edges[s][q_elim]
+        for e in targets:
+            del in_edges[e][q_elim]
+
+        for s, incoming in sources.items():
+            for e, outgoing in targets.items():
+                add(s, e, concat(incoming, loop, outgoing))
+
+        for neighbour in sources.keys() | targets.keys():
+            if neighbour in order:
+                heapq.heappush(heap, (weight(neighbour), order[neighbour], neighbour))
+
+    return out_edges[new_start].get(new_final, EMPTY)
 
-    return simplify_regex(trans[(new_start, new_final)] or "∅")
 
 def simplify_regex(regex: str) -> str:
-    if regex in (None, "∅", "ε"):
+    """
+    Упрощение за один проход: строка разбирается в дерево regex_ast, и тождества
+    (поглощение ε, исключение ∅, идемпотентность звезды, повторы альтернатив)
+    применяются конструкторами снизу вверх. Из исходной и упрощенной строки возвращается более короткая.
+    """
+    if regex in (None, EMPTY_SET_SYMBOL, EPSILON_SYMBOL):
         return regex
 
-    # Защита от зацикливания – применяем правила, пока выражение меняется
-    prev = None
-    while prev != regex:
-        prev = regex
-
-        # 1. (a) -> a
-        regex = re.sub(r'\(([a-zA-Z0-9ε])\)', r'\1', regex)
-
-        # 2. ε* -> ε
-        regex = re.sub(r'ε\*', 'ε', regex)
-
-        # 3. (expr)* где expr уже содержит * -> убираем внешнюю звезду (например (a*)* -> a*)
-        def unwrap_star(match):
-            inner = match.group(1)
-            return inner if inner.endswith('*') else match.group(0)
-        regex = re.sub(r'\(([^()]+)\)\*', unwrap_star, regex)
-
-        # 4. ∅|a -> a, a|∅ -> a
-        regex = re.sub(r'∅\|([^()|]+)', r'\1', regex)
-        regex = re.sub(r'([^()|]+)\|∅', r'\1', regex)
-
-        # 5. aε -> a, εa -> a
-        regex = re.sub(r'([^()|ε])ε|ε([^()|ε])', r'\1\2', regex)
-
-        # 6. ((a)) -> (a) -> a 
-        while re.search(r'\(\([^()]+\)\)', regex):
-            regex = re.sub(r'\(\(([^()]+)\)\)', r'(\1)', regex)
-
-        # 7. (ε|X*) -> X*  и  ε|X* -> X*
-        pattern2 = r'(?:\(ε\|([^()|]+)\*\)|ε\|([^()|]+)\*)'
-        def replace2(match):
-            group = match.group(1) or match.group(2)
-            return f"{group}*"
-        regex = re.sub(pattern2, replace2, regex)
-
-        # 8. (ε|X(X*)) -> X* 
-        pattern1 = r'(?:\(ε\|([^()|*]+)\(\1\*\)\)|ε\|([^()|*]+)\(\2\*\))'
-        def replace1(match):
-            group = match.group(1) or match.group(2)
-            return f"{group}*"
-        regex = re.sub(pattern1, replace1, regex)
-
-        # 9. X|X -> X 
-        def dedup_alt(match):
-            a = match.group(1)
-            b = match.group(2)
-            return a if a == b else match.group(0)
-        regex = re.sub(r'\(([^()|]+)\|([^()|]+)\)', dedup_alt, regex)
-
-        # 10. (X)Y -> XY, X(Y) -> XY
-        regex = re.sub(r'\(([^()|*]+)\)([^()|*])', r'\1\2', regex)  # (X)Y
-        regex = re.sub(r'([^()|*])\(([^()|*]+)\)', r'\1\2', regex)  # X(Y)
-
-        # 11. X** -> X* 
-        regex = re.sub(r'([^()|*]+)\*\*', r'\1*', regex)
-    return regex
+    simplified = to_string(parse(regex))
+    return simplified if len(simplified) < len(regex) else regex
+
 
 def build_nfa_from_ui(app: Application) -> NFA:
     """
     Создает объект NFA.
     Исправлено: теперь корректно обрабатывает переходы, даже если объекты узлов
     в transition не совпадают по ссылке с объектами в app.graph.nodes.
+    NFA кэшируется в графе до следующего Graph.touch().
     """
+    key = ("nfa", frozenset(app.attr.alphabet))
+    return app.graph.cached(key, lambda: _build_nfa(app))
+
+
+def _build_nfa(app: Application) -> NFA:
     if app.graph.nodes == set() or app.graph.get_start_states() == set():
         return None
 
@@ -255,8 +227,10 @@ def import_automaton_data(automaton: NFA, app: Application) -> bool:
         )
 
     try:
-        app.history.add(app.graph)
-        app.graph = automaton_to_graph(automaton, app)
+        # Граф показывается сразу с грубой раскладкой, точная достраивается в фоне
+        edit = ReplaceGraph(app.graph, automaton_to_graph(automaton, app, background=True))
+        app.history.apply(edit, app)
+        start_background_layout(automaton, app)
         app.attr.alphabet = set(automaton.input_symbols)
         app.attr.placing_mode = False
         app.attr.transition_mode = False
@@ -271,7 +245,6 @@ def import_automaton_data(automaton: NFA, app: Application) -> bool:
 
         return True
     except Exception as ex:
-        app.history.remove()
         app.ui.status_text.value = f"Ошибка при импорте автомата: {ex}"
         print(ex)
         return False
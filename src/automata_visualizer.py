@@ -1,64 +1,74 @@
 from __future__ import annotations
 
-import math
-import igraph as ig
+import time
 from graph import Node, Transition, Graph, NodeType
 from automata.fa.nfa import NFA
-from linal import Vector2D
+from layout import (
+    bfs_layers_layout, cached_layout, choose_algorithm, compute_layout, fit_to_frame, refine_layout,
+)
 
 
-def automaton_to_graph(automaton: NFA, app: Application) -> Graph:
+def _is_deterministic(automaton: NFA) -> bool:
+    """Не больше одного перехода по каждому символу и нет эпсилон-переходов (кроме фантомного узла)."""
+    return all(
+        symbol != '' and len(targets) <= 1
+        for state, state_map in automaton.transitions.items()
+        if state != ""
+        for symbol, targets in state_map.items()
+    )
+
+
+def _layout_input(automaton: NFA):
+    """Состояния (без фантомного) в устойчивом порядке, ребра по их индексам и индексы стартовых."""
+    names = sorted((state for state in automaton.states if state != ""), key=str)
+    index = {name: ind for ind, name in enumerate(names)}
+    edges = [
+        (index[start], index[end])
+        for start in names
+        for end in sorted(set().union(*automaton.transitions[start].values()), key=str)
+    ]
+    roots = sorted(index[name] for name in set().union(*automaton.transitions[""].values()))
+    return names, edges, roots
+
+
+def _layout_frame(app: Application):
+    padding_coef = 3
+    padding = padding_coef * app.config.node_radius
+    # Раскладка строится в координатах модели: при масштабе 1 и нулевом сдвиге это весь канвас
+    return (
+        padding, padding,
+        app.attr.base_canvas_width - 2 * padding,
+        app.attr.base_canvas_height - 2 * padding,
+    )
+
+
+def automaton_to_graph(automaton: NFA, app: Application, background: bool = False) -> Graph:
     """
     IMPORTANT: automaton must have a fantom "" named node, that
     points to all the start nodes via epsilon transitions
+
+    С background=True итоговая раскладка не считается: если ее нет в кэше,
+    узлы ставятся по слоям обхода в ширину, а уточняет их start_background_layout.
     """
     graph = Graph()
 
     start_nodes = {node for node in set().union(*automaton.transitions[""].values())}
 
-    nodes = list(automaton.states)
-    nodes.remove("")
-    node_to_ind = {node: ind for ind, node in enumerate(nodes)}
-    transitions = [
-        (node_to_ind[start], node_to_ind[end])
-        for start in nodes
-        for end in set().union(*automaton.transitions[start].values())
-    ]
-
-    igraph = ig.Graph(directed=True)
-    igraph.add_vertices(nodes)
-    igraph.add_edges(transitions)
-    try:
-        coords = igraph.layout_fruchterman_reingold().coords
-    except Exception:
-        coords = [
-            Vector2D.from_phi_r(i / len(nodes) * 2 * math.pi, 1).to_tuple()
-            for i in range(len(nodes))
-        ]
-
-    padding_coef = 3
-    frame_bottom_x = padding_coef * app.config.node_radius
-    frame_bottom_y = padding_coef * app.config.node_radius
-    frame_width = app.attr.canvas_width - padding_coef * 2 * app.config.node_radius
-    frame_height = app.attr.canvas_height - padding_coef * 2 * app.config.node_radius
-
-    picture_bottom_x = min(x for x, _ in coords)
-    picture_bottom_y = min(y for _, y in coords)
-    picture_width = max(x for x, _ in coords) - picture_bottom_x
-    picture_height = max(y for _, y in coords) - picture_bottom_y
-
-    if picture_width == 0:
-        picture_width = 1
-    if picture_height == 0:
-        picture_height = 1
-
-    coords = [
-        (
-            (x - picture_bottom_x) / picture_width * frame_width + frame_bottom_x if picture_width else frame_width / 2 + app.config.node_radius,
-            (y - picture_bottom_y) / picture_height * frame_height + frame_bottom_y if picture_height else frame_height / 2 + app.config.node_radius,
+    nodes, transitions, roots = _layout_input(automaton)
+    algorithm = app.config.layout_algorithm
+    deterministic = _is_deterministic(automaton)
+    if background:
+        coords = cached_layout(len(nodes), transitions, algorithm, deterministic)
+        if coords is None:
+            coords = bfs_layers_layout(len(nodes), transitions, roots)
+    else:
+        coords = compute_layout(
+            len(nodes), transitions,
+            algorithm=algorithm,
+            deterministic=deterministic,
+            time_budget=app.config.layout_time_budget,
         )
-        for x, y in coords
-    ]
+    coords = fit_to_frame(coords, *_layout_frame(app)).tolist()
 
     nodes = [
         Node(
@@ -89,7 +99,74 @@ def automaton_to_graph(automaton: NFA, app: Application) -> Graph:
         for start_ind, end_ind in transitions
     ]
 
-    graph.nodes = set(nodes)
-    graph.transitions = set(transitions)
+    graph.replace_nodes(nodes)
+    graph.replace_transitions(transitions)
     graph.node_counter = len(nodes)
     return graph
+
+
+def start_background_layout(automaton: NFA, app: Application) -> None:
+    """
+    Достраивает раскладку графа, созданного automaton_to_graph(..., background=True),
+    в фоновом потоке. Предыдущая фоновая раскладка при этом отменяется.
+    """
+    cancel_background_layout(app)
+    names, edges, roots = _layout_input(automaton)
+    algorithm = app.config.layout_algorithm
+    deterministic = _is_deterministic(automaton)
+    if algorithm == "auto":
+        algorithm = choose_algorithm(len(names), deterministic)
+    if cached_layout(len(names), edges, algorithm) is not None:
+        return
+
+    by_name = {node.name: node for node in app.graph.nodes}
+    nodes = [by_name[name] for name in names]
+    initial = bfs_layers_layout(len(names), edges, roots)
+    app.page.run_thread(_layout_worker, app, app.graph, app.attr.layout_generation,
+                        nodes, edges, initial, algorithm)
+
+
+def cancel_background_layout(app: Application) -> None:
+    """Останавливает фоновую раскладку: поток заметит новое поколение и больше не тронет узлы."""
+    app.attr.layout_generation += 1
+
+
+def _layout_worker(app: Application, graph: Graph, generation: int, nodes, edges, initial, algorithm: str):
+    try:
+        if algorithm == "fr":
+            last_push = time.monotonic()
+            coords = initial
+            for coords in refine_layout(initial, edges, app.config.layout_time_budget):
+                if app.attr.layout_generation != generation:
+                    return
+                now = time.monotonic()
+                if now - last_push >= 1 / app.config.layout_frame_rate:
+                    if not _apply_layout(app, graph, generation, nodes, coords):
+                        return
+                    last_push = now
+        else:
+            coords = compute_layout(len(nodes), edges, algorithm,
+                                    time_budget=app.config.layout_time_budget)
+        _apply_layout(app, graph, generation, nodes, coords)
+    except Exception as ex:
+        # Начальная раскладка уже на экране, ошибка уточнения не мешает работе
+        print(f"Ошибка фоновой раскладки: {ex}")
+
+
+def _apply_layout(app: Application, graph: Graph, generation: int, nodes, coords) -> bool:
+    """
+    Переносит посчитанные координаты в граф и перерисовывает его под блокировкой приложения,
+    если раскладка еще актуальна. Поток сам по себе только считает координаты.
+    """
+    from draw import draw_nodes
+
+    positions = fit_to_frame(coords, *_layout_frame(app)).tolist()
+    with app.lock:
+        if app.attr.layout_generation != generation or app.graph is not graph:
+            return False
+        for node, (x, y) in zip(nodes, positions):
+            if node in graph.nodes:
+                graph.move_node(node, x, y)
+        draw_nodes(app)
+    app.page.update()
+    return True
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
+from itertools import islice
+from typing import Callable, Iterator, List
+
+from compiled_automaton import CompiledAutomaton
+
+CHUNK_SIZE = 20000
+ACCEPT_MARK = "1"
+REJECT_MARK = "0"
+
+# Автомат, полученный процессом-исполнителем один раз при старте пула
+_worker_automaton: CompiledAutomaton = None
+
+
+@dataclass
+class BatchResult:
+    accepted: int = 0
+    rejected: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.accepted + self.rejected
+
+
+def _init_worker(automaton: CompiledAutomaton) -> None:
+    global _worker_automaton
+    _worker_automaton = automaton
+
+
+def _check_words(automaton: CompiledAutomaton, words: List[str]) -> bytes:
+    accepts = automaton.accepts
+    return bytes(accepts(word) for word in words)
+
+
+def _check_chunk(words: List[str]) -> bytes:
+    return _check_words(_worker_automaton, words)
+
+
+def _read_chunks(corpus, chunk_size: int) -> Iterator[List[str]]:
+    while True:
+        chunk = [line.rstrip("\r\n") for line in islice(corpus, chunk_size)]
+        if not chunk:
+            return
+        yield chunk
+
+
+def _write_results(out, verdicts: bytes) -> None:
+    out.writelines(f"{ACCEPT_MARK if verdict else REJECT_MARK}\n" for verdict in verdicts)
+
+
+def run_batch(automaton: CompiledAutomaton, corpus_path: str, result_path: str = None,
+              workers: int = None, chunk_size: int = CHUNK_SIZE,
+              progress: Callable[[BatchResult], None] = None) -> BatchResult:
+    """
+    Проверяет все слова из файла (по одному на строку) и считает принятые/отвергнутые.
+    Файл читается потоково кусками по chunk_size строк, куски раздаются процессам пула;
+    каждый процесс получает свою копию скомпилированного автомата один раз.
+    Если задан result_path, в него построчно пишется 1 (принято) или 0 (отвергнуто)
+    в порядке слов корпуса. progress, если задан, вызывается после каждого куска
+    с текущими итогами. Процессы пула запускаются через spawn: fork из многопоточного
+    процесса (Flet) может зависнуть.
+    """
+    workers = workers or os.cpu_count() or 1
+    result = BatchResult()
+
+    def consume(verdicts: bytes) -> None:
+        accepted = sum(verdicts)
+        result.accepted += accepted
+        result.rejected += len(verdicts) - accepted
+        if out is not None:
+            _write_results(out, verdicts)
+        if progress is not None:
+            progress(result)
+
+    with open(corpus_path, "r", encoding="utf-8") as corpus, \
+         (open(result_path, "w", encoding="utf-8") if result_path else nullcontext()) as out:
+        chunks = _read_chunks(corpus, chunk_size)
+
+        if workers == 1:
+            for chunk in chunks:
+                consume(_check_words(automaton, chunk))
+            return result
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(automaton,),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            # Держим ограниченное число кусков в работе, чтобы не читать весь корпус в память
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(_check_chunk, chunk))
+                if len(pending) >= 2 * workers:
+                    consume(pending.popleft().result())
+            while pending:
+                consume(pending.popleft().result())
+
+    return result
@@ -1,40 +1,60 @@
+import time
+from functools import wraps
+from automata_visualizer import cancel_background_layout
 from canvas_utils import get_clicked_node, get_clicked_transition
 from dialog_handlers import rename_state_dialog, edit_transition_dialog
 from draw import draw_nodes
 from fap import Application
 from graph import Node, Transition
+from graph_history import AddNode, AddTransition, MoveNode
+from geometry import view_of
 from linal import Vector2D
 
 
+def _locked(handler):
+    """Обработчик канваса читает и меняет граф и рендерер под блокировкой приложения."""
+    @wraps(handler)
+    def wrapper(e, app: Application):
+        with app.lock:
+            return handler(e, app)
+    return wrapper
+
+
 def _event_point(e) -> Vector2D:
     return Vector2D(e.local_x, e.local_y)
 
 
+def _model_point(point: Vector2D, app: Application) -> Vector2D:
+    """Точка канваса в координатах модели (с учетом масштаба и сдвига вида)."""
+    return view_of(app).to_model(point)
+
+
 def _is_inside_canvas(point: Vector2D, app: Application) -> bool:
     return 0 <= point.x <= app.attr.canvas_width and 0 <= point.y <= app.attr.canvas_height
 
 
 def add_node(click: Vector2D, app: Application) -> None:
-    """Добавляет узел в позиции клика"""
+    """Добавляет узел в позиции клика (click — точка канваса)"""
     if not app.attr.placing_mode:
         return
 
     # Проверяем, что клик внутри канваса (с учетом границ для узла)
-    if click.x < app.config.node_radius or click.x > app.attr.canvas_width - app.config.node_radius or \
-       click.y < app.config.node_radius or click.y > app.attr.canvas_height - app.config.node_radius:
+    radius = app.config.node_radius * app.attr.canvas_scale
+    if click.x < radius or click.x > app.attr.canvas_width - radius or \
+       click.y < radius or click.y > app.attr.canvas_height - radius:
         return  # Клик слишком близко к краю
 
-    app.history.add(app.graph)
-
+    click = _model_point(click, app)
     name = f"q{app.graph.node_counter}"
-    app.graph.nodes.add(Node(
+    edit = AddNode(Node(
         x=click.x, y=click.y,
         name=name
     ))
-    app.graph.node_counter += 1
+    app.history.apply(edit, app)
     draw_nodes(app)
 
 
+@_locked
 def handle_canvas_click(e, app: Application) -> None:
     """Обрабатывает одиночный клик на canvas"""
     click = _event_point(e)
@@ -43,25 +63,25 @@ def handle_canvas_click(e, app: Application) -> None:
     if not _is_inside_canvas(click, app):
         return  # Клик вне канваса
 
-    clicked_node = get_clicked_node(click, app)
-    clicked_transition = get_clicked_transition(click, app)
-
     if app.attr.placing_mode:
         add_node(click, app)
         return
 
+    click = _model_point(click, app)
+    clicked_node = get_clicked_node(click, app)
+    clicked_transition = get_clicked_transition(click, app)
+
     if clicked_node is not None:
         if app.graph.selected_node is not None and app.attr.transition_mode:
-            app.history.add(app.graph)
-
             if app.attr.alphabet == set():
                 app.attr.alphabet.add("a")
             symbol = next(iter(app.attr.alphabet))
-            app.graph.transitions.add(Transition(
+            edit = AddTransition(Transition(
                 start=app.graph.selected_node,
                 end=clicked_node,
                 symbols=symbol
             ))
+            app.history.apply(edit, app)
 
         app.graph.selected_node = clicked_node
         app.graph.selected_transition = None
@@ -76,6 +96,7 @@ def handle_canvas_click(e, app: Application) -> None:
     app.page.update()
 
 
+@_locked
 def handle_double_click(e, app: Application) -> None:
     """Обрабатывает двойной клик на canvas"""
     if app.attr.placing_mode or app.attr.transition_mode:
@@ -86,6 +107,7 @@ def handle_double_click(e, app: Application) -> None:
     if not _is_inside_canvas(click, app):
         return
 
+    click = _model_point(click, app)
     clicked_node = get_clicked_node(click, app)
     if clicked_node is not None:
         dialog = rename_state_dialog(clicked_node, app)
@@ -98,8 +120,18 @@ def handle_double_click(e, app: Application) -> None:
         app.page.open(dialog)
 
 
+def _frame_due(app: Application) -> bool:
+    # События приходят чаще кадров: перерисовка не чаще drag_frame_rate раз в секунду
+    now = time.monotonic()
+    if now - app.attr.last_drag_render < 1 / app.config.drag_frame_rate:
+        return False
+    app.attr.last_drag_render = now
+    return True
+
+
+@_locked
 def handle_drag_start(e, app: Application) -> None:
-    """Начало перетаскивания узла"""
+    """Начало перетаскивания узла или, на пустом месте, сдвига вида"""
     if app.attr.placing_mode or app.attr.transition_mode:
         return
 
@@ -108,32 +140,59 @@ def handle_drag_start(e, app: Application) -> None:
     if not _is_inside_canvas(click, app):
         return
 
-    clicked_node = get_clicked_node(click, app)
+    clicked_node = get_clicked_node(_model_point(click, app), app)
+    app.attr.last_drag_render = 0.0
 
     if clicked_node:
-        app.history.add(app.graph)
-
+        # Пользователь двигает узлы сам — фоновая раскладка больше не должна их переставлять
+        cancel_background_layout(app)
         app.graph.dragging_node = clicked_node
+        app.attr.drag_origin = (clicked_node.x, clicked_node.y)
+        app.renderer.begin_drag(clicked_node, app)
         draw_nodes(app)
         app.page.update()
+    else:
+        app.attr.pan_origin = (click.x, click.y, app.attr.view_offset_x, app.attr.view_offset_y)
 
 
+@_locked
 def handle_drag_update(e, app: Application) -> None:
-    """Обновление позиции перетаскиваемого узла"""
+    """Обновление позиции перетаскиваемого узла или сдвига вида"""
     if app.graph.dragging_node:
         click = _event_point(e)
 
-        x = max(app.config.node_radius, min(app.attr.canvas_width - app.config.node_radius, click.x))
-        y = max(app.config.node_radius, min(app.attr.canvas_height - app.config.node_radius, click.y))
-
-        app.graph.dragging_node.x = x
-        app.graph.dragging_node.y = y
-        draw_nodes(app)
-        app.page.update()
-
-
+        # Узел не выводится за видимую часть канваса
+        radius = app.config.node_radius * app.attr.canvas_scale
+        x = max(radius, min(app.attr.canvas_width - radius, click.x))
+        y = max(radius, min(app.attr.canvas_height - radius, click.y))
+        position = _model_point(Vector2D(x, y), app)
+
+        # Позиция обновляется всегда, а перерисовываются только затронутые элементы
+        app.graph.move_node(app.graph.dragging_node, position.x, position.y)
+        if _frame_due(app):
+            app.renderer.render_dragged(app.graph.dragging_node, app)
+    elif app.attr.pan_origin is not None:
+        # Сдвиг вида меняет только смещение, модель не трогается
+        point = _event_point(e)
+        start_x, start_y, offset_x, offset_y = app.attr.pan_origin
+        app.attr.view_offset_x = offset_x + point.x - start_x
+        app.attr.view_offset_y = offset_y + point.y - start_y
+        if _frame_due(app):
+            draw_nodes(app)
+
+
+@_locked
 def handle_drag_end(e, app: Application):
     """Завершение перетаскивания"""
     if app.graph.dragging_node:
+        node = app.graph.dragging_node
+        # Вся операция перетаскивания — одна запись истории
+        if (node.x, node.y) != app.attr.drag_origin:
+            app.history.record(MoveNode(node, app.attr.drag_origin, (node.x, node.y)))
         app.graph.dragging_node = None
+        # Полная перерисовка: последнее положение и обход узлов прямыми переходами
+        draw_nodes(app)
         app.page.update()
+    elif app.attr.pan_origin is not None:
+        app.attr.pan_origin = None
+        draw_nodes(app)
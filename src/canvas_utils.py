@@ -1,112 +1,33 @@
 from __future__ import annotations
 
-import math
-from linal import Vector2D, dot_product
+from linal import Vector2D
 from graph import Node, Transition
+from geometry import HIT_THRESHOLD
+from draw import DETAIL_CLUSTERS
 
 
 def get_clicked_node(click: Vector2D, app: Application) -> Node:
     """Определяет, по какому узлу кликнули."""
+    if app.renderer.detail == DETAIL_CLUSTERS:
+        # Видны только круги кластеров, отдельных узлов на экране нет
+        return None
     radius_sq = app.config.node_radius ** 2
-    for node in app.graph.nodes:
+    for node in app.graph.nodes_near(click.x, click.y, app.config.node_radius):
         delta = Vector2D.from_node(node) - click
         if delta.x ** 2 + delta.y ** 2 <= radius_sq:
             return node
     return None
 
 
-def check_self_transition(click: Vector2D, transition: Transition, app: Application) -> bool:
-    state_p = Vector2D.from_node(transition.start)
-    out_phis = {
-        Vector2D.from_transition(transition_).phi()
-        for transition_ in app.graph.transitions
-        if transition_.start == transition.start and
-        transition_.end != transition.end
-    }
-    in_phis = {
-        (-Vector2D.from_transition(transition_)).phi()
-        for transition_ in app.graph.transitions
-        if transition_.end == transition.end and
-        transition_.start != transition.start
-    }
-    taken = sorted(out_phis | in_phis)
-
-    arc_radius = 5/6 * app.config.node_radius
-
-    if taken == []:
-        taken = [math.pi / 4]
-    taken.append(taken[0] + 2 * math.pi)
-
-    diffs = [phi2 - phi1 for phi1, phi2 in zip(taken, taken[1:])]
-    max_diff = max(diffs)
-
-    arc_center_dir = Vector2D.from_phi_r(taken[diffs.index(max_diff)] + max_diff / 2, 1)
-    contact_offset_phi = min(math.pi / 4, max_diff / 2)
-    contact1 = state_p + arc_center_dir.turned(contact_offset_phi) * app.config.node_radius
-    contact2 = state_p + arc_center_dir.turned(-contact_offset_phi) * app.config.node_radius
-
-    # arc_radius^2 = (d + (1 - cos(contact_offset_phi)) * node_radius)^2 + (sin(contact_offset_phi) * node_radius)^2
-    # d = node_radius * (cos(contact_offset_phi) - 1) + sqrt(arc_radius^2 - (node_radius * sin(contact_offset_phi))^2)
-    center_distance = app.config.node_radius * math.cos(contact_offset_phi) + math.sqrt(arc_radius ** 2 - (app.config.node_radius * math.sin(contact_offset_phi)) ** 2)
-    arc_center = state_p + arc_center_dir * center_distance
-
-    start_angle = ((contact2 - arc_center).phi() + 2 * math.pi) % (2 * math.pi)
-    end_angle = ((contact1 - arc_center).phi() + 2 * math.pi) % (2 * math.pi)
-
-    threshold = 5
-    click_angle = ((click - arc_center).phi() + 2 * math.pi) % (2 * math.pi)
-    click_d = (click - arc_center).length()
-    if end_angle < start_angle:
-        return ((0 <= click_angle <= end_angle) or (start_angle <= click_angle <= 2 * math.pi)) and \
-               abs(click_d - arc_radius) <= threshold
-    return start_angle <= click_angle <= end_angle and \
-           abs(click_d - arc_radius) <= threshold
-
-
 def get_clicked_transition(click: Vector2D, app: Application) -> Transition:
     """Определяет, по какому переходу кликнули."""
-    threshold = 5
-    threshold_sq = threshold ** 2
-    for transition in app.graph.transitions:
-        if transition.start == transition.end:
-            if check_self_transition(click, transition, app):
-                return transition
-            continue
-
-        start_p = Vector2D.from_node(transition.start)
-        end_p = Vector2D.from_node(transition.end)
-
-        double = False
-        for transition_ in app.graph.transitions:
-            if transition_.end == transition.start and \
-               transition_.start == transition.end:
-                double = True
-                break
-
-        dir = (end_p - start_p).normalized()
-        if double:
-            line_gap = 10
-            start_p += dir.turned(-math.asin(line_gap / 2 / app.config.node_radius)) * app.config.node_radius
-            end_p -= dir.turned(math.asin(line_gap / 2 / app.config.node_radius)) * app.config.node_radius
-        else:
-            start_p += dir * app.config.node_radius
-            end_p -= dir * app.config.node_radius
-
-        # Let's call start point A, click point B,
-        # End point C and projection point D
-        ab = click - start_p
-        ac = end_p - start_p
-        ac_len_sq = ac.x ** 2 + ac.y ** 2
-        if ac_len_sq == 0:
-            continue
-
-        proj_ratio = dot_product(ab, ac) / ac_len_sq
-        if not (0 <= proj_ratio <= 1):
-            continue
-
-        closest = start_p + ac * proj_ratio
-        diff = click - closest
-        if diff.x ** 2 + diff.y ** 2 <= threshold_sq:
+    if app.renderer.detail == DETAIL_CLUSTERS:
+        # Переходы нарисованы сводно по ячейкам, отдельный переход выбрать нельзя
+        return None
+    # Проверяются только переходы, чей прямоугольник содержит клик, и по той линии, что нарисована:
+    # скрытый при слиянии встречный переход не выбирается
+    for transition in app.renderer.transition_index.query(click.x, click.y):
+        geometry = app.renderer.drawn_geometry(transition, app)
+        if geometry is not None and geometry.hit(click, HIT_THRESHOLD):
             return transition
-
     return None
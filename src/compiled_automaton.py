@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import copy
+from typing import Dict, Iterable, List
+from application_state import EPSILON_SYMBOL
+
+# Предел числа подмножеств в ленивом ДКА, чтобы автоматы с экспоненциальным
+# числом подмножеств не съели всю память: при переполнении кэш сбрасывается.
+SUBSET_CACHE_LIMIT = 1 << 16
+CLOSURE_CACHE_SIZE = 4096
+# До этой длины трасса хранит маску для каждой позиции, дальше — контрольные точки
+FULL_TRACE_LIMIT = 100_000
+TRACE_CHECKPOINT_EVERY = 64
+
+
+def _iter_bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def epsilon_closures(epsilon: List[int]) -> List[int]:
+    """
+    Эпсилон-замыкания всех состояний за один проход (epsilon[i] — маска ε-переходов из i).
+    Алгоритм Тарьяна выделяет компоненты сильной связности ε-подграфа: у всех
+    состояний компоненты замыкание общее — сама компонента плюс замыкания
+    компонент, куда из нее ведут ε-переходы. Компоненты выдаются в обратном
+    топологическом порядке, так что замыкания потомков к этому моменту готовы.
+    """
+    count = len(epsilon)
+    index = [-1] * count
+    low = [0] * count
+    on_stack = [False] * count
+    stack = []
+    closures = [0] * count
+    counter = 0
+
+    for root in range(count):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, _iter_bits(epsilon[root]))]
+
+        while work:
+            state, children = work[-1]
+            for child in children:
+                if index[child] < 0:
+                    index[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack[child] = True
+                    work.append((child, _iter_bits(epsilon[child])))
+                    break
+                if on_stack[child]:
+                    low[state] = min(low[state], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[state])
+                if low[state] != index[state]:
+                    continue
+
+                component = []
+                members = 0
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    members |= 1 << member
+                    if member == state:
+                        break
+
+                closure = members
+                for member in component:
+                    for target in _iter_bits(epsilon[member] & ~members):
+                        closure |= closures[target]
+                for member in component:
+                    closures[member] = closure
+
+    return closures
+
+
+class CompiledAutomaton:
+    """
+    Скомпилированный НКА: состояния и символы заменены целыми числами,
+    множества состояний хранятся битовыми масками (int), а переходы
+    по каждому символу уже включают эпсилон-замыкание целевых состояний.
+    """
+
+    def __init__(self, transitions: Dict[str, Dict[str, Iterable[str]]],
+                 start_states: Iterable[str], final_states: Iterable[str],
+                 states: Iterable[str] = ()):
+        names = list(dict.fromkeys([*states, *transitions]))
+        for state_map in transitions.values():
+            for targets in state_map.values():
+                names.extend(target for target in targets if target not in transitions)
+        self.state_names: List[str] = list(dict.fromkeys(names))
+        self.state_ids: Dict[str, int] = {name: ind for ind, name in enumerate(self.state_names)}
+
+        symbols = sorted({
+            symbol
+            for state_map in transitions.values()
+            for symbol in state_map
+            if symbol not in ('', EPSILON_SYMBOL)
+        })
+        self.symbol_ids: Dict[str, int] = {symbol: ind for ind, symbol in enumerate(symbols)}
+
+        epsilon = [0] * len(self.state_names)
+        direct = [[0] * len(self.state_names) for _ in symbols]
+        for state, state_map in transitions.items():
+            state_id = self.state_ids[state]
+            for symbol, targets in state_map.items():
+                targets_mask = self.mask_of(targets)
+                if symbol in ('', EPSILON_SYMBOL):
+                    epsilon[state_id] |= targets_mask
+                else:
+                    direct[self.symbol_ids[symbol]][state_id] |= targets_mask
+
+        self.closures: List[int] = epsilon_closures(epsilon)
+        self._closure_memo: Dict[int, int] = {}
+        self.table: List[List[int]] = [
+            [self._epsilon_closure(targets) for targets in row]
+            for row in direct
+        ]
+        self.start_mask: int = self._epsilon_closure(self.mask_of(start_states))
+        self.final_mask: int = self.mask_of(final_states)
+        self._reset_subsets()
+
+    def __getstate__(self):
+        # Ленивый ДКА не передаем между процессами — он восстанавливается на месте
+        state = self.__dict__.copy()
+        for key in ("_subset_ids", "_subsets", "_subset_rows", "_closure_memo"):
+            state.pop(key)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._closure_memo = {}
+        self._reset_subsets()
+
+    def private_copy(self) -> CompiledAutomaton:
+        """
+        Копия со своим ленивым ДКА и кэшем замыканий — для другого потока.
+        Таблицы переходов и замыкания после построения не меняются и остаются общими.
+        """
+        return copy.copy(self)
+
+    @classmethod
+    def from_nfa(cls, automaton) -> CompiledAutomaton:
+        """Компилирует NFA или DFA из automata-lib."""
+        transitions = {
+            state: {
+                symbol: targets if isinstance(targets, (set, frozenset)) else {targets}
+                for symbol, targets in state_map.items()
+            }
+            for state, state_map in automaton.transitions.items()
+        }
+        return cls(transitions, {automaton.initial_state}, automaton.final_states, automaton.states)
+
+    def mask_of(self, states: Iterable[str]) -> int:
+        mask = 0
+        for state in states:
+            state_id = self.state_ids.get(state)
+            if state_id is not None:
+                mask |= 1 << state_id
+        return mask
+
+    def names_of(self, mask: int) -> set:
+        return {self.state_names[ind] for ind in _iter_bits(mask)}
+
+    def epsilon_closure(self, mask: int) -> int:
+        """Замыкание множества с кэшем; кэш сбрасывается целиком, когда переполнится."""
+        closure = self._closure_memo.get(mask)
+        if closure is None:
+            if len(self._closure_memo) >= CLOSURE_CACHE_SIZE:
+                self._closure_memo.clear()
+            closure = self._closure_memo[mask] = self._epsilon_closure(mask)
+        return closure
+
+    def _epsilon_closure(self, mask: int) -> int:
+        """Замыкание множества — объединение готовых замыканий его состояний."""
+        closure = 0
+        for ind in _iter_bits(mask):
+            closure |= self.closures[ind]
+        return closure
+
+    def _reset_subsets(self) -> None:
+        # Ленивая детерминизация: каждое встреченное подмножество получает номер,
+        # а переходы между номерами запоминаются (-1 — ещё не вычислен).
+        self._subset_ids: Dict[int, int] = {}
+        self._subsets: List[int] = []
+        self._subset_rows: List[List[int]] = []
+        self._subset_id(0)
+
+    def _subset_id(self, mask: int) -> int:
+        subset_id = self._subset_ids.get(mask)
+        if subset_id is None:
+            subset_id = len(self._subsets)
+            self._subset_ids[mask] = subset_id
+            self._subsets.append(mask)
+            self._subset_rows.append([-1] * len(self.symbol_ids))
+        return subset_id
+
+    def _expand(self, subset_id: int, symbol_id: int) -> int:
+        if len(self._subsets) >= SUBSET_CACHE_LIMIT:
+            mask = self._subsets[subset_id]
+            self._reset_subsets()
+            subset_id = self._subset_id(mask)
+        next_mask = 0
+        row = self.table[symbol_id]
+        for ind in _iter_bits(self._subsets[subset_id]):
+            next_mask |= row[ind]
+        next_id = self._subset_id(next_mask)
+        self._subset_rows[subset_id][symbol_id] = next_id
+        return next_id
+
+    def step(self, mask: int, symbol: str) -> int:
+        """Множество состояний после чтения одного символа (уже замкнутое по ε)."""
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            return 0
+        subset_id = self._subset_id(mask)
+        next_id = self._subset_rows[subset_id][symbol_id]
+        if next_id < 0:
+            next_id = self._expand(subset_id, symbol_id)
+        return self._subsets[next_id]
+
+    def run(self, word: str, mask: int = None) -> int:
+        """Прогоняет слово и возвращает итоговое множество состояний."""
+        subset_id = self._subset_id(self.start_mask if mask is None else mask)
+        symbol_ids = self.symbol_ids
+        rows = self._subset_rows
+        for char in word:
+            if subset_id == 0:
+                break
+            symbol_id = symbol_ids.get(char)
+            if symbol_id is None:
+                return 0
+            next_id = rows[subset_id][symbol_id]
+            if next_id < 0:
+                next_id = self._expand(subset_id, symbol_id)
+                rows = self._subset_rows
+            subset_id = next_id
+        return self._subsets[subset_id]
+
+    def accepts(self, word: str) -> bool:
+        return bool(self.run(word) & self.final_mask)
+
+
+class StateTrace:
+    """
+    Трасса прогона слова: маски состояний после каждого префикса (int неизменяемы,
+    так что хранятся без копирования). Маски считаются лениво, по мере запросов.
+    Для длинных слов хранится только каждая checkpoint_every-я маска, остальные
+    досчитываются от ближайшей контрольной точки не более чем за k шагов.
+    """
+
+    def __init__(self, automaton: CompiledAutomaton, word: str, checkpoint_every: int = None):
+        if checkpoint_every is None:
+            checkpoint_every = 1 if len(word) <= FULL_TRACE_LIMIT else TRACE_CHECKPOINT_EVERY
+        self.automaton = automaton
+        self.word = word
+        self.checkpoint_every = checkpoint_every
+        self._checkpoints: List[int] = [automaton.start_mask]
+        # Последняя запрошенная позиция: последовательные шаги вперед не пересчитывают блок
+        self._cursor = (0, automaton.start_mask)
+
+    def __len__(self) -> int:
+        return len(self.word) + 1
+
+    def states_at(self, position: int) -> int:
+        """Маска состояний после чтения первых position символов."""
+        if not 0 <= position <= len(self.word):
+            raise IndexError(f"Позиция {position} вне слова длины {len(self.word)}")
+
+        step = self.checkpoint_every
+        block = position // step
+        while len(self._checkpoints) <= block:
+            start = (len(self._checkpoints) - 1) * step
+            self._checkpoints.append(self.automaton.run(self.word[start:start + step], self._checkpoints[-1]))
+
+        base, mask = block * step, self._checkpoints[block]
+        cursor_position, cursor_mask = self._cursor
+        if base < cursor_position <= position:
+            base, mask = cursor_position, cursor_mask
+        if base != position:
+            mask = self.automaton.run(self.word[base:position], mask)
+        self._cursor = (position, mask)
+        return mask
+
+
+def compile_from_ui(app: Application) -> CompiledAutomaton | None:
+    """
+    Компилирует автомат прямо из графа, минуя automata-lib.
+    Проверки совпадают с build_nfa_from_ui: без состояний, без начальных
+    состояний или с символами вне алфавита автомат не строится.
+    Результат кэшируется в графе до следующего Graph.touch().
+    """
+    key = ("compiled", frozenset(app.attr.alphabet))
+    return app.graph.cached(key, lambda: _compile_graph(app))
+
+
+def _compile_graph(app: Application) -> CompiledAutomaton | None:
+    if app.graph.nodes == set() or app.graph.get_start_states() == set():
+        return None
+
+    transitions = {node.name: {} for node in app.graph.nodes}
+    for transition in app.graph.transitions:
+        state_map = transitions.setdefault(transition.start.name, {})
+        for symbol in transition.symbols:
+            if symbol != EPSILON_SYMBOL and symbol not in app.attr.alphabet:
+                print(f"Ошибка компиляции автомата: символ '{symbol}' не входит в алфавит")
+                return None
+            state_map.setdefault(symbol, set()).add(transition.end.name)
+
+    return CompiledAutomaton(
+        transitions,
+        start_states=(node.name for node in app.graph.get_start_states()),
+        final_states=(node.name for node in app.graph.get_final_states()),
+    )
@@ -10,4 +10,18 @@ class ApplicatonConfig:
     start_node_color: str = "#75bf75"
     final_node_color: str = "#cf6b6b"
     start_final_node_color: str = "#b97bb9"
+    # Частота перерисовки при перетаскивании узла (кадров в секунду)
+    drag_frame_rate: int = 60
+    # Ниже этого масштаба не рисуются подписи и стрелки, а встречные переходы сливаются в один
+    lod_detail_scale: float = 0.75
+    # Если при таком отдалении в видимой области больше узлов, они группируются по ячейкам сетки
+    lod_cluster_nodes: int = 1000
+    # Раскладка импортируемых автоматов: auto, sugiyama, drl, fr или circle (см. layout.py)
+    layout_algorithm: str = "auto"
+    layout_time_budget: float = 1.0
+    # Как часто фоновая раскладка показывает промежуточные позиции (кадров в секунду)
+    layout_frame_rate: float = 10
+    # Порядок исключения состояний при построении регулярного выражения: min_weight, delgado_morais
+    # или min_fill (см. automata_operations.py, сравнение — benchmarks/state_elimination.py)
+    elimination_heuristic: str = "delgado_morais"
 
@@ -1,35 +1,92 @@
 import flet as ft
 from flet import Row, ElevatedButton, Container, Colors
-from time import sleep
-from automata_operations import build_nfa_from_ui
+import weakref
+from collections import OrderedDict
+from functools import wraps
+from threading import Event
+from application_state import EPSILON_SYMBOL
+from compiled_automaton import CompiledAutomaton, StateTrace, compile_from_ui
 from draw import draw_nodes
 from fap import Application
 
+# Больше делений слайдер не рисует: на длинном слове метки сливаются, а отрисовка тормозит.
+# Выше порога слайдер непрерывный, позиция округляется при выборе
+MAX_SLIDER_DIVISIONS = 200
+# Сколько последних NFA помнит get_epsilon_closure (их ε-замыкания считаются один раз)
+EPSILON_CACHE_SIZE = 8
+
+_epsilon_automata: OrderedDict = OrderedDict()
+
+
+def _locked(handler):
+    """Шаги отладки меняют общее состояние: их делают и обработчики UI, и поток автопроигрывания."""
+    @wraps(handler)
+    def wrapper(app: Application, *args, **kwargs):
+        with app.lock:
+            return handler(app, *args, **kwargs)
+    return wrapper
+
+
+def _epsilon_automaton(nfa) -> CompiledAutomaton:
+    """Автомат только из ε-переходов NFA; строится один раз на объект NFA (недавние запоминаются)."""
+    entry = _epsilon_automata.get(id(nfa))
+    # По id может оказаться уже другой объект: запись проверяется слабой ссылкой
+    if entry is not None and entry[0]() is nfa:
+        _epsilon_automata.move_to_end(id(nfa))
+        return entry[1]
+
+    transitions = {
+        state: {symbol: targets for symbol, targets in state_map.items() if symbol in ("", EPSILON_SYMBOL)}
+        for state, state_map in nfa.transitions.items()
+    }
+    automaton = CompiledAutomaton(transitions, start_states=(), final_states=())
+    _epsilon_automata[id(nfa)] = (weakref.ref(nfa), automaton)
+    if len(_epsilon_automata) > EPSILON_CACHE_SIZE:
+        _epsilon_automata.popitem(last=False)
+    return automaton
+
 
 def get_epsilon_closure(nfa, states):
     """
     Находит все состояния, достижимые из текущих только по эпсилон-переходам.
+    Отладчик пользуется замыканиями скомпилированного автомата напрямую,
+    эта функция нужна для разовых запросов по произвольному NFA.
     """
-    closure = set(states)
-    stack = list(states)
-    
-    while stack:
-        state = stack.pop()
-        if state in nfa.transitions:
-            for symbol, destinations in nfa.transitions[state].items():
-                if symbol == '' or symbol == 'ε':
-                    for dest in destinations:
-                        if dest not in closure:
-                            closure.add(dest)
-                            stack.append(dest)
-    return closure
+    automaton = _epsilon_automaton(nfa)
+    return set(states) | automaton.names_of(automaton.epsilon_closure(automaton.mask_of(states)))
 
 
+def _get_trace(app: Application) -> StateTrace | None:
+    """
+    Трасса текущего слова. Пересоздается, только если автомат изменился
+    (скомпилированный автомат кэшируется в графе до следующей правки).
+    """
+    automaton = compile_from_ui(app)
+    if not automaton:
+        return None
+    trace = app.attr.debug_trace
+    if trace is None or trace.automaton is not automaton or trace.word != app.attr.input_string:
+        trace = app.attr.debug_trace = StateTrace(automaton, app.attr.input_string)
+    return trace
+
+
+def _move_to(app: Application, position: int) -> int | None:
+    trace = _get_trace(app)
+    if trace is None:
+        return None
+    mask = trace.states_at(position)
+    app.attr.input_position = position
+    app.attr.current_states = trace.automaton.names_of(mask)
+    return mask
+
+
+@_locked
 def toggle_debug_mode(app: Application):
     if app.attr.debug_mode:
         app.attr.debug_mode = False
-        app.attr.auto_playing = False 
+        stop_autoplay(app)
         app.attr.current_states.clear()
+        app.attr.debug_trace = None
         app.ui.debug_panel.visible = False
         
         app.ui.status_text.spans = None
@@ -46,8 +103,8 @@ def toggle_debug_mode(app: Application):
             app.page.update()
             return
             
-        nfa = build_nfa_from_ui(app)
-        if not nfa:
+        automaton = compile_from_ui(app)
+        if not automaton:
             app.ui.status_text.value = "Автомат не построен!"
             app.page.update()
             return
@@ -55,10 +112,8 @@ def toggle_debug_mode(app: Application):
         app.attr.debug_mode = True
         app.attr.auto_playing = False 
         app.attr.input_string = word
-        app.attr.input_position = 0
-        
-        start_states = {node.name for node in app.graph.get_start_states()}
-        app.attr.current_states = get_epsilon_closure(nfa, start_states)
+        app.attr.debug_trace = StateTrace(automaton, word)
+        _move_to(app, 0)
         
         app.ui.debug_panel.visible = True
         app.ui.debug_status_text.visible = True
@@ -66,108 +121,127 @@ def toggle_debug_mode(app: Application):
         update_debug_view(app, "Начало работы")
 
 
+@_locked
 def debug_step_forward(app: Application, is_auto: bool = False):
     if not app.attr.debug_mode:
         return
     
-    if getattr(app.attr, 'auto_playing', False) and not is_auto:
+    if app.attr.auto_playing and not is_auto:
         return
     
     if app.attr.input_position >= len(app.attr.input_string):
         check_acceptance(app)
         return
 
-    nfa = build_nfa_from_ui(app)
-    if not nfa:
+    current_char = app.attr.input_string[app.attr.input_position]
+    next_mask = _move_to(app, app.attr.input_position + 1)
+    if next_mask is None:
         return
 
-    current_char = app.attr.input_string[app.attr.input_position]
-    
-    next_states_direct = set()
-    
-    current_closure = get_epsilon_closure(nfa, app.attr.current_states)
-    
-    for state in current_closure:
-        if state in nfa.transitions:
-            if current_char in nfa.transitions[state]:
-                next_states_direct.update(nfa.transitions[state][current_char])
-    
-    if not next_states_direct:
-        app.attr.current_states = set()
-        app.attr.input_position += 1
+    if not next_mask:
         update_debug_view(app, f"Символ '{current_char}': переходов нет")
         return
 
-    next_states_closure = get_epsilon_closure(nfa, next_states_direct)
-    
-    app.attr.current_states = next_states_closure
-    app.attr.input_position += 1
-    
     update_debug_view(app, f"Символ '{current_char}' обработан")
 
 
+@_locked
 def debug_step_back(app: Application):
     if not app.attr.debug_mode:
         return
         
-    if getattr(app.attr, 'auto_playing', False):
+    if app.attr.auto_playing:
         return
     
     if app.attr.input_position <= 0:
         return
     
-    app.attr.input_position -= 1
-    
-    nfa = build_nfa_from_ui(app)
-    if not nfa:
+    if _move_to(app, app.attr.input_position - 1) is None:
         return
-        
-    start_states = {node.name for node in app.graph.get_start_states()}
-    app.attr.current_states = get_epsilon_closure(nfa, start_states)
-    
-    target_pos = app.attr.input_position
-    for i in range(target_pos):
-        char = app.attr.input_string[i]
-        
-        next_direct = set()
-        current_closure = get_epsilon_closure(nfa, app.attr.current_states)
-        
-        for state in current_closure:
-            if state in nfa.transitions and char in nfa.transitions[state]:
-                next_direct.update(nfa.transitions[state][char])
-        
-        app.attr.current_states = get_epsilon_closure(nfa, next_direct)
 
-    prev_char = app.attr.input_string[target_pos - 1] if target_pos > 0 else "START"
+    target_pos = app.attr.input_position
     msg = f"Откат назад. Перед символом '{app.attr.input_string[target_pos]}'" if target_pos < len(app.attr.input_string) else "Откат с конца"
     update_debug_view(app, msg)
 
 
-def debug_continue(app: Application):
+def debug_jump_from_field(app: Application):
+    value = app.ui.debug_position_field.value.strip()
+    if not value.isdigit():
+        app.ui.debug_position_field.value = str(app.attr.input_position)
+        app.page.update()
+        return
+    debug_jump_to(app, int(value))
+
+
+@_locked
+def debug_jump_to(app: Application, position: int):
+    """Переход сразу к позиции слова: маска берется из трассы, без пошагового прогона."""
+    if not app.attr.debug_mode or app.attr.auto_playing:
+        return
+
+    position = max(0, min(len(app.attr.input_string), position))
+    if _move_to(app, position) is None:
+        return
+    update_debug_view(app, f"Переход к позиции {position}")
+
 
+def debug_continue(app: Application):
+    """Запускает или ставит на паузу автопроигрывание (в фоновом потоке)."""
     if not app.attr.debug_mode:
         return
-        
-    if getattr(app.attr, 'auto_playing', False) or app.attr.input_position >= len(app.attr.input_string):
+
+    if app.attr.auto_playing:
+        with app.lock:
+            stop_autoplay(app)
+            update_debug_view(app, "Пауза")
         return
-        
+
+    if app.attr.input_position >= len(app.attr.input_string):
+        return
+
     app.attr.auto_playing = True
-    
+    app.attr.autoplay_stop = Event()
+    app.ui.debug_continue_btn.text = "Пауза"
+    app.page.run_thread(_autoplay, app, app.attr.autoplay_stop)
+    app.page.update()
+
+
+def stop_autoplay(app: Application):
+    if app.attr.autoplay_stop is not None:
+        app.attr.autoplay_stop.set()
+    app.attr.auto_playing = False
+    app.ui.debug_continue_btn.text = "Продолжить"
+
+
+def _autoplay(app: Application, stop: Event):
+    # Event.wait вместо sleep: пауза и выход из отладки срабатывают сразу
     try:
         while app.attr.input_position < len(app.attr.input_string):
-            sleep(1)
-            if not app.attr.debug_mode:
-                break
-                
-            debug_step_forward(app, is_auto=True)
-            
-        if app.attr.debug_mode and app.attr.input_position >= len(app.attr.input_string):
-            sleep(1)
-            if app.attr.debug_mode:
-                check_acceptance(app)
-                
+            if stop.wait(app.attr.autoplay_interval):
+                return
+            with app.lock:
+                # Пауза или выход из отладки могли прийти, пока поток ждал блокировку
+                if stop.is_set() or not app.attr.debug_mode:
+                    return
+                debug_step_forward(app, is_auto=True)
+
+        if not stop.wait(app.attr.autoplay_interval):
+            with app.lock:
+                if not stop.is_set() and app.attr.debug_mode:
+                    check_acceptance(app)
     finally:
-        app.attr.auto_playing = False
+        with app.lock:
+            if not stop.is_set():
+                stop_autoplay(app)
+                app.page.update()
+
+
+def set_autoplay_speed(app: Application, steps_per_second: float):
+    app.attr.autoplay_interval = 1 / max(steps_per_second, 0.1)
+
+
+def _slider_divisions(total: int) -> int | None:
+    return max(total, 1) if total <= MAX_SLIDER_DIVISIONS else None
 
 
 def update_debug_view(app: Application, message: str):
@@ -207,6 +281,11 @@ def update_debug_view(app: Application, message: str):
 
     app.attr.debug_step_info = step_info
     app.ui.debug_status_text.value = step_info
+
+    app.ui.debug_position_slider.max = max(total, 1)
+    app.ui.debug_position_slider.divisions = _slider_divisions(total)
+    app.ui.debug_position_slider.value = pos
+    app.ui.debug_position_field.value = str(pos)
     
     draw_nodes(app)
     app.page.update()
@@ -3,10 +3,12 @@ from __future__ import annotations
 from flet import Text, TextField, ElevatedButton, AlertDialog, Row, MainAxisAlignment
 from automata_operations import import_automaton_data
 from automata.fa.nfa import NFA
-from automata.fa.dfa import DFA
 from application_state import EPSILON_SYMBOL
 from draw import draw_nodes
-from graph import Node, Transition
+from graph import Graph, Node, Transition
+from graph_history import RenameNode, EditSymbols, ReplaceGraph
+from regex_ast import symbols_of
+from regex_matcher import MAX_GRAPH_STATES, attach_matcher, build_dfa, compile_regex
 
 
 
@@ -20,9 +22,8 @@ def rename_state_dialog(node: Node, app: Application) -> AlertDialog:
             app.page.update()
             return
 
-        app.history.add(app.graph)
-
-        node.name = new_name
+        edit = RenameNode(node, node.name, new_name)
+        app.history.apply(edit, app)
 
         draw_nodes(app)
         app.page.close(dialog)
@@ -44,9 +45,8 @@ def edit_transition_dialog(transition: Transition, app: Application) -> AlertDia
             app.ui.status_text.value = "Символ не может быть пустым (используйте ε)!" # TODO: MAKE MORE AGGRESSIVE
             return
 
-        app.history.add(app.graph)
-
-        transition.symbols = ''.join(new_symbols)
+        edit = EditSymbols(transition, transition.symbols, ''.join(new_symbols))
+        app.history.apply(edit, app)
 
         if new_symbols != {EPSILON_SYMBOL}:
             app.attr.alphabet.update(new_symbols)
@@ -99,10 +99,11 @@ def regex_input_dialog(app: Application) -> AlertDialog:
 
         app.page.close(dialog)
 
+        # Выражение разбирается один раз (regex_ast): по нему и проверяются слова,
+        # и строится граф, так что ε и прочие знаки везде читаются одинаково
         try:
-            raw_nfa = NFA.from_regex(regex_str)
-            optimized_nfa = NFA.from_dfa(DFA.from_nfa(raw_nfa).minify())
-        except Exception as ex:
+            matcher = compile_regex(regex_str)
+        except ValueError as ex:
             error_dialog = AlertDialog(
                 modal=True,
                 title=Text("Ошибка синтаксиса"),
@@ -112,15 +113,29 @@ def regex_input_dialog(app: Application) -> AlertDialog:
                 ],
             )
             app.page.open(error_dialog)
+            app.page.update()
+            return
+
+        app.attr.regex = regex_str
+        app.ui.regex_display.value = f"Регулярное выражение: {regex_str}"
+        dfa = build_dfa(matcher)
+        if dfa is None:
+            # Граф слишком велик для холста: холст очищается, слова проверяются только по выражению
+            app.history.apply(ReplaceGraph(app.graph, Graph()), app)
+            app.attr.alphabet = symbols_of(matcher.start)
+            app.ui.alphabet_display.value = f"Алфавит: {', '.join(sorted(app.attr.alphabet)) or '∅'}"
+            attach_matcher(app.graph, matcher)
+            draw_nodes(app)
+            app.ui.status_text.value = (
+                f"Автомат больше {MAX_GRAPH_STATES} состояний и не рисуется, слова проверяются по выражению"
+            )
+        elif import_automaton_data(NFA.from_dfa(dfa.minify()), app):
+            # Слова для этого графа проверяются прямо по выражению, пока граф не изменят
+            attach_matcher(app.graph, matcher)
+            draw_nodes(app)
+            app.ui.status_text.value = f"Автомат построен"
         else:
-            app.attr.regex = regex_str
-            app.ui.regex_display.value = f"Регулярное выражение: {regex_str}"
-            if import_automaton_data(optimized_nfa, app):
-                draw_nodes(app)
-                app.ui.status_text.value = f"Автомат построен"
-                app.page.update()
-            else:
-                app.ui.status_text.value = "Ошибка при построении"
+            app.ui.status_text.value = "Ошибка при построении"
 
         app.page.update()
 
@@ -1,126 +1,383 @@
 from __future__ import annotations
 
 import math
+import operator
 import flet as ft
+import numpy as np
 from flet import TextStyle, canvas, Colors, FontWeight
-from linal import Vector2D, dot_product
-from graph import NodeType
-from typing import Set, List
+from geometry import (
+    HIT_THRESHOLD, CurveGeometry, LineGeometry, LoopGeometry, View, view_of,
+    curve_geometries, line_geometry, line_geometries, transition_geometry, transition_layout,
+)
+from graph import GRID_CELL_SIZE, NodeType
+from linal import Vector2D
+from spatial_index import BoxGrid
+from typing import List
+
+
+# Уровни детализации: всё; без подписей и стрелок; узлы сгруппированы по ячейкам
+DETAIL_FULL = "full"
+DETAIL_SIMPLE = "simple"
+DETAIL_CLUSTERS = "clusters"
+
+# С какого числа устаревших переходов одного вида геометрия считается в NumPy
+BATCH_GEOMETRY_MIN = 32
+
+
+def _draws_pair(transition) -> bool:
+    """
+    Какой из пары встречных переходов рисуется при слиянии: от узла с меньшим именем.
+    Имена уникальны, так что выбор не зависит ни от адресов объектов, ни от undo/redo.
+    """
+    return transition.start.name < transition.end.name
+
+
+class Renderer:
+    """
+    Канвас в режиме удержания: фигуры хранятся отдельно для каждого узла и
+    перехода вместе с ключом (геометрия, тип, выделение, подсветка). Фигуры
+    элемента пересоздаются, только если его ключ изменился, а остальные
+    объекты переиспользуются — Flet отправляет клиенту лишь разницу.
+    Геометрия переходов (geometry.py) кэшируется отдельно от фигур: смена
+    выделения или символов перерисовывает переход без пересчета тригонометрии.
+    Вместе с геометрией обновляется прямоугольник перехода в transition_index;
+    canvas_utils ищет переход под курсором по этому индексу и той же геометрии.
+    Элементы вне видимой области не отправляются (их фигуры пусты), а при
+    отдалении детализация снижается — см. level_of_detail.
+    """
+
+    def __init__(self):
+        self.node_cache = {}
+        self.transition_cache = {}
+        self.geometry_cache = {}
+        self.transition_index = BoxGrid()
+        self.drag_transitions = set()
+        self.detail = DETAIL_FULL
+        self.transform = View()
+        self._view = None
+        self._shapes = []
+
+    def render(self, app: Application, nodes=None, transitions=None) -> None:
+        """Пересчитывает изменившиеся элементы; nodes/transitions сужают проверку (по умолчанию — весь граф)."""
+        view = view_box(app)
+        detail = level_of_detail(app, view)
+        transform = view_of(app)
+        if (detail, view, transform) != (self.detail, self._view, self.transform):
+            # Сменились вид или детализация — проверяются все элементы
+            nodes = transitions = None
+        self.detail, self._view, self.transform = detail, view, transform
+
+        if detail == DETAIL_CLUSTERS:
+            # Геометрия переходов не обновляется: она пересчитается при приближении
+            self._send(app, calc_clusters(app, view, transform))
+            return
+
+        if nodes is None:
+            self.node_cache = {node: self._node_entry(node, app) for node in app.graph.nodes}
+        else:
+            for node in nodes:
+                self.node_cache[node] = self._node_entry(node, app)
+
+        self._update_geometry(app.graph.transitions if transitions is None else transitions, app)
+        if transitions is None:
+            old_cache = self.transition_cache
+            self.transition_cache = {
+                transition: self._transition_entry(transition, app)
+                for transition in app.graph.transitions
+            }
+            for transition in old_cache.keys() - self.transition_cache.keys():
+                self.transition_index.remove(transition)
+                del self.geometry_cache[transition]
+        else:
+            for transition in transitions:
+                self.transition_cache[transition] = self._transition_entry(transition, app)
+
+        self.flush(app)
+
+    def _node_entry(self, node, app: Application):
+        radius = app.config.node_radius
+        visible = _intersects((node.x - radius, node.y - radius, node.x + radius, node.y + radius), self._view)
+        key = (node_key(node, app), visible, self.detail, self.transform)
+        cached = self.node_cache.get(node)
+        if cached is not None and cached[0] == key:
+            return cached
+        return key, calc_node(node, app, self.detail == DETAIL_FULL, self.transform) if visible else []
+
+    def _update_geometry(self, transitions, app: Application) -> None:
+        """
+        Пересчитывает геометрию переходов, у которых сдвинулись концы или сменился вид.
+        Прямые и дуги обхода считаются пачкой в NumPy, если их набралось хотя бы
+        BATCH_GEOMETRY_MIN (полная перерисовка); при перетаскивании — по одному.
+        """
+        stale = {"line": [], "curved": []}
+        for transition in transitions:
+            layout = transition_layout(transition, app)
+            key = (
+                transition.start.x, transition.start.y, transition.end.x, transition.end.y,
+                layout, app.config.node_radius,
+            )
+            cached = self.geometry_cache.get(transition)
+            if cached is not None and cached[0] == key:
+                continue
+            if layout[0] == "loop":
+                self._store_geometry(transition, key, transition_geometry(transition, app, layout))
+            else:
+                stale[layout[0]].append((transition, key, layout))
+
+        for kind, items in stale.items():
+            if len(items) < BATCH_GEOMETRY_MIN:
+                for transition, key, layout in items:
+                    self._store_geometry(transition, key, transition_geometry(transition, app, layout))
+                continue
+
+            starts = np.array([(transition.start.x, transition.start.y) for transition, _, _ in items], dtype=float)
+            ends = np.array([(transition.end.x, transition.end.y) for transition, _, _ in items], dtype=float)
+            if kind == "line":
+                double = np.array([layout[1] for _, _, layout in items], dtype=bool)
+                geometries = line_geometries(starts, ends, double, app.config.node_radius)
+            else:
+                geometries = curve_geometries(starts, ends, app.config.node_radius)
+            for (transition, key, _), geometry in zip(items, geometries):
+                self._store_geometry(transition, key, geometry)
+
+    def _store_geometry(self, transition, key: tuple, geometry) -> None:
+        self.geometry_cache[transition] = key, geometry
+        self.transition_index.insert(transition, geometry.bounds(HIT_THRESHOLD))
+
+    def geometry_of(self, transition):
+        """Геометрия перехода в том виде, в каком он сейчас нарисован."""
+        return self.geometry_cache[transition][1]
+
+    def _merged(self, transition) -> bool:
+        """Встречная пара прямых в упрощенном виде рисуется одной линией по центрам."""
+        *_, (kind, double), _ = self.geometry_cache[transition][0]
+        return self.detail == DETAIL_SIMPLE and kind == "line" and double
+
+    def drawn_geometry(self, transition, app: Application):
+        """Геометрия для попадания кликом: как переход нарисован; None, если он скрыт за встречным."""
+        if not self._merged(transition):
+            return self.geometry_of(transition)
+        if not _draws_pair(transition):
+            return None
+        return line_geometry(
+            Vector2D.from_node(transition.start), Vector2D.from_node(transition.end),
+            False, app.config.node_radius
+        )
+
+    def _transition_entry(self, transition, app: Application):
+        geometry_key, geometry = self.geometry_cache[transition]
+        visible = _intersects(geometry.bounds(0), self._view)
+        merged = self._merged(transition)
+        if merged:
+            visible = visible and _draws_pair(transition)
+        key = (
+            geometry_key, transition.symbols, app.graph.selected_transition == transition,
+            visible, self.detail, self.transform,
+        )
+        cached = self.transition_cache.get(transition)
+        if cached is not None and cached[0] == key:
+            return cached
+        if not visible:
+            return key, []
+        if merged:
+            geometry = self.drawn_geometry(transition, app)
+        return key, calc_transition(transition, app, geometry.transformed(self.transform), self.detail == DETAIL_FULL)
+
+    def begin_drag(self, node, app: Application) -> None:
+        """Запоминает переходы, чья геометрия зависит от положения node."""
+        incident = app.graph.outgoing(node) | app.graph.incoming(node)
+        neighbours = {transition.start for transition in incident} | {transition.end for transition in incident}
+        # Петли соседей обходят занятые направления, а одно из них ведет к node
+        self.drag_transitions = incident | {
+            transition
+            for neighbour in neighbours
+            for transition in app.graph.outgoing(neighbour)
+            if transition.end is neighbour
+        }
+
+    def render_dragged(self, node, app: Application) -> None:
+        self.render(app, nodes=(node,), transitions=self.drag_transitions)
+
+    def flush(self, app: Application) -> None:
+        shapes = [
+            shape for _, node_shapes in self.node_cache.values() for shape in node_shapes
+        ] + [
+            shape for _, transition_shapes in self.transition_cache.values() for shape in transition_shapes
+        ]
+        self._send(app, shapes)
+
+    def _send(self, app: Application, shapes: List) -> None:
+        # Ни один элемент не изменился — отправлять нечего
+        if len(shapes) == len(self._shapes) and all(map(operator.is_, shapes, self._shapes)):
+            return
+        self._shapes = shapes
+        app.ui.drawing_area.shapes = list(shapes)
+        app.ui.drawing_area.update()
 
 
 def draw_nodes(app: Application) -> None:
-    elements = []
-    for node in app.graph.nodes:
-        match node.type:
-            case NodeType.START_FINAL:
-                color = app.config.start_final_node_color
-            case NodeType.START:
-                color = app.config.start_node_color
-            case NodeType.FINAL:
-                color = app.config.final_node_color
-            case _:
-                color = app.config.node_color
-
-        circle = canvas.Circle(
-            x=node.x, y=node.y,
-            radius=app.config.node_radius,
-            paint=ft.Paint(color)
-        )
-        elements.append(circle)
+    with app.lock:
+        app.renderer.render(app)
 
-        if app.attr.debug_mode and node.name in app.attr.current_states:
-            glow = canvas.Circle(
-                x=node.x, y=node.y,
-                radius=app.config.node_radius + 5,
-                paint=ft.Paint("#ffff00", style="stroke", stroke_width=4)
-            )
-            elements.append(glow)
 
-        if app.graph.selected_node == node:
-            outline = canvas.Circle(
-                x=node.x, y=node.y,
-                radius=app.config.node_radius,
-                paint=ft.Paint(app.config.selection_color, style="stroke", stroke_width=3)
-            )
-            elements.append(outline)
+def view_box(app: Application) -> tuple:
+    """Видимая область канваса в координатах модели: (x_min, y_min, x_max, y_max)."""
+    view = view_of(app)
+    top_left = view.to_model(Vector2D(0, 0))
+    bottom_right = view.to_model(Vector2D(app.attr.canvas_width, app.attr.canvas_height))
+    return top_left.x, top_left.y, bottom_right.x, bottom_right.y
+
+
+def _intersects(box: tuple, view: tuple) -> bool:
+    return box[0] <= view[2] and view[0] <= box[2] and box[1] <= view[3] and view[1] <= box[3]
+
 
-        text = canvas.Text(
-            x=node.x, y=node.y,
-            text=node.name,
+def level_of_detail(app: Application, view: tuple) -> str:
+    if app.attr.canvas_scale >= app.config.lod_detail_scale:
+        return DETAIL_FULL
+    if len(app.graph.nodes) > app.config.lod_cluster_nodes:
+        visible = sum(len(nodes) for nodes in app.graph.cells_in_box(*view).values())
+        if visible > app.config.lod_cluster_nodes:
+            return DETAIL_CLUSTERS
+    return DETAIL_SIMPLE
+
+
+def calc_clusters(app: Application, view: tuple, transform: View) -> List:
+    """
+    Узлы каждой видимой ячейки сетки рисуются одним кругом в их центре масс
+    с числом узлов, переходы — одной линией на пару соседствующих ячеек.
+    """
+    cells = app.graph.cells_in_box(*view)
+    centers = {}
+    elements = []
+    for cell, nodes in cells.items():
+        center = transform.to_screen(Vector2D(
+            sum(node.x for node in nodes) / len(nodes),
+            sum(node.y for node in nodes) / len(nodes)
+        ))
+        centers[cell] = center
+        radius = min(GRID_CELL_SIZE / 2, app.config.node_radius * (1 + math.log2(len(nodes)) / 4))
+        elements.append(canvas.Circle(
+            x=center.x, y=center.y,
+            radius=radius * transform.scale,
+            paint=ft.Paint(app.config.node_color)
+        ))
+        elements.append(canvas.Text(
+            x=center.x, y=center.y,
+            text=str(len(nodes)),
             style=TextStyle(weight=FontWeight.BOLD, color=Colors.BLACK),
             alignment=ft.alignment.center
+        ))
+
+    links = set()
+    for cell, nodes in cells.items():
+        for node in nodes:
+            for transition in app.graph.outgoing(node):
+                target = app.graph.cell_of(transition.end)
+                if target != cell and target in centers:
+                    links.add((min(cell, target), max(cell, target)))
+
+    paint = ft.Paint("#000000", stroke_width=1)
+    for first, second in links:
+        elements.append(canvas.Line(
+            x1=centers[first].x, y1=centers[first].y,
+            x2=centers[second].x, y2=centers[second].y,
+            paint=paint
+        ))
+    return elements
+
+
+def node_key(node, app: Application) -> tuple:
+    return (
+        node.x, node.y, node.name, node.type,
+        app.graph.selected_node == node,
+        app.attr.debug_mode and node.name in app.attr.current_states,
+        app.config.node_radius,
+    )
+
+
+def calc_node(node, app: Application, detailed: bool = True, view: View = View()) -> List:
+    match node.type:
+        case NodeType.START_FINAL:
+            color = app.config.start_final_node_color
+        case NodeType.START:
+            color = app.config.start_node_color
+        case NodeType.FINAL:
+            color = app.config.final_node_color
+        case _:
+            color = app.config.node_color
+
+    center = view.to_screen(Vector2D.from_node(node))
+    radius = app.config.node_radius * view.scale
+
+    elements = [canvas.Circle(
+        x=center.x, y=center.y,
+        radius=radius,
+        paint=ft.Paint(color)
+    )]
+
+    if app.attr.debug_mode and node.name in app.attr.current_states:
+        glow = canvas.Circle(
+            x=center.x, y=center.y,
+            radius=radius + 5 * view.scale,
+            paint=ft.Paint("#ffff00", style="stroke", stroke_width=4)
         )
-        elements.append(text)
-
-    transition_elements = calc_transitions(app)
-    app.ui.drawing_area.shapes = elements + transition_elements
-    app.ui.drawing_area.update()
-
-def is_line_intersecting_node(start: Vector2D, end: Vector2D, app: Application) -> bool:
-    v = end - start
-    length = v.length()
-    if length == 0:
-        return False
-    
-    dir_norm = v / length
-    
-    for node in app.graph.nodes:
-        p = Vector2D.from_node(node)
-        
-        if (p - start).length() < 1 or (p - end).length() < 1:
-            continue
-        
-        w = p - start
-        t = dot_product(w, dir_norm)
-        
-        if 0 < t < length:
-            dist = (w - dir_norm * t).length()
-
-            if dist < app.config.node_radius + 15:
-                return True
-                
-    return False
-
-def calc_self_line(symbols: str, paint: ft.Paint, point: Vector2D, node_radius: float, taken: Set[float]) -> List:
-    arc_radius = 5/6 * node_radius
-
-    taken = sorted(taken)
-    if taken == []:
-        taken = [math.pi / 4]
-    taken.append(taken[0] + 2 * math.pi)
-
-    diffs = [phi2 - phi1 for phi1, phi2 in zip(taken, taken[1:])]
-    max_diff = max(diffs)
-
-    arc_center_dir = Vector2D.from_phi_r(taken[diffs.index(max_diff)] + max_diff / 2, 1)
-    contact_offset_phi = min(math.pi / 4, max_diff / 2)
-    contact1 = point + arc_center_dir.turned(contact_offset_phi) * node_radius
-    contact2 = point + arc_center_dir.turned(-contact_offset_phi) * node_radius
-
-    # arc_radius^2 = (d + (1 - cos(contact_offset_phi)) * node_radius)^2 + (sin(contact_offset_phi) * node_radius)^2
-    # d = node_radius * (cos(contact_offset_phi) - 1) + sqrt(arc_radius^2 - (node_radius * sin(contact_offset_phi))^2)
-    center_distance = node_radius * math.cos(contact_offset_phi) + math.sqrt(arc_radius ** 2 - (node_radius * math.sin(contact_offset_phi)) ** 2)
-    arc_center = point + arc_center_dir * center_distance
-
-    start_angle = (contact2 - arc_center).phi()
-    contact1_dir = (contact1 - arc_center).normalized()
-    contact2_dir = (contact2 - arc_center).normalized()
-    sweep_angle = 2 * math.pi - math.acos(dot_product(contact1_dir, contact2_dir))
-
-    arrow_size = 15
-    # A bunch of arbitrary shit just to make it look somewhat pretty
-    arrow_height = arrow_size * math.cos(25 * math.pi / 180)
-    # This is orthocenter btw
-    adjustment_chord = 2 * arrow_height - arrow_size ** 2 / arrow_height
-    adjutment_angle = math.pi / 2 - math.acos(adjustment_chord / 2 / arc_radius)
-    arrow_dir = contact1_dir.perpendicular().turned(-adjutment_angle)
-    arrow1 = contact1 + arrow_dir.turned(205 * math.pi / 180) * arrow_size
-    arrow2 = contact1 + arrow_dir.turned(155 * math.pi / 180) * arrow_size
-
-    text_distance = 10 + arc_radius
-    text_position = arc_center + arc_center_dir * text_distance
-    text_rotation = arc_center_dir.perpendicular().phi() + (arc_center_dir.y > 0) * math.pi
+        elements.append(glow)
 
+    if app.graph.selected_node == node:
+        outline = canvas.Circle(
+            x=center.x, y=center.y,
+            radius=radius,
+            paint=ft.Paint(app.config.selection_color, style="stroke", stroke_width=3)
+        )
+        elements.append(outline)
+
+    if not detailed:
+        return elements
+
+    text = canvas.Text(
+        x=center.x, y=center.y,
+        text=node.name,
+        style=TextStyle(weight=FontWeight.BOLD, color=Colors.BLACK),
+        alignment=ft.alignment.center
+    )
+    elements.append(text)
+    return elements
+
+def _label(symbols: str, position, rotation: float, color) -> canvas.Text:
+    return canvas.Text(
+        x=position.x, y=position.y,
+        text=symbols,
+        style=TextStyle(size=18, weight=FontWeight.BOLD, color=color),
+        alignment=ft.alignment.center,
+        rotate=rotation
+    )
+
+
+def _arrow(geometry, tip, paint: ft.Paint) -> List:
+    return [
+        canvas.Line(
+            x1=geometry.arrow_left.x, y1=geometry.arrow_left.y,
+            x2=tip.x, y2=tip.y,
+            paint=paint
+        ),
+        canvas.Line(
+            x1=geometry.arrow_right.x, y1=geometry.arrow_right.y,
+            x2=tip.x, y2=tip.y,
+            paint=paint
+        ),
+    ]
+
+
+def _decorations(symbols: str, geometry, tip, paint: ft.Paint, detailed: bool) -> List:
+    """Стрелка и подпись перехода; при низкой детализации не рисуются."""
+    if not detailed:
+        return []
+    return [*_arrow(geometry, tip, paint), _label(symbols, geometry.text_position, geometry.text_rotation, paint.color)]
+
+
+def calc_self_line(symbols: str, paint: ft.Paint, geometry: LoopGeometry, detailed: bool = True) -> List:
+    arc_center, arc_radius = geometry.arc_center, geometry.arc_radius
     return [
         canvas.Arc(
             x=arc_center.x - arc_radius, y=arc_center.y - arc_radius,
@@ -130,181 +387,51 @@ def calc_self_line(symbols: str, paint: ft.Paint, point: Vector2D, node_radius:
                 stroke_width=paint.stroke_width,
                 style=ft.PaintingStyle.STROKE
             ),
-            start_angle=start_angle,
-            sweep_angle=sweep_angle,
+            start_angle=geometry.start_angle,
+            sweep_angle=geometry.sweep_angle,
             use_center=False
         ),
-        canvas.Line(
-            x1=arrow1.x, y1=arrow1.y,
-            x2=contact1.x, y2=contact1.y,
-            paint=paint
-        ),
-        canvas.Line(
-            x1=arrow2.x, y1=arrow2.y,
-            x2=contact1.x, y2=contact1.y,
-            paint=paint
-        ),
-        canvas.Text(
-            x=text_position.x, y=text_position.y,
-            text=symbols,
-            style=TextStyle(size=18, weight=FontWeight.BOLD, color=paint.color),
-            alignment=ft.alignment.center,
-            rotate=text_rotation
-        )
+        *_decorations(symbols, geometry, geometry.contact, paint, detailed)
     ]
 
-def calc_curved_line(symbols: str, paint: ft.Paint, start: Vector2D, end: Vector2D, node_radius: float) -> list:
-    dir = (end - start).normalized()
-    perp = dir.perpendicular()
-    
-    mid = (start + end) / 2
-    control_point = mid - perp * (node_radius * 2.5) 
-    
-    start_dir = (control_point - start).normalized()
-    end_dir = (control_point - end).normalized()
-    
-    path_start = start + start_dir * node_radius
-    path_end = end + end_dir * node_radius
-
-    tangent_dir = (path_end - control_point).normalized()
-    arrow_size = 15
-    arrow_left = path_end + (tangent_dir * arrow_size).turned(205 * math.pi / 180)
-    arrow_right = path_end + (tangent_dir * arrow_size).turned(155 * math.pi / 180)
-
-    text_position = control_point - perp * 10
-    text_rotation = dir.phi() + (start.x > end.x) * math.pi
 
+def calc_curved_line(symbols: str, paint: ft.Paint, geometry: CurveGeometry, detailed: bool = True) -> List:
     curve_paint = ft.Paint(paint.color, stroke_width=paint.stroke_width, style=ft.PaintingStyle.STROKE)
-
     return [
         canvas.Path(
             elements=[
-                canvas.Path.MoveTo(path_start.x, path_start.y),
-                canvas.Path.QuadraticTo(control_point.x, control_point.y, path_end.x, path_end.y)
+                canvas.Path.MoveTo(geometry.start.x, geometry.start.y),
+                canvas.Path.QuadraticTo(geometry.control.x, geometry.control.y, geometry.end.x, geometry.end.y)
             ],
             paint=curve_paint
         ),
-        canvas.Line(
-            x1=arrow_left.x, y1=arrow_left.y,
-            x2=path_end.x, y2=path_end.y,
-            paint=paint
-        ),
-        canvas.Line(
-            x1=arrow_right.x, y1=arrow_right.y,
-            x2=path_end.x, y2=path_end.y,
-            paint=paint
-        ),
-        canvas.Text(
-            x=text_position.x, y=text_position.y,
-            text=symbols,
-            style=TextStyle(size=18, weight=FontWeight.BOLD, color=paint.color),
-            alignment=ft.alignment.center,
-            rotate=text_rotation
-        )
+        *_decorations(symbols, geometry, geometry.end, paint, detailed)
     ]
 
-def calc_line(symbols: str, paint: ft.Paint, start: Vector2D, end: Vector2D, double: bool, node_radius: float) -> List:
-    dir = (end - start).normalized()
-    line_start = start
-    line_end = end
-    if double:
-        line_gap = 10
-        line_start += dir.turned(-math.asin(line_gap / 2 / node_radius)) * node_radius
-        line_end -= dir.turned(math.asin(line_gap / 2 / node_radius)) * node_radius
-    else:
-        line_start += dir * node_radius
-        line_end -= dir * node_radius
-
-    arrow_size = 15
-    arrow_left = line_end + (dir * arrow_size).turned(205 * math.pi / 180)
-    arrow_right = line_end + (dir * arrow_size).turned(155 * math.pi / 180)
-
-    text_position = (line_start + line_end) / 2
-    text_distance = 10
-    text_rotation = dir.phi() + (start.x > end.x) * math.pi
-    if double or start.x < end.x:
-        text_position -= dir.perpendicular() * text_distance
-    else:
-        text_position += dir.perpendicular() * text_distance
 
+def calc_line(symbols: str, paint: ft.Paint, geometry: LineGeometry, detailed: bool = True) -> List:
     return [
         canvas.Line(
-            x1=line_start.x, y1=line_start.y,
-            x2=line_end.x, y2=line_end.y,
+            x1=geometry.start.x, y1=geometry.start.y,
+            x2=geometry.end.x, y2=geometry.end.y,
             paint=paint
         ),
-        canvas.Line(
-            x1=arrow_left.x, y1=arrow_left.y,
-            x2=line_end.x, y2=line_end.y,
-            paint=paint
-        ),
-        canvas.Line(
-            x1=arrow_right.x, y1=arrow_right.y,
-            x2=line_end.x, y2=line_end.y,
-            paint=paint
-        ),
-        canvas.Text(
-            x=text_position.x, y=text_position.y,
-            text=symbols,
-            style=TextStyle(size=18, weight=FontWeight.BOLD, color=paint.color),
-            alignment=ft.alignment.center,
-            rotate=text_rotation
-        )
+        *_decorations(symbols, geometry, geometry.end, paint, detailed)
     ]
 
 
-def calc_transitions(app) -> List:
-    elements = []
-    for transition in app.graph.transitions:
-        start_p = Vector2D.from_node(transition.start)
-        end_p = Vector2D.from_node(transition.end)
-
-        is_selected = app.graph.selected_transition == transition
-        line_color = app.config.selection_color if is_selected else "#000000"
-        line_width = 3 if is_selected else 2
-
-        if transition.start == transition.end:
-            out_phis = {
-                Vector2D.from_transition(transition_).phi()
-                for transition_ in app.graph.transitions
-                if transition_.start == transition.start and
-                transition_.end != transition.end
-            }
-            in_phis = {
-                (-Vector2D.from_transition(transition_)).phi()
-                for transition_ in app.graph.transitions
-                if transition_.end == transition.end and
-                transition_.start != transition.start
-            }
-            elements += calc_self_line(
-                transition.symbols,
-                ft.Paint(line_color, stroke_width=line_width),
-                start_p,
-                app.config.node_radius,
-                out_phis | in_phis
-            )
-            continue
-
-        double = False
-        for transition_ in app.graph.transitions:
-            if transition_.end == transition.start and transition_.start == transition.end:
-                double = True
-                break
-
-        if is_line_intersecting_node(start_p, end_p, app):
-            elements += calc_curved_line(
-                transition.symbols,
-                ft.Paint(line_color, stroke_width=line_width),
-                start_p, end_p,
-                app.config.node_radius
-            )
-        else:
-            elements += calc_line(
-                transition.symbols,
-                ft.Paint(line_color, stroke_width=line_width),
-                start_p, end_p,
-                double,
-                app.config.node_radius
-            )
+def calc_transition(transition, app, geometry=None, detailed: bool = True) -> List:
+    if geometry is None:
+        geometry = transition_geometry(transition, app)
 
-    return elements
+    is_selected = app.graph.selected_transition == transition
+    paint = ft.Paint(
+        app.config.selection_color if is_selected else "#000000",
+        stroke_width=3 if is_selected else 2
+    )
+
+    if isinstance(geometry, LoopGeometry):
+        return calc_self_line(transition.symbols, paint, geometry, detailed)
+    if isinstance(geometry, CurveGeometry):
+        return calc_curved_line(transition.symbols, paint, geometry, detailed)
+    return calc_line(transition.symbols, paint, geometry, detailed)
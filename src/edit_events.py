@@ -2,49 +2,10 @@ from __future__ import annotations
 
 from draw import draw_nodes
 from graph import NodeType, Graph
+from graph_history import ToggleType, RemoveNode, RemoveTransition, ReplaceGraph
 from application_state import ApplicationState, ApplicationUI
 
 
-def _scale_graph_positions(app: Application, old_scale: float, new_scale: float) -> None:
-    if not app.graph.nodes:
-        return
-
-    scale_ratio = new_scale / old_scale
-    if scale_ratio == 1.0:
-        return
-
-    old_center_x = app.attr.canvas_width / 2
-    old_center_y = app.attr.canvas_height / 2
-    new_canvas_width = app.attr.base_canvas_width * new_scale
-    new_canvas_height = app.attr.base_canvas_height * new_scale
-
-    for node in app.graph.nodes:
-        node.x = old_center_x + (node.x - old_center_x) * scale_ratio
-        node.y = old_center_y + (node.y - old_center_y) * scale_ratio
-
-    min_x = min(node.x for node in app.graph.nodes)
-    max_x = max(node.x for node in app.graph.nodes)
-    min_y = min(node.y for node in app.graph.nodes)
-    max_y = max(node.y for node in app.graph.nodes)
-
-    shift_x = 0
-    if min_x < app.config.node_radius:
-        shift_x = app.config.node_radius - min_x
-    elif max_x > new_canvas_width - app.config.node_radius:
-        shift_x = (new_canvas_width - app.config.node_radius) - max_x
-
-    shift_y = 0
-    if min_y < app.config.node_radius:
-        shift_y = app.config.node_radius - min_y
-    elif max_y > new_canvas_height - app.config.node_radius:
-        shift_y = (new_canvas_height - app.config.node_radius) - max_y
-
-    if shift_x != 0 or shift_y != 0:
-        for node in app.graph.nodes:
-            node.x += shift_x
-            node.y += shift_y
-
-
 def _clamp_canvas_scale(scale: float, app: Application) -> float:
     return max(app.attr.min_canvas_scale, min(app.attr.max_canvas_scale, scale))
 
@@ -65,8 +26,11 @@ def _sync_canvas_size(app: Application) -> None:
 
 def set_canvas_scale(scale: float, app: Application) -> None:
     new_canvas_scale = _clamp_canvas_scale(scale, app)
-    if new_canvas_scale != app.attr.canvas_scale:
-        _scale_graph_positions(app, app.attr.canvas_scale, new_canvas_scale)
+    # Канвас растет вместе с масштабом, поэтому точка модели в его центре остается
+    # в центре, если сдвиг вида масштабируется так же. Узлы не трогаются.
+    ratio = new_canvas_scale / app.attr.canvas_scale
+    app.attr.view_offset_x *= ratio
+    app.attr.view_offset_y *= ratio
 
     app.attr.canvas_scale = new_canvas_scale
     app.attr.canvas_width = app.attr.base_canvas_width * app.attr.canvas_scale
@@ -110,19 +74,20 @@ def toggle_start_state(app: Application):
         app.page.update()
         return
 
-    app.history.add(app.graph)
-
-    if app.graph.selected_node in app.graph.get_start_states():
-        if app.graph.selected_node.type == NodeType.START:
-            app.graph.selected_node.type = NodeType.NORMAL
-        elif app.graph.selected_node.type == NodeType.START_FINAL:
-            app.graph.selected_node.type = NodeType.FINAL
+    node = app.graph.selected_node
+    if node in app.graph.get_start_states():
+        if node.type == NodeType.START:
+            new_type = NodeType.NORMAL
+        elif node.type == NodeType.START_FINAL:
+            new_type = NodeType.FINAL
     else:
-        if app.graph.selected_node.type == NodeType.NORMAL:
-            app.graph.selected_node.type = NodeType.START
-        elif app.graph.selected_node.type == NodeType.FINAL:
-            app.graph.selected_node.type = NodeType.START_FINAL
+        if node.type == NodeType.NORMAL:
+            new_type = NodeType.START
+        elif node.type == NodeType.FINAL:
+            new_type = NodeType.START_FINAL
 
+    edit = ToggleType(node, node.type, new_type)
+    app.history.apply(edit, app)
     draw_nodes(app)
     app.page.update()
 
@@ -133,19 +98,20 @@ def toggle_final_state(app: Application):
         app.page.update()
         return
 
-    app.history.add(app.graph)
-
-    if app.graph.selected_node in app.graph.get_final_states():
-        if app.graph.selected_node.type == NodeType.FINAL:
-            app.graph.selected_node.type = NodeType.NORMAL
-        elif app.graph.selected_node.type == NodeType.START_FINAL:
-            app.graph.selected_node.type = NodeType.START
+    node = app.graph.selected_node
+    if node in app.graph.get_final_states():
+        if node.type == NodeType.FINAL:
+            new_type = NodeType.NORMAL
+        elif node.type == NodeType.START_FINAL:
+            new_type = NodeType.START
     else:
-        if app.graph.selected_node.type == NodeType.NORMAL:
-            app.graph.selected_node.type = NodeType.FINAL
-        elif app.graph.selected_node.type == NodeType.START:
-            app.graph.selected_node.type = NodeType.START_FINAL
+        if node.type == NodeType.NORMAL:
+            new_type = NodeType.FINAL
+        elif node.type == NodeType.START:
+            new_type = NodeType.START_FINAL
 
+    edit = ToggleType(node, node.type, new_type)
+    app.history.apply(edit, app)
     draw_nodes(app)
     app.page.update()
 
@@ -175,31 +141,25 @@ def remove_alphabet_symbols(app: Application):
 
 
 def clear_automaton(app: Application):
-    app.history.add(app.graph)
-
-    app.graph = Graph()
+    edit = ReplaceGraph(app.graph, Graph())
+    app.history.apply(edit, app)
     app.attr = ApplicationState()
     draw_nodes(app)
     app.page.update()
 
 
 def handle_delete(app: Application):
-    if app.graph.selected_node or app.graph.selected_transition:
-        app.history.add(app.graph)
-
+    edit = None
     if app.graph.selected_node is not None:
-        app.graph.nodes.remove(app.graph.selected_node)
-        app.graph.transitions = {
-            transition
-            for transition in app.graph.transitions
-            if transition.start != app.graph.selected_node and
-            transition.end != app.graph.selected_node
-        }
+        edit = RemoveNode(app.graph.selected_node)
     elif app.graph.selected_transition:
-        app.graph.transitions.remove(app.graph.selected_transition)
+        edit = RemoveTransition(app.graph.selected_transition)
     else:
         app.ui.status_text.value = "Ничего не выбрано для удаления"
 
+    if edit is not None:
+        app.history.apply(edit, app)
+
     app.graph.selected_node = None
     app.graph.selected_transition = None
 
@@ -1,3 +1,5 @@
+import multiprocessing
+from threading import RLock
 import flet as ft
 from flet import (
     Text,
@@ -16,12 +18,14 @@ from flet import (
     FilePicker,
     Slider,
     IconButton,
+    TextField,
 )
 
 from application_state import ApplicationUI, ApplicationState
 from graph import Graph
 from config import ApplicatonConfig
 from graph_history import History
+from draw import Renderer
 from table import open_table_editor
 import debug
 
@@ -31,6 +35,9 @@ class Application:
     ui = ApplicationUI()
     config = ApplicatonConfig()
     history = History()
+    renderer = Renderer()
+    # Граф и рендерер меняются и из обработчиков событий, и из фоновых потоков (раскладка)
+    lock = RLock()
     page: ft.Page
 
     def __init__(self, page: ft.Page):
@@ -78,6 +85,31 @@ class Application:
             on_click=lambda e: debug.debug_continue(self),
             bgcolor=Colors.BLUE_100
         )
+        self.ui.debug_position_slider = Slider(
+            min=0,
+            max=1,
+            value=0,
+            divisions=1,
+            width=200,
+            label="{value}",
+            on_change=lambda e: debug.debug_jump_to(self, round(e.control.value))
+        )
+        self.ui.debug_position_field = TextField(
+            value="0",
+            width=70,
+            dense=True,
+            tooltip="Позиция в слове",
+            on_submit=lambda e: debug.debug_jump_from_field(self)
+        )
+        self.ui.debug_speed_slider = Slider(
+            min=1,
+            max=20,
+            value=1 / self.attr.autoplay_interval,
+            divisions=19,
+            width=120,
+            label="{value} шаг/с",
+            on_change=lambda e: debug.set_autoplay_speed(self, e.control.value)
+        )
         self.ui.debug_status_text = Text(
             "",
             size=12,
@@ -91,7 +123,10 @@ class Application:
             content=Row([
                 self.ui.debug_step_back_btn,
                 self.ui.debug_step_forward_btn,
-                self.ui.debug_continue_btn
+                self.ui.debug_continue_btn,
+                self.ui.debug_speed_slider,
+                self.ui.debug_position_slider,
+                self.ui.debug_position_field
             ], spacing=10),
             padding=10,
             bgcolor=Colors.GREY_200,
@@ -169,7 +204,9 @@ class Application:
                 content=self.ui.word_input,
                 expand=True,
             ),
-            ElevatedButton("Обработать слово", on_click=lambda e: interaction_events.handle_run(self))],
+            ElevatedButton("Обработать слово", on_click=lambda e: interaction_events.handle_run(self)),
+            ElevatedButton("Проверить файл слов", on_click=lambda e: interaction_events.request_batch_file(self)),
+            self.ui.batch_save_results],
             spacing=10,
             vertical_alignment=CrossAxisAlignment.CENTER,
         )
@@ -346,4 +383,6 @@ class Application:
 
 
 if __name__ == "__main__":
+    # Пакетная проверка запускает процессы; без этого собранный exe их не поднимет
+    multiprocessing.freeze_support()
     ft.app(target=lambda page: Application(page))
@@ -0,0 +1,389 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Set
+import numpy as np
+from linal import Vector2D, dot_product, normalize_batch, perpendicular_batch, rotate_batch, rotation
+
+# Допустимое расстояние от клика до линии перехода
+HIT_THRESHOLD = 5
+ARROW_SIZE = 15
+LINE_GAP = 10
+TEXT_DISTANCE = 10
+# Повороты направления перехода, дающие стороны стрелки
+ARROW_LEFT_TURN = rotation(205 * math.pi / 180)
+ARROW_RIGHT_TURN = rotation(155 * math.pi / 180)
+# Кривая обхода проверяется на попадание как ломаная из стольких отрезков
+CURVE_HIT_SEGMENTS = 16
+
+
+@dataclass(frozen=True)
+class View:
+    """
+    Преобразование вида: экран = модель * scale + offset. Зум и сдвиг меняют
+    только его, координаты узлов остаются в модели без накопления ошибок.
+    """
+    scale: float = 1.0
+    offset_x: float = 0.0
+    offset_y: float = 0.0
+
+    def to_screen(self, point: Vector2D) -> Vector2D:
+        return Vector2D(point.x * self.scale + self.offset_x, point.y * self.scale + self.offset_y)
+
+    def to_model(self, point: Vector2D) -> Vector2D:
+        return Vector2D((point.x - self.offset_x) / self.scale, (point.y - self.offset_y) / self.scale)
+
+
+def view_of(app: Application) -> View:
+    return View(app.attr.canvas_scale, app.attr.view_offset_x, app.attr.view_offset_y)
+
+
+def _segment_distance_sq(point: Vector2D, start: Vector2D, end: Vector2D) -> float:
+    segment = end - start
+    length_sq = segment.x ** 2 + segment.y ** 2
+    if length_sq == 0:
+        delta = point - start
+        return delta.x ** 2 + delta.y ** 2
+    ratio = max(0.0, min(1.0, dot_product(point - start, segment) / length_sq))
+    delta = point - (start + segment * ratio)
+    return delta.x ** 2 + delta.y ** 2
+
+
+@dataclass
+class LineGeometry:
+    """Прямой переход: отрезок от края до края узлов (сдвинутый, если есть обратный)."""
+    start: Vector2D
+    end: Vector2D
+    arrow_left: Vector2D
+    arrow_right: Vector2D
+    text_position: Vector2D
+    text_rotation: float
+
+    def bounds(self, pad: float) -> tuple:
+        return (
+            min(self.start.x, self.end.x) - pad, min(self.start.y, self.end.y) - pad,
+            max(self.start.x, self.end.x) + pad, max(self.start.y, self.end.y) + pad,
+        )
+
+    def transformed(self, view: View) -> LineGeometry:
+        screen = view.to_screen
+        return LineGeometry(
+            screen(self.start), screen(self.end), screen(self.arrow_left), screen(self.arrow_right),
+            screen(self.text_position), self.text_rotation
+        )
+
+    def hit(self, point: Vector2D, threshold: float) -> bool:
+        if self.start.x == self.end.x and self.start.y == self.end.y:
+            return False
+        return _segment_distance_sq(point, self.start, self.end) <= threshold ** 2
+
+
+@dataclass
+class CurveGeometry:
+    """Переход в обход узла: квадратичная кривая Безье."""
+    start: Vector2D
+    control: Vector2D
+    end: Vector2D
+    arrow_left: Vector2D
+    arrow_right: Vector2D
+    text_position: Vector2D
+    text_rotation: float
+
+    def bounds(self, pad: float) -> tuple:
+        # Кривая Безье лежит в выпуклой оболочке своих опорных точек
+        points = (self.start, self.control, self.end)
+        return (
+            min(point.x for point in points) - pad, min(point.y for point in points) - pad,
+            max(point.x for point in points) + pad, max(point.y for point in points) + pad,
+        )
+
+    def transformed(self, view: View) -> CurveGeometry:
+        screen = view.to_screen
+        return CurveGeometry(
+            screen(self.start), screen(self.control), screen(self.end), screen(self.arrow_left),
+            screen(self.arrow_right), screen(self.text_position), self.text_rotation
+        )
+
+    def point_at(self, t: float) -> Vector2D:
+        return self.start * ((1 - t) ** 2) + self.control * (2 * t * (1 - t)) + self.end * (t ** 2)
+
+    def hit(self, point: Vector2D, threshold: float) -> bool:
+        samples = [self.point_at(ind / CURVE_HIT_SEGMENTS) for ind in range(CURVE_HIT_SEGMENTS + 1)]
+        return any(
+            _segment_distance_sq(point, start, end) <= threshold ** 2
+            for start, end in zip(samples, samples[1:])
+        )
+
+
+@dataclass
+class LoopGeometry:
+    """Петля: дуга окружности вокруг arc_center, идущая от start_angle на sweep_angle."""
+    arc_center: Vector2D
+    arc_radius: float
+    start_angle: float
+    sweep_angle: float
+    direction: Vector2D
+    contact: Vector2D
+    arrow_left: Vector2D
+    arrow_right: Vector2D
+    text_position: Vector2D
+    text_rotation: float
+
+    def bounds(self, pad: float) -> tuple:
+        reach = self.arc_radius + pad
+        return (
+            self.arc_center.x - reach, self.arc_center.y - reach,
+            self.arc_center.x + reach, self.arc_center.y + reach,
+        )
+
+    def transformed(self, view: View) -> LoopGeometry:
+        screen = view.to_screen
+        return LoopGeometry(
+            screen(self.arc_center), self.arc_radius * view.scale, self.start_angle, self.sweep_angle,
+            self.direction, screen(self.contact), screen(self.arrow_left), screen(self.arrow_right),
+            screen(self.text_position), self.text_rotation
+        )
+
+    def hit(self, point: Vector2D, threshold: float) -> bool:
+        delta = point - self.arc_center
+        if abs(delta.length() - self.arc_radius) > threshold:
+            return False
+        return (delta.phi() - self.start_angle) % (2 * math.pi) <= self.sweep_angle
+
+
+@lru_cache(maxsize=None)
+def _double_line_turns(node_radius: float) -> tuple:
+    # Концы двойной линии смещены по окружности узла на полразрыва LINE_GAP
+    phi = math.asin(LINE_GAP / 2 / node_radius)
+    return rotation(-phi), rotation(phi)
+
+
+def line_geometry(start: Vector2D, end: Vector2D, double: bool, node_radius: float) -> LineGeometry:
+    dir = (end - start).normalized()
+    line_start = start
+    line_end = end
+    if double:
+        start_turn, end_turn = _double_line_turns(node_radius)
+        line_start += dir.rotated(*start_turn) * node_radius
+        line_end -= dir.rotated(*end_turn) * node_radius
+    else:
+        line_start += dir * node_radius
+        line_end -= dir * node_radius
+
+    arrow_left = line_end + (dir * ARROW_SIZE).rotated(*ARROW_LEFT_TURN)
+    arrow_right = line_end + (dir * ARROW_SIZE).rotated(*ARROW_RIGHT_TURN)
+
+    text_position = (line_start + line_end) / 2
+    text_rotation = dir.phi() + (start.x > end.x) * math.pi
+    if double or start.x < end.x:
+        text_position -= dir.perpendicular() * TEXT_DISTANCE
+    else:
+        text_position += dir.perpendicular() * TEXT_DISTANCE
+
+    return LineGeometry(line_start, line_end, arrow_left, arrow_right, text_position, text_rotation)
+
+
+def curve_geometry(start: Vector2D, end: Vector2D, node_radius: float) -> CurveGeometry:
+    dir = (end - start).normalized()
+    perp = dir.perpendicular()
+
+    mid = (start + end) / 2
+    control_point = mid - perp * (node_radius * 2.5)
+
+    start_dir = (control_point - start).normalized()
+    end_dir = (control_point - end).normalized()
+
+    path_start = start + start_dir * node_radius
+    path_end = end + end_dir * node_radius
+
+    tangent_dir = (path_end - control_point).normalized()
+    arrow_left = path_end + (tangent_dir * ARROW_SIZE).rotated(*ARROW_LEFT_TURN)
+    arrow_right = path_end + (tangent_dir * ARROW_SIZE).rotated(*ARROW_RIGHT_TURN)
+
+    text_position = control_point - perp * TEXT_DISTANCE
+    text_rotation = dir.phi() + (start.x > end.x) * math.pi
+
+    return CurveGeometry(path_start, control_point, path_end, arrow_left, arrow_right, text_position, text_rotation)
+
+
+@lru_cache(maxsize=None)
+def _loop_arrow_turn(arc_radius: float) -> tuple:
+    # A bunch of arbitrary shit just to make it look somewhat pretty
+    arrow_height = ARROW_SIZE * math.cos(25 * math.pi / 180)
+    # This is orthocenter btw
+    adjustment_chord = 2 * arrow_height - ARROW_SIZE ** 2 / arrow_height
+    adjutment_angle = math.pi / 2 - math.acos(adjustment_chord / 2 / arc_radius)
+    return rotation(-adjutment_angle)
+
+
+def _vectors(array: np.ndarray) -> List[Vector2D]:
+    return [Vector2D(x, y) for x, y in array.tolist()]
+
+
+def _arrowheads(tips: np.ndarray, directions: np.ndarray) -> tuple:
+    scaled = directions * ARROW_SIZE
+    return tips + rotate_batch(scaled, *ARROW_LEFT_TURN), tips + rotate_batch(scaled, *ARROW_RIGHT_TURN)
+
+
+def _label_rotations(starts: np.ndarray, ends: np.ndarray, directions: np.ndarray) -> np.ndarray:
+    return np.arctan2(directions[:, 1], directions[:, 0]) + (starts[:, 0] > ends[:, 0]) * math.pi
+
+
+def line_geometries(starts: np.ndarray, ends: np.ndarray, double: np.ndarray,
+                    node_radius: float) -> List[LineGeometry]:
+    """То же, что line_geometry, для массивов центров формы (n, 2) за один векторный проход."""
+    directions = normalize_batch(ends - starts)
+    double = double[:, None]
+    (start_cos, start_sin), (end_cos, end_sin) = _double_line_turns(node_radius)
+    line_starts = starts + node_radius * np.where(double, rotate_batch(directions, start_cos, start_sin), directions)
+    line_ends = ends - node_radius * np.where(double, rotate_batch(directions, end_cos, end_sin), directions)
+    arrows_left, arrows_right = _arrowheads(line_ends, directions)
+
+    text_sign = np.where(double | (starts[:, :1] < ends[:, :1]), -1.0, 1.0)
+    text_positions = (line_starts + line_ends) / 2 + text_sign * perpendicular_batch(directions) * TEXT_DISTANCE
+    rotations = _label_rotations(starts, ends, directions)
+
+    return [
+        LineGeometry(*row, text_rotation)
+        for *row, text_rotation in zip(
+            _vectors(line_starts), _vectors(line_ends), _vectors(arrows_left),
+            _vectors(arrows_right), _vectors(text_positions), rotations.tolist()
+        )
+    ]
+
+
+def curve_geometries(starts: np.ndarray, ends: np.ndarray, node_radius: float) -> List[CurveGeometry]:
+    """То же, что curve_geometry, для массивов центров формы (n, 2)."""
+    directions = normalize_batch(ends - starts)
+    perps = perpendicular_batch(directions)
+    controls = (starts + ends) / 2 - perps * (node_radius * 2.5)
+
+    path_starts = starts + normalize_batch(controls - starts) * node_radius
+    path_ends = ends + normalize_batch(controls - ends) * node_radius
+    arrows_left, arrows_right = _arrowheads(path_ends, normalize_batch(path_ends - controls))
+
+    text_positions = controls - perps * TEXT_DISTANCE
+    rotations = _label_rotations(starts, ends, directions)
+
+    return [
+        CurveGeometry(*row, text_rotation)
+        for *row, text_rotation in zip(
+            _vectors(path_starts), _vectors(controls), _vectors(path_ends), _vectors(arrows_left),
+            _vectors(arrows_right), _vectors(text_positions), rotations.tolist()
+        )
+    ]
+
+
+def loop_geometry(point: Vector2D, node_radius: float, taken: Set[float]) -> LoopGeometry:
+    arc_radius = 5/6 * node_radius
+
+    taken = sorted(taken)
+    if taken == []:
+        taken = [math.pi / 4]
+    taken.append(taken[0] + 2 * math.pi)
+
+    diffs = [phi2 - phi1 for phi1, phi2 in zip(taken, taken[1:])]
+    max_diff = max(diffs)
+
+    arc_center_dir = Vector2D.from_phi_r(taken[diffs.index(max_diff)] + max_diff / 2, 1)
+    contact_offset_phi = min(math.pi / 4, max_diff / 2)
+    offset_cos, offset_sin = rotation(contact_offset_phi)
+    contact1 = point + arc_center_dir.rotated(offset_cos, offset_sin) * node_radius
+    contact2 = point + arc_center_dir.rotated(offset_cos, -offset_sin) * node_radius
+
+    # arc_radius^2 = (d + (1 - cos(contact_offset_phi)) * node_radius)^2 + (sin(contact_offset_phi) * node_radius)^2
+    # d = node_radius * (cos(contact_offset_phi) - 1) + sqrt(arc_radius^2 - (node_radius * sin(contact_offset_phi))^2)
+    center_distance = node_radius * offset_cos + math.sqrt(arc_radius ** 2 - (node_radius * offset_sin) ** 2)
+    arc_center = point + arc_center_dir * center_distance
+
+    start_angle = (contact2 - arc_center).phi()
+    contact1_dir = (contact1 - arc_center).normalized()
+    contact2_dir = (contact2 - arc_center).normalized()
+    sweep_angle = 2 * math.pi - math.acos(dot_product(contact1_dir, contact2_dir))
+
+    arrow_dir = contact1_dir.perpendicular().rotated(*_loop_arrow_turn(arc_radius))
+    arrow1 = contact1 + arrow_dir.rotated(*ARROW_LEFT_TURN) * ARROW_SIZE
+    arrow2 = contact1 + arrow_dir.rotated(*ARROW_RIGHT_TURN) * ARROW_SIZE
+
+    text_position = arc_center + arc_center_dir * (TEXT_DISTANCE + arc_radius)
+    text_rotation = arc_center_dir.perpendicular().phi() + (arc_center_dir.y > 0) * math.pi
+
+    return LoopGeometry(
+        arc_center, arc_radius, start_angle, sweep_angle, arc_center_dir,
+        contact1, arrow1, arrow2, text_position, text_rotation
+    )
+
+
+def is_line_intersecting_node(start: Vector2D, end: Vector2D, app: Application) -> bool:
+    v = end - start
+    length = v.length()
+    if length == 0:
+        return False
+
+    dir_norm = v / length
+    margin = app.config.node_radius + 15
+
+    for node in app.graph.nodes_along(start.x, start.y, end.x, end.y, margin):
+        p = Vector2D.from_node(node)
+
+        if (p - start).length() < 1 or (p - end).length() < 1:
+            continue
+
+        w = p - start
+        t = dot_product(w, dir_norm)
+
+        if 0 < t < length:
+            dist = (w - dir_norm * t).length()
+
+            if dist < margin:
+                return True
+
+    return False
+
+
+def taken_directions(node, app) -> Set[float]:
+    """Углы, под которыми из узла выходят и в него входят переходы к другим узлам."""
+    out_phis = {
+        Vector2D.from_transition(transition).phi()
+        for transition in app.graph.outgoing(node)
+        if transition.end is not node
+    }
+    in_phis = {
+        (-Vector2D.from_transition(transition)).phi()
+        for transition in app.graph.incoming(node)
+        if transition.start is not node
+    }
+    return out_phis | in_phis
+
+
+def transition_layout(transition, app) -> tuple:
+    """
+    Вид перехода, зависящий от соседних элементов: петля с занятыми
+    направлениями, дуга в обход узла или прямая (одиночная/двойная).
+    """
+    if transition.start == transition.end:
+        return "loop", frozenset(taken_directions(transition.start, app))
+
+    start_p = Vector2D.from_node(transition.start)
+    end_p = Vector2D.from_node(transition.end)
+    if is_line_intersecting_node(start_p, end_p, app):
+        return "curved", None
+
+    return "line", app.graph.transition_between(transition.end, transition.start) is not None
+
+
+def transition_geometry(transition, app, layout: tuple = None):
+    """Геометрия перехода, общая для отрисовки и проверки попадания."""
+    if layout is None:
+        layout = transition_layout(transition, app)
+    kind, detail = layout
+    start_p = Vector2D.from_node(transition.start)
+    end_p = Vector2D.from_node(transition.end)
+
+    if kind == "loop":
+        return loop_geometry(start_p, app.config.node_radius, set(detail))
+    if kind == "curved":
+        return curve_geometry(start_p, end_p, app.config.node_radius)
+    return line_geometry(start_p, end_p, detail, app.config.node_radius)
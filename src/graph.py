@@ -1,8 +1,17 @@
+import math
 from dataclasses import dataclass, field
-from typing import Set
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
 from enum import Enum
 
 
+# Сторона ячейки равномерной сетки, по которой индексируются положения узлов
+GRID_CELL_SIZE = 100.0
+
+
+def _grid_cell(x: float, y: float) -> Tuple[int, int]:
+    return math.floor(x / GRID_CELL_SIZE), math.floor(y / GRID_CELL_SIZE)
+
+
 class NodeType(Enum):
     NORMAL = 0
     START = 1
@@ -28,15 +37,218 @@ class Transition:
 
 @dataclass
 class Graph:
-    nodes: Set[Node] = field(default_factory=set)
-    transitions: Set[Transition] = field(default_factory=set)
     node_counter: int = 0
     selected_node: Node = None
     selected_transition: Transition = None
     dragging_node: Node = None
+    # Номер версии автомата и построения (NFA, скомпилированный автомат),
+    # посчитанные для этой версии. Геометрия узлов на них не влияет.
+    revision: int = 0
+    cache: dict = field(default_factory=dict, repr=False, compare=False)
+
+    # Сами наборы меняются только через add_*/remove_*/replace_*, иначе индексы (сетка, смежность)
+    # и кэш построений отстанут. Поля участвуют в сравнении графов, но не в конструкторе.
+    _nodes: Set[Node] = field(default_factory=set, init=False)
+    _transitions: Set[Transition] = field(default_factory=set, init=False)
+
+    def __post_init__(self):
+        # Снимки наборов для читающих: строятся при первом чтении после изменения
+        self._nodes_snapshot: Optional[FrozenSet[Node]] = None
+        self._transitions_snapshot: Optional[FrozenSet[Transition]] = None
+        self._reindex_nodes()
+        self._reindex_transitions()
+
+    # Наружу отдаются неизменяемые снимки: выданный набор не меняется под читающим (отрисовкой)
+    @property
+    def nodes(self) -> FrozenSet[Node]:
+        if self._nodes_snapshot is None:
+            self._nodes_snapshot = frozenset(self._nodes)
+        return self._nodes_snapshot
+
+    @property
+    def transitions(self) -> FrozenSet[Transition]:
+        if self._transitions_snapshot is None:
+            self._transitions_snapshot = frozenset(self._transitions)
+        return self._transitions_snapshot
+
+    def replace_nodes(self, nodes: Iterable[Node]):
+        """Заменяет набор узлов целиком (импорт, редактор таблицы) и перестраивает сетку."""
+        self._nodes = set(nodes)
+        self._nodes_snapshot = None
+        self._reindex_nodes()
+        self.touch()
+
+    def replace_transitions(self, transitions: Iterable[Transition]):
+        """Заменяет набор переходов целиком и перестраивает индекс смежности."""
+        self._transitions = set(transitions)
+        self._transitions_snapshot = None
+        self._reindex_transitions()
+        self.touch()
+
+    def _reindex_nodes(self):
+        self._grid: Dict[Tuple[int, int], Set[Node]] = {}
+        self._node_cells: Dict[Node, Tuple[int, int]] = {}
+        for node in self._nodes:
+            self._grid_insert(node)
+
+    def _grid_insert(self, node: Node):
+        cell = _grid_cell(node.x, node.y)
+        self._node_cells[node] = cell
+        self._grid.setdefault(cell, set()).add(node)
+
+    def _grid_remove(self, node: Node):
+        cell = self._node_cells.pop(node)
+        self._grid[cell].discard(node)
+        if not self._grid[cell]:
+            del self._grid[cell]
+
+    def cells_in_box(self, x_min: float, y_min: float, x_max: float, y_max: float) -> Dict[Tuple[int, int], Set[Node]]:
+        """Непустые ячейки сетки, задевающие прямоугольник, с их узлами."""
+        (col_min, row_min), (col_max, row_max) = _grid_cell(x_min, y_min), _grid_cell(x_max, y_max)
+        if (col_max - col_min + 1) * (row_max - row_min + 1) > len(self._grid):
+            # Прямоугольник больше занятой части сетки — дешевле пройти по занятым ячейкам
+            return {
+                (col, row): nodes
+                for (col, row), nodes in self._grid.items()
+                if col_min <= col <= col_max and row_min <= row <= row_max
+            }
+        return {
+            (col, row): self._grid[col, row]
+            for col in range(col_min, col_max + 1)
+            for row in range(row_min, row_max + 1)
+            if (col, row) in self._grid
+        }
+
+    def nodes_near(self, x: float, y: float, radius: float) -> Set[Node]:
+        """Узлы из ячеек, покрывающих квадрат со стороной 2*radius вокруг точки (надмножество)."""
+        return set().union(*self.cells_in_box(x - radius, y - radius, x + radius, y + radius).values())
+
+    def cell_of(self, node: Node) -> Tuple[int, int]:
+        return self._node_cells[node]
+
+    def nodes_along(self, x1: float, y1: float, x2: float, y2: float, margin: float) -> Set[Node]:
+        """
+        Узлы, которые могут лежать ближе margin к отрезку (надмножество).
+        Перебираются только столбцы сетки вдоль отрезка и в каждом — ячейки,
+        через которые он проходит, так что работа пропорциональна длине отрезка.
+        """
+        if x1 > x2:
+            x1, y1, x2, y2 = x2, y2, x1, y1
+        result = set()
+        col_min, col_max = _grid_cell(x1 - margin, 0)[0], _grid_cell(x2 + margin, 0)[0]
+        for col in range(col_min, col_max + 1):
+            left = max(x1, col * GRID_CELL_SIZE - margin)
+            right = min(x2, (col + 1) * GRID_CELL_SIZE + margin)
+            if x1 == x2:
+                y_left, y_right = y1, y2
+            else:
+                slope = (y2 - y1) / (x2 - x1)
+                y_left, y_right = y1 + slope * (left - x1), y1 + slope * (right - x1)
+            row_min = _grid_cell(0, min(y_left, y_right) - margin)[1]
+            row_max = _grid_cell(0, max(y_left, y_right) + margin)[1]
+            for row in range(row_min, row_max + 1):
+                result |= self._grid.get((col, row), set())
+        return result
+
+    def _reindex_transitions(self):
+        self._out_edges: Dict[Node, Set[Transition]] = {}
+        self._in_edges: Dict[Node, Set[Transition]] = {}
+        self._edge_map: Dict[Tuple[Node, Node], Transition] = {}
+        for transition in self._transitions:
+            self._index_transition(transition)
+
+    def _index_transition(self, transition: Transition):
+        self._out_edges.setdefault(transition.start, set()).add(transition)
+        self._in_edges.setdefault(transition.end, set()).add(transition)
+        self._edge_map.setdefault((transition.start, transition.end), transition)
+
+    def _unindex_transition(self, transition: Transition):
+        self._out_edges[transition.start].discard(transition)
+        self._in_edges[transition.end].discard(transition)
+        pair = (transition.start, transition.end)
+        if self._edge_map.get(pair) is transition:
+            # Между парой узлов может быть несколько переходов — в карте остается любой другой
+            del self._edge_map[pair]
+            for other in self._out_edges[transition.start]:
+                if other.end is transition.end:
+                    self._edge_map[pair] = other
+                    break
+
+    def outgoing(self, node: Node) -> Set[Transition]:
+        return self._out_edges.get(node, set())
+
+    def incoming(self, node: Node) -> Set[Transition]:
+        return self._in_edges.get(node, set())
+
+    def transition_between(self, start: Node, end: Node) -> Transition:
+        return self._edge_map.get((start, end))
+
+    def touch(self):
+        """Вызывается после любого изменения автомата: сбрасывает кэш построений."""
+        self.revision += 1
+        self.cache.clear()
+
+    def cached(self, key, build):
+        if key not in self.cache:
+            self.cache[key] = build()
+        return self.cache[key]
+
+    def add_node(self, node: Node):
+        if node not in self._nodes:
+            self._nodes.add(node)
+            self._nodes_snapshot = None
+            self._grid_insert(node)
+        self.touch()
+
+    def remove_node(self, node: Node) -> Set[Transition]:
+        """Удаляет узел вместе с инцидентными переходами за один проход и возвращает их."""
+        incident = self.outgoing(node) | self.incoming(node)
+        if node in self._nodes:
+            self._nodes.discard(node)
+            self._nodes_snapshot = None
+            self._grid_remove(node)
+        if incident:
+            self._transitions -= incident
+            self._transitions_snapshot = None
+            # Все пары в карте ребер с этим узлом уходят целиком, замену искать не нужно
+            self._out_edges.pop(node, None)
+            self._in_edges.pop(node, None)
+            for transition in incident:
+                self._out_edges.get(transition.start, set()).discard(transition)
+                self._in_edges.get(transition.end, set()).discard(transition)
+                self._edge_map.pop((transition.start, transition.end), None)
+        self.touch()
+        return incident
+
+    def add_transition(self, transition: Transition):
+        self.add_transitions((transition,))
+
+    def add_transitions(self, transitions: Iterable[Transition]):
+        """Добавляет переходы пачкой (например, при отмене удаления узла) с одним сбросом кэша."""
+        for transition in transitions:
+            if transition not in self._transitions:
+                self._transitions.add(transition)
+                self._transitions_snapshot = None
+                self._index_transition(transition)
+        self.touch()
+
+    def remove_transition(self, transition: Transition):
+        if transition in self._transitions:
+            self._transitions.discard(transition)
+            self._transitions_snapshot = None
+            self._unindex_transition(transition)
+        self.touch()
+
+    def move_node(self, node: Node, x: float, y: float):
+        # Положение не влияет на автомат, кэш построений остается
+        node.x = x
+        node.y = y
+        if node in self._node_cells and self._node_cells[node] != _grid_cell(x, y):
+            self._grid_remove(node)
+            self._grid_insert(node)
 
     def get_final_states(self):
-        return set(filter(lambda node: node.type in (NodeType.FINAL, NodeType.START_FINAL), self.nodes))
+        return set(filter(lambda node: node.type in (NodeType.FINAL, NodeType.START_FINAL), self._nodes))
 
     def get_start_states(self):
-        return set(filter(lambda node: node.type in (NodeType.START, NodeType.START_FINAL), self.nodes))
+        return set(filter(lambda node: node.type in (NodeType.START, NodeType.START_FINAL), self._nodes))
@@ -1,38 +1,228 @@
-from graph import Graph
-from typing import List
-from copy import deepcopy
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Set, Tuple
+from graph import Graph, Node, Transition
+
+# Грубая оценка памяти записи: сама запись и каждый объект графа, который она удерживает
+ENTRY_BYTES = 64
+OBJECT_BYTES = 200
+
+
+class Edit(ABC):
+    """
+    Обратимое изменение графа. Хранит только дельту (ссылки на затронутые
+    узлы и переходы и старые/новые значения), а не снимок всего графа.
+    """
+
+    @abstractmethod
+    def do(self, app: Application):
+        ...
+
+    @abstractmethod
+    def undo(self, app: Application):
+        ...
+
+    def size(self) -> int:
+        return ENTRY_BYTES
+
+
+@dataclass
+class AddNode(Edit):
+    node: Node
+
+    def do(self, app):
+        app.graph.add_node(self.node)
+        app.graph.node_counter += 1
+
+    def undo(self, app):
+        app.graph.remove_node(self.node)
+        app.graph.node_counter -= 1
+
+
+@dataclass
+class RemoveNode(Edit):
+    node: Node
+    transitions: Set[Transition] = field(default_factory=set)
+
+    def do(self, app):
+        self.transitions = app.graph.remove_node(self.node)
+
+    def undo(self, app):
+        app.graph.add_node(self.node)
+        app.graph.add_transitions(self.transitions)
+
+    def size(self):
+        return ENTRY_BYTES + OBJECT_BYTES * (1 + len(self.transitions))
+
+
+@dataclass
+class AddTransition(Edit):
+    transition: Transition
+
+    def do(self, app):
+        app.graph.add_transition(self.transition)
+
+    def undo(self, app):
+        app.graph.remove_transition(self.transition)
+
+
+@dataclass
+class RemoveTransition(Edit):
+    transition: Transition
+
+    def do(self, app):
+        app.graph.remove_transition(self.transition)
+
+    def undo(self, app):
+        app.graph.add_transition(self.transition)
+
+    def size(self):
+        return ENTRY_BYTES + OBJECT_BYTES
+
+
+@dataclass
+class MoveNode(Edit):
+    node: Node
+    old: Tuple[float, float]
+    new: Tuple[float, float]
+
+    def do(self, app):
+        app.graph.move_node(self.node, *self.new)
+
+    def undo(self, app):
+        app.graph.move_node(self.node, *self.old)
+
+
+@dataclass
+class _ChangeField(Edit):
+    target: object
+    old: object
+    new: object
+    field_name = ""
+
+    def do(self, app):
+        setattr(self.target, self.field_name, self.new)
+        app.graph.touch()
+
+    def undo(self, app):
+        setattr(self.target, self.field_name, self.old)
+        app.graph.touch()
+
+
+class RenameNode(_ChangeField):
+    field_name = "name"
+
+
+class EditSymbols(_ChangeField):
+    field_name = "symbols"
+
+
+class ToggleType(_ChangeField):
+    field_name = "type"
+
+
+@dataclass
+class BulkReplace(Edit):
+    """Массовая замена переходов (редактор таблицы): добавленные узлы и оба набора переходов."""
+    added_nodes: Set[Node]
+    old_transitions: Set[Transition]
+    new_transitions: Set[Transition]
+
+    def do(self, app):
+        app.graph.replace_nodes(app.graph.nodes | self.added_nodes)
+        app.graph.replace_transitions(self.new_transitions)
+
+    def undo(self, app):
+        app.graph.replace_nodes(app.graph.nodes - self.added_nodes)
+        app.graph.replace_transitions(self.old_transitions)
+
+    def size(self):
+        objects = len(self.added_nodes) + len(self.old_transitions) + len(self.new_transitions)
+        return ENTRY_BYTES + OBJECT_BYTES * objects
+
+
+@dataclass
+class ReplaceGraph(Edit):
+    """Замена графа целиком (очистка, импорт): старый граф хранится по ссылке, без копии."""
+    old_graph: Graph
+    new_graph: Graph
+
+    def do(self, app):
+        app.graph = self.new_graph
+
+    def undo(self, app):
+        app.graph = self.old_graph
+
+    def size(self):
+        return ENTRY_BYTES + OBJECT_BYTES * (len(self.old_graph.nodes) + len(self.old_graph.transitions))
 
 
 class History:
-    graph_buffer: List[Graph]
-    temp_stash: List[Graph]
+    undo_stack: Deque[Edit]
+    redo_stack: Deque[Edit]
     max_count: int
+    max_bytes: int
+    used_bytes: int
 
-    def __init__(self, max_count: int = 30):
-        self.graph_buffer = []
-        self.temp_stash = []
+    def __init__(self, max_count: int = 1000, max_bytes: int = 16 * 1024 * 1024):
+        self.undo_stack = deque(maxlen=max_count)
+        self.redo_stack = deque(maxlen=max_count)
         self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
 
-    def add(self, action: Graph):
-        if len(self.graph_buffer) == self.max_count:
-            self.graph_buffer = self.graph_buffer[1:]
-        self.temp_stash = []
-        self.graph_buffer.append(deepcopy(action))
+    def apply(self, edit: Edit, app):
+        """
+        Выполняет изменение под блокировкой приложения и запоминает его.
+        Фоновая раскладка отменяется: после правки она не должна переставлять узлы.
+        """
+        from automata_visualizer import cancel_background_layout
+        with app.lock:
+            cancel_background_layout(app)
+            edit.do(app)
+            self.record(edit)
 
-    def undo_click(self, app):
-        if len(self.graph_buffer) == 0:
-            return
+    def record(self, edit: Edit):
+        """Запоминает уже выполненное изменение. Redo-ветка после нового изменения сбрасывается."""
+        for dropped in self.redo_stack:
+            self.used_bytes -= dropped.size()
+        self.redo_stack.clear()
 
-        self.temp_stash.append(deepcopy(app.graph))
-        app.graph = self.graph_buffer.pop()
-        from draw import draw_nodes
-        draw_nodes(app)
+        if len(self.undo_stack) == self.max_count:
+            self.used_bytes -= self.undo_stack.popleft().size()
+        self.undo_stack.append(edit)
+        self.used_bytes += edit.size()
+        while len(self.undo_stack) > 1 and self.used_bytes > self.max_bytes:
+            self.used_bytes -= self.undo_stack.popleft().size()
 
-    def redo_click(self, app):
-        if len(self.temp_stash) == 0:
+    def _move(self, source: Deque[Edit], target: Deque[Edit], app, undo: bool):
+        if len(source) == 0:
             return
 
-        self.graph_buffer.append(deepcopy(app.graph))
-        app.graph = self.temp_stash.pop()
+        edit = source.pop()
+        from automata_visualizer import cancel_background_layout
         from draw import draw_nodes
-        draw_nodes(app)
+        with app.lock:
+            cancel_background_layout(app)
+            # Размер записи может зависеть от состояния (RemoveNode запоминает переходы при do)
+            self.used_bytes -= edit.size()
+            if undo:
+                edit.undo(app)
+            else:
+                edit.do(app)
+            self.used_bytes += edit.size()
+            target.append(edit)
+
+            app.graph.selected_node = None
+            app.graph.selected_transition = None
+            app.graph.dragging_node = None
+            draw_nodes(app)
+
+    def undo_click(self, app):
+        self._move(self.undo_stack, self.redo_stack, app, undo=True)
+
+    def redo_click(self, app):
+        self._move(self.redo_stack, self.undo_stack, app, undo=False)
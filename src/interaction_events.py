@@ -7,6 +7,10 @@ from automata_operations import (
     nfa_to_regex_state_elimination,
 )
 from automata_io import load_automaton_from_json, save_automaton_to_json
+from batch_testing import run_batch
+from compiled_automaton import compile_from_ui
+from regex_matcher import matcher_from_ui
+from vectorized_dfa import vectorize_from_ui
 from draw import draw_nodes
 from flet import FilePicker
 from automata.fa.nfa import NFA
@@ -14,14 +18,17 @@ from automata.fa.dfa import DFA
 
 
 def handle_run(app: Application) -> None:
-    """Обработка слова с использованием automata-lib"""
-    if app.graph.get_start_states() == set():
+    """Обработка слова скомпилированным автоматом (битовые маски состояний) или матчером выражения"""
+    # Граф построен из регулярного выражения и не менялся (или не рисовался из-за размера):
+    # состояния ДКА строятся только вдоль слова
+    automaton = matcher_from_ui(app)
+    if automaton is None and app.graph.get_start_states() == set():
         app.ui.status_text.value = "Выберите хотя бы одно начальное сотояние"
         app.page.update()
         return
 
-    nfa = build_nfa_from_ui(app)
-    if nfa is None:
+    automaton = automaton or compile_from_ui(app)
+    if automaton is None:
         app.ui.status_text.value = "Автомат неполный — добавьте состояния!"
         app.page.update()
         return
@@ -31,13 +38,77 @@ def handle_run(app: Application) -> None:
         app.ui.status_text.value = "Введите слово!"
     else:
         try:
-            accepted = nfa.accepts_input(word)
+            accepted = automaton.accepts(word)
             app.ui.status_text.value = f"Слово '{word}' {'✅ принимается' if accepted else '❌ не принимается'} автоматом"
         except Exception as ex:
             app.ui.status_text.value = f"Ошибка при обработке слова: {ex}"
     app.page.update()
 
 
+def accepts_words(words, app: Application):
+    """
+    Программная пакетная проверка: массив bool (numpy) по списку слов
+    или None, если автомат не построен. Автомат детерминизируется один раз
+    и кэшируется до следующего изменения графа.
+    """
+    automaton = vectorize_from_ui(app)
+    if automaton is None:
+        return None
+    return automaton.accepts_batch(words)
+
+
+def run_batch_from_path(corpus_path: str, app: Application) -> None:
+    """Пакетная проверка слов из файла (по одному слову на строку)."""
+    automaton = compile_from_ui(app)
+    if automaton is None:
+        app.ui.status_text.value = "Автомат неполный — добавьте состояния!"
+        app.page.update()
+        return
+
+    result_path = f"{os.path.splitext(corpus_path)[0]}.results.txt" if app.ui.batch_save_results.value else None
+    app.ui.status_text.value = f"Пакетная проверка {corpus_path}..."
+    app.page.update()
+    # Корпус может быть большим: проверка идет в фоне, обработчик выбора файла не ждет.
+    # Поток получает свою копию: ленивый ДКА из кэша графа дорастает и в handle_run, и в отладчике
+    app.page.run_thread(_run_batch_in_background, automaton.private_copy(), corpus_path, result_path, app)
+
+
+def _run_batch_in_background(automaton, corpus_path: str, result_path: str | None, app: Application) -> None:
+    def report(progress) -> None:
+        app.ui.status_text.value = f"Пакетная проверка {corpus_path}: проверено {progress.total} слов..."
+        app.page.update()
+
+    try:
+        result = run_batch(automaton, corpus_path, result_path, progress=report)
+    except Exception as ex:
+        app.ui.status_text.value = f"Ошибка пакетной проверки: {ex}"
+    else:
+        app.ui.status_text.value = (
+            f"Проверено {result.total} слов: ✅ {result.accepted} принимается, ❌ {result.rejected} не принимается"
+            + (f". Результаты в {result_path}" if result_path else "")
+        )
+    app.page.update()
+
+
+def request_batch_file(app: Application) -> None:
+    """Открывает диалог выбора файла со словами для пакетной проверки."""
+    if app.ui.batch_file_picker is None:
+        app.ui.batch_file_picker = FilePicker(on_result=lambda e: handle_batch_file_result(e, app))
+        app.page.overlay.append(app.ui.batch_file_picker)
+
+    app.ui.batch_file_picker.pick_files(allow_multiple=False)
+
+
+def handle_batch_file_result(e, app: Application) -> None:
+    """Обрабатывает выбранный файл со словами."""
+    if not e.files:
+        app.ui.status_text.value = "Выбор файла отменен"
+        app.page.update()
+        return
+
+    run_batch_from_path(e.files[0].path, app)
+
+
 def handle_convert_to_regex(app: Application) -> None:
     """Конвертирует текущий автомат в регулярное выражение методом исключения состояний."""
     nfa = build_nfa_from_ui(app)
@@ -48,7 +119,7 @@ def handle_convert_to_regex(app: Application) -> None:
 
     try:
         clean_nfa = NFA.from_dfa(DFA.from_nfa(nfa).minify())
-        regex = nfa_to_regex_state_elimination(clean_nfa)
+        regex = nfa_to_regex_state_elimination(clean_nfa, app.config.elimination_heuristic)
     except Exception as ex:
         app.ui.status_text.value = f"Ошибка при конвертации в регулярное выражение: {ex}"
     else:
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import math
+from collections import OrderedDict, deque
+from threading import Lock
+from typing import Iterator, List, Optional, Sequence, Tuple
+import igraph as ig
+import numpy as np
+
+LAYOUT_ALGORITHMS = ("auto", "sugiyama", "drl", "fr", "circle")
+LAYOUT_CACHE_SIZE = 32
+# Граница, до которой ДКА раскладывается по слоям, а граф — точным методом Фрухтермана — Рейнгольда
+SUGIYAMA_MAX_STATES = 300
+FR_EXACT_MAX_STATES = 500
+# Грубые оценки времени (секунды) на единицу работы, снятые на igraph:
+# точный FR — пары вершин на итерацию, Сугияма — пары вершин на итерацию упорядочивания
+FR_SECONDS_PER_PAIR_ITERATION = 3e-9
+SUGIYAMA_SECONDS_PER_PAIR_ITERATION = 2e-8
+# Фоновое уточнение FR идет порциями, между порциями позиции показываются пользователю
+REFINE_CHUNKS = 10
+
+Edge = Tuple[int, int]
+
+# Раскладки по структуре графа (число вершин, ребра, алгоритм); координаты ещё не вписаны в кадр
+_layout_cache: OrderedDict = OrderedDict()
+# Кэш читается из UI и пишется фоновой раскладкой
+_cache_lock = Lock()
+
+
+def _iterations(seconds_per_unit: float, units: float, budget: float, low: int, high: int) -> int:
+    """Сколько итераций укладывается в бюджет времени (но не меньше low и не больше high)."""
+    return max(low, min(high, int(budget / (seconds_per_unit * max(units, 1)))))
+
+
+def choose_algorithm(vertex_count: int, deterministic: bool) -> str:
+    """
+    Автовыбор: ДКА средних размеров — по слоям (Сугияма), остальные —
+    силовой раскладкой; для больших графов FR считается по сетке.
+    """
+    if vertex_count <= 2:
+        return "circle"
+    if deterministic and vertex_count <= SUGIYAMA_MAX_STATES:
+        return "sugiyama"
+    return "fr"
+
+
+def _run(algorithm: str, graph: ig.Graph, budget: float) -> List[Tuple[float, float]]:
+    count = graph.vcount()
+    match algorithm:
+        case "sugiyama":
+            maxiter = _iterations(SUGIYAMA_SECONDS_PER_PAIR_ITERATION, count ** 2, budget, 5, 100)
+            coords = graph.layout_sugiyama(maxiter=maxiter).coords[:count]
+            # Слои идут сверху вниз, а канвас шире, чем выше: кладем слои слева направо
+            return [(y, x) for x, y in coords]
+        case "drl":
+            return graph.layout_drl().coords
+        case "fr":
+            if count > FR_EXACT_MAX_STATES:
+                return graph.layout_fruchterman_reingold(niter=100, grid=True).coords
+            niter = _iterations(FR_SECONDS_PER_PAIR_ITERATION, count ** 2, budget, 50, 500)
+            return graph.layout_fruchterman_reingold(niter=niter).coords
+        case _:
+            return graph.layout_circle().coords
+
+
+def circle_layout(vertex_count: int) -> np.ndarray:
+    angles = np.arange(vertex_count) / max(vertex_count, 1) * 2 * math.pi
+    return np.stack((np.cos(angles), np.sin(angles)), axis=1)
+
+
+def compute_layout(vertex_count: int, edges: Sequence[Edge], algorithm: str = "auto",
+                   deterministic: bool = False, *, time_budget: float) -> np.ndarray:
+    """
+    Координаты вершин, массив формы (vertex_count, 2) в произвольном масштабе.
+    Число итераций подбирается под time_budget (секунды, из ApplicatonConfig.layout_time_budget).
+    Если алгоритм упал, вершины расставляются по кругу. Результат кэшируется по структуре графа.
+    """
+    if algorithm not in LAYOUT_ALGORITHMS:
+        raise ValueError(f"Неизвестный алгоритм раскладки: {algorithm}")
+    if algorithm == "auto":
+        algorithm = choose_algorithm(vertex_count, deterministic)
+
+    key = _cache_key(vertex_count, edges, algorithm)
+    with _cache_lock:
+        if key in _layout_cache:
+            _layout_cache.move_to_end(key)
+            return _layout_cache[key]
+
+    try:
+        graph = ig.Graph(n=vertex_count, edges=list(key[1]), directed=True)
+        coords = np.array(_run(algorithm, graph, time_budget), dtype=float).reshape(vertex_count, 2)
+    except Exception:
+        coords = circle_layout(vertex_count)
+
+    _remember(key, coords)
+    return coords
+
+
+def _cache_key(vertex_count: int, edges: Sequence[Edge], algorithm: str) -> tuple:
+    # Петли и кратные ребра на раскладку не влияют
+    edges = tuple(sorted({(start, end) for start, end in edges if start != end}))
+    return vertex_count, edges, algorithm
+
+
+def _remember(key: tuple, coords: np.ndarray):
+    with _cache_lock:
+        _layout_cache[key] = coords
+        if len(_layout_cache) > LAYOUT_CACHE_SIZE:
+            _layout_cache.popitem(last=False)
+
+
+def cached_layout(vertex_count: int, edges: Sequence[Edge], algorithm: str = "auto",
+                  deterministic: bool = False) -> Optional[np.ndarray]:
+    """Готовая раскладка из кэша или None, если граф с такой структурой еще не раскладывался."""
+    if algorithm == "auto":
+        algorithm = choose_algorithm(vertex_count, deterministic)
+    key = _cache_key(vertex_count, edges, algorithm)
+    with _cache_lock:
+        return _layout_cache.get(key)
+
+
+def bfs_layers_layout(vertex_count: int, edges: Sequence[Edge], roots: Sequence[int]) -> np.ndarray:
+    """
+    Быстрая начальная раскладка за O(V + E): слои обхода в ширину от roots
+    идут слева направо, внутри слоя вершины стоят столбцом по центру.
+    Недостижимые вершины обходятся от себя и добавляются следующими слоями.
+    """
+    neighbours = [[] for _ in range(vertex_count)]
+    for start, end in edges:
+        neighbours[start].append(end)
+
+    layer = [-1] * vertex_count
+    depth = 0
+    for root in [*roots, *range(vertex_count)]:
+        if layer[root] != -1:
+            continue
+        layer[root] = depth
+        queue = deque([root])
+        while queue:
+            vertex = queue.popleft()
+            depth = max(depth, layer[vertex] + 1)
+            for end in neighbours[vertex]:
+                if layer[end] == -1:
+                    layer[end] = layer[vertex] + 1
+                    queue.append(end)
+
+    sizes = [0] * (depth + 1)
+    coords = np.zeros((vertex_count, 2))
+    for vertex in range(vertex_count):
+        coords[vertex] = layer[vertex], sizes[layer[vertex]]
+        sizes[layer[vertex]] += 1
+    for vertex in range(vertex_count):
+        coords[vertex, 1] -= (sizes[layer[vertex]] - 1) / 2
+    return coords
+
+
+def refine_layout(initial: np.ndarray, edges: Sequence[Edge],
+                  time_budget: float) -> Iterator[np.ndarray]:
+    """
+    Уточняет раскладку методом Фрухтермана — Рейнгольда порциями, начиная с initial.
+    После каждой порции отдает текущие координаты. Начальные температуры порций идут
+    по одной линейной шкале охлаждения, но внутри каждого вызова igraph снижает температуру
+    до нуля, так что в целом охлаждение пилообразное, а не как в одном прогоне FR.
+    Итог попадает в кэш как раскладка "fr".
+    """
+    vertex_count = len(initial)
+    key = _cache_key(vertex_count, edges, "fr")
+    graph = ig.Graph(n=vertex_count, edges=list(key[1]), directed=True)
+    if vertex_count > FR_EXACT_MAX_STATES:
+        niter, grid = 100, True
+    else:
+        niter = _iterations(FR_SECONDS_PER_PAIR_ITERATION, vertex_count ** 2, time_budget, 50, 500)
+        grid = False
+
+    coords = np.asarray(initial, dtype=float)
+    start_temp = math.sqrt(vertex_count) / 10
+    for chunk in range(REFINE_CHUNKS):
+        temperature = start_temp * (1 - chunk / REFINE_CHUNKS)
+        coords = np.array(graph.layout_fruchterman_reingold(
+            seed=coords.tolist(), niter=max(1, niter // REFINE_CHUNKS),
+            start_temp=temperature, grid=grid,
+        ).coords, dtype=float).reshape(vertex_count, 2)
+        yield coords
+
+    _remember(key, coords)
+
+
+def fit_to_frame(coords: np.ndarray, x: float, y: float, width: float, height: float) -> np.ndarray:
+    """Вписывает координаты в прямоугольник; вырожденная ось ставится по его центру."""
+    if len(coords) == 0:
+        return coords
+    low = coords.min(axis=0)
+    span = coords.max(axis=0) - low
+    frame = np.array([width, height], dtype=float)
+    scaled = np.where(span > 0, (coords - low) / np.where(span > 0, span, 1) * frame, frame / 2)
+    return scaled + np.array([x, y], dtype=float)
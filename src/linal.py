@@ -1,9 +1,11 @@
+import numpy as np
 from graph import Transition, Node
 from dataclasses import dataclass
 from math import sqrt, atan2, sin, cos
 
 
-@dataclass
+# Слоты: вектор создается на каждую арифметическую операцию в циклах отрисовки
+@dataclass(slots=True)
 class Vector2D:
     x: float
     y: float
@@ -15,7 +17,7 @@ class Vector2D:
         return Vector2D.from_node(transition.end) - Vector2D.from_node(transition.start)
 
     def from_phi_r(phi, r):
-        return Vector2D(r, 0).turned(phi)
+        return Vector2D(r * cos(phi), r * sin(phi))
 
     def to_tuple(self):
         return (self.x, self.y)
@@ -27,12 +29,15 @@ class Vector2D:
         return sqrt(self.x ** 2 + self.y ** 2)
 
     def normalized(self):
-        return Vector2D(self.x, self.y) / self.length()
+        length = sqrt(self.x ** 2 + self.y ** 2)
+        return Vector2D(self.x / length, self.y / length)
 
     def turned(self, radians):
-        new_phi = self.phi() + radians
-        length = self.length()
-        return Vector2D(length * cos(new_phi), length * sin(new_phi))
+        return self.rotated(cos(radians), sin(radians))
+
+    def rotated(self, cos_phi, sin_phi):
+        """Поворот с заранее посчитанными косинусом и синусом угла."""
+        return Vector2D(self.x * cos_phi - self.y * sin_phi, self.x * sin_phi + self.y * cos_phi)
 
     def perpendicular(self):
         return Vector2D(-self.y, self.x)
@@ -64,3 +69,22 @@ class Vector2D:
 def dot_product(v1: Vector2D, v2: Vector2D) -> float:
     return v1.x * v2.x + v1.y * v2.y
 
+
+def rotation(radians: float) -> tuple:
+    """Косинус и синус угла для Vector2D.rotated и rotate_batch."""
+    return cos(radians), sin(radians)
+
+
+def normalize_batch(vectors: np.ndarray) -> np.ndarray:
+    """Нормирует строки массива формы (n, 2)."""
+    return vectors / np.hypot(vectors[:, 0], vectors[:, 1])[:, None]
+
+
+def rotate_batch(vectors: np.ndarray, cos_phi, sin_phi) -> np.ndarray:
+    """Поворачивает строки массива формы (n, 2); угол общий или свой для каждой строки."""
+    x, y = vectors[:, 0], vectors[:, 1]
+    return np.stack((x * cos_phi - y * sin_phi, x * sin_phi + y * cos_phi), axis=1)
+
+
+def perpendicular_batch(vectors: np.ndarray) -> np.ndarray:
+    return np.stack((-vectors[:, 1], vectors[:, 0]), axis=1)
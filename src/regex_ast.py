@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import weakref
+from itertools import count
+from typing import Set, Tuple
+from application_state import EPSILON_SYMBOL
+
+EMPTY_SET_SYMBOL = "∅"
+# Операторы automata-lib, которых нет в этом синтаксисе: parse отвергает их, а не читает как символы
+UNSUPPORTED_OPERATORS = frozenset("&.^{}[]")
+
+# Все узлы хэш-консятся: структурно равные выражения — один и тот же объект
+_table: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+_serial = count()
+
+
+class Regex:
+    """
+    Узел регулярного выражения. Создается только через конструкторы ниже
+    (symbol, union, concat, star, EPSILON, EMPTY), поэтому равенство и хэш — по ссылке.
+    """
+    __slots__ = ("children", "char", "nullable", "size", "order", "__weakref__")
+
+    children: Tuple[Regex, ...]
+    char: str
+    # Принимает ли выражение пустое слово
+    nullable: bool
+    # Размер выражения: символы и операторы без скобок (общие подвыражения считаются каждый раз)
+    size: int
+    # Порядок создания: по нему упорядочиваются альтернативы, чтобы a|b и b|a совпадали
+    order: int
+
+    def __repr__(self):
+        return f"{type(self).__name__}({to_string(self)!r})"
+
+
+class Empty(Regex):
+    __slots__ = ()
+
+
+class Epsilon(Regex):
+    __slots__ = ()
+
+
+class Symbol(Regex):
+    __slots__ = ()
+
+
+class Union(Regex):
+    __slots__ = ()
+
+
+class Concat(Regex):
+    __slots__ = ()
+
+
+class Star(Regex):
+    __slots__ = ()
+
+
+def _intern(kind: type, children: Tuple[Regex, ...] = (), char: str = "") -> Regex:
+    key = (kind, char, children)
+    node = _table.get(key)
+    if node is not None:
+        return node
+
+    node = kind()
+    node.children = children
+    node.char = char
+    node.order = next(_serial)
+    if kind is Union:
+        node.nullable = any(child.nullable for child in children)
+        node.size = sum(child.size for child in children) + len(children) - 1
+    elif kind is Concat:
+        node.nullable = all(child.nullable for child in children)
+        node.size = sum(child.size for child in children)
+    else:
+        node.nullable = kind in (Epsilon, Star)
+        node.size = 1 + sum(child.size for child in children)
+    _table[key] = node
+    return node
+
+
+EMPTY = _intern(Empty)
+EPSILON = _intern(Epsilon)
+
+
+def symbol(char: str) -> Regex:
+    return _intern(Symbol, char=char)
+
+
+def union(*items: Regex) -> Regex:
+    """Альтернатива: вложенные объединения раскрываются, ∅ и повторы отбрасываются, ε|X* -> X*, ε|XX* -> X*."""
+    flat = {}
+    for item in items:
+        for child in item.children if isinstance(item, Union) else (item,):
+            if child is not EMPTY:
+                flat[child] = None
+
+    if EPSILON in flat:
+        for child in list(flat):
+            if _is_plus(child):
+                del flat[child]
+                flat[child.children[-1]] = None
+        if any(child.nullable for child in flat if child is not EPSILON):
+            del flat[EPSILON]
+
+    if not flat:
+        return EMPTY
+    if len(flat) == 1:
+        return next(iter(flat))
+    return _intern(Union, tuple(sorted(flat, key=lambda child: child.order)))
+
+
+def _is_plus(regex: Regex) -> bool:
+    """Имеет ли выражение вид XX*."""
+    if not isinstance(regex, Concat) or not isinstance(regex.children[-1], Star):
+        return False
+    return regex.children[-1].children[0] is concat(*regex.children[:-1])
+
+
+def concat(*parts: Regex) -> Regex:
+    """Конкатенация: ∅ поглощает все, ε отбрасывается, вложенные конкатенации раскрываются."""
+    flat = []
+    for part in parts:
+        if part is EMPTY:
+            return EMPTY
+        if part is not EPSILON:
+            flat.extend(part.children if isinstance(part, Concat) else (part,))
+
+    if not flat:
+        return EPSILON
+    if len(flat) == 1:
+        return flat[0]
+    return _intern(Concat, tuple(flat))
+
+
+def star(inner: Regex) -> Regex:
+    """Звезда Клини: ∅* = ε* = ε, X** = X*, (ε|X)* = X*."""
+    if inner is EMPTY or inner is EPSILON:
+        return EPSILON
+    if isinstance(inner, Star):
+        return inner
+    if isinstance(inner, Union) and EPSILON in inner.children:
+        return star(union(*(child for child in inner.children if child is not EPSILON)))
+    return _intern(Star, (inner,))
+
+
+def symbols_of(regex: Regex) -> Set[str]:
+    """Алфавит выражения: символы всех листьев (ε и ∅ символами не считаются)."""
+    seen, stack, result = set(), [regex], set()
+    while stack:
+        node = stack.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        if isinstance(node, Symbol):
+            result.add(node.char)
+        stack.extend(node.children)
+    return result
+
+
+def _needs_parens(child: Regex, parent: Regex) -> bool:
+    if isinstance(parent, Concat):
+        return isinstance(child, Union)
+    if isinstance(parent, Star):
+        return isinstance(child, (Union, Concat)) or (isinstance(child, Symbol) and len(child.char) > 1)
+    return False
+
+
+def to_string(regex: Regex) -> str:
+    """
+    Строка выражения. Строится один раз в конце; общие подвыражения
+    рендерятся единожды. Обход без рекурсии — глубина не ограничена.
+    """
+    rendered = {}
+    stack = [regex]
+    while stack:
+        node = stack[-1]
+        if node in rendered:
+            stack.pop()
+            continue
+        pending = [child for child in node.children if child not in rendered]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+
+        parts = [
+            f"({rendered[child]})" if _needs_parens(child, node) else rendered[child]
+            for child in node.children
+        ]
+        if isinstance(node, Symbol):
+            rendered[node] = node.char
+        elif isinstance(node, Epsilon):
+            rendered[node] = EPSILON_SYMBOL
+        elif isinstance(node, Empty):
+            rendered[node] = EMPTY_SET_SYMBOL
+        elif isinstance(node, Union):
+            rendered[node] = "|".join(parts)
+        elif isinstance(node, Concat):
+            rendered[node] = "".join(parts)
+        else:
+            rendered[node] = f"{parts[0]}*"
+    return rendered[regex]
+
+
+def parse(text: str) -> Regex:
+    """
+    Разбор строки выражения (|, конкатенация, *, +, ?, скобки, ε, ∅; прочие знаки — символы).
+    Узлы строятся конструкторами выше, поэтому разбор сразу упрощает выражение
+    снизу вверх за один проход. Скобки разбираются без рекурсии.
+    """
+    # Для каждой открытой скобки: уже законченные альтернативы и текущая конкатенация
+    frames = [([], [])]
+    for position, char in enumerate(text):
+        alternatives, sequence = frames[-1]
+        if char == "(":
+            frames.append(([], []))
+        elif char == ")":
+            if len(frames) == 1:
+                raise ValueError(f"Лишняя закрывающая скобка в позиции {position}")
+            frames.pop()
+            frames[-1][1].append(union(*alternatives, concat(*sequence)))
+        elif char == "|":
+            alternatives.append(concat(*sequence))
+            sequence.clear()
+        elif char in "*+?":
+            if not sequence:
+                raise ValueError(f"Оператору {char} не к чему применяться в позиции {position}")
+            if char == "*":
+                sequence[-1] = star(sequence[-1])
+            elif char == "+":
+                sequence[-1] = concat(sequence[-1], star(sequence[-1]))
+            else:
+                sequence[-1] = union(EPSILON, sequence[-1])
+        elif char in UNSUPPORTED_OPERATORS:
+            raise ValueError(f"Оператор {char} не поддерживается (позиция {position})")
+        elif char == EPSILON_SYMBOL:
+            sequence.append(EPSILON)
+        elif char == EMPTY_SET_SYMBOL:
+            sequence.append(EMPTY)
+        elif not char.isspace():
+            sequence.append(symbol(char))
+
+    if len(frames) != 1:
+        raise ValueError("Не закрыта скобка")
+    alternatives, sequence = frames[0]
+    return union(*alternatives, concat(*sequence))
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from typing import Dict
+from automata.fa.dfa import DFA
+from regex_ast import EMPTY, EPSILON, Concat, Empty, Epsilon, Regex, Star, Symbol, Union, concat, parse, symbols_of, union
+
+MATCHER_CACHE_SIZE = 16
+# Больше состояний граф по выражению не строится: слова проверяются только матчером
+MAX_GRAPH_STATES = 300
+# Ключ в кэше построений графа: матчер живет, пока граф не изменен (Graph.touch сбрасывает кэш)
+MATCHER_KEY = ("regex_matcher",)
+
+# Матчеры по канонической форме выражения: (a|b)* и (b|a)* — один матчер с общими состояниями
+_matchers: OrderedDict = OrderedDict()
+
+
+def derivative(regex: Regex, char: str) -> Regex:
+    """Производная Бжозовского по символу. Дерево обходится без рекурсии."""
+    done: Dict[Regex, Regex] = {}
+    stack = [regex]
+    while stack:
+        node = stack[-1]
+        if node in done:
+            stack.pop()
+            continue
+
+        needed = node.children
+        if isinstance(node, Concat):
+            # Дальше первого необнуляемого сомножителя производная не заглядывает
+            count = next((ind + 1 for ind, child in enumerate(needed) if not child.nullable), len(needed))
+            needed = needed[:count]
+        pending = [child for child in needed if child not in done]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+
+        if isinstance(node, Symbol):
+            done[node] = EPSILON if node.char == char else EMPTY
+        elif isinstance(node, (Empty, Epsilon)):
+            done[node] = EMPTY
+        elif isinstance(node, Union):
+            done[node] = union(*(done[child] for child in node.children))
+        elif isinstance(node, Star):
+            done[node] = concat(done[node.children[0]], node)
+        else:
+            done[node] = union(*(
+                concat(done[child], *node.children[ind + 1:])
+                for ind, child in enumerate(needed)
+            ))
+    return done[regex]
+
+
+class DerivativeMatcher:
+    """
+    Ленивый ДКА по производным: состояние — канонический узел regex_ast, переход
+    по символу — производная. Состояния строятся только вдоль проверяемых слов и запоминаются.
+    """
+
+    def __init__(self, regex: Regex):
+        self.start = regex
+        self.transitions: Dict[Regex, Dict[str, Regex]] = {regex: {}}
+
+    @property
+    def state_count(self) -> int:
+        return len(self.transitions)
+
+    def step(self, state: Regex, char: str) -> Regex:
+        row = self.transitions[state]
+        target = row.get(char)
+        if target is None:
+            target = row[char] = derivative(state, char)
+            self.transitions.setdefault(target, {})
+        return target
+
+    def accepts(self, word: str) -> bool:
+        state = self.start
+        for char in word:
+            state = self.step(state, char)
+            if state is EMPTY:
+                return False
+        return state.nullable
+
+
+def compile_regex(text: str) -> DerivativeMatcher:
+    """Матчер для строки выражения; ValueError, если синтаксис не разбирается (см. regex_ast.parse)."""
+    regex = parse(text)
+    if regex in _matchers:
+        _matchers.move_to_end(regex)
+        return _matchers[regex]
+
+    matcher = _matchers[regex] = DerivativeMatcher(regex)
+    if len(_matchers) > MATCHER_CACHE_SIZE:
+        _matchers.popitem(last=False)
+    return matcher
+
+
+def build_dfa(matcher: DerivativeMatcher, max_states: int = MAX_GRAPH_STATES) -> DFA | None:
+    """
+    Полный ДКА по производным (для графа на холсте), обход в ширину по алфавиту выражения.
+    Найденные состояния остаются в матчере. None, если состояний больше max_states:
+    обход обрывается, не достраивая автомат.
+    """
+    alphabet = sorted(symbols_of(matcher.start))
+    index = {matcher.start: 0}
+    queue = deque([matcher.start])
+    while queue:
+        state = queue.popleft()
+        for char in alphabet:
+            target = matcher.step(state, char)
+            if target not in index:
+                if len(index) == max_states:
+                    return None
+                index[target] = len(index)
+                queue.append(target)
+
+    return DFA(
+        states=set(index.values()),
+        input_symbols=set(alphabet),
+        transitions={
+            number: {char: index[matcher.transitions[state][char]] for char in alphabet}
+            for state, number in index.items()
+        },
+        initial_state=0,
+        final_states={number for state, number in index.items() if state.nullable},
+    )
+
+
+def attach_matcher(graph, matcher: DerivativeMatcher) -> None:
+    """Запоминает, что граф построен из этого выражения (до первого изменения графа)."""
+    graph.cache[MATCHER_KEY] = matcher
+
+
+def matcher_from_ui(app: Application) -> DerivativeMatcher | None:
+    return app.graph.cache.get(MATCHER_KEY)
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import math
+from typing import Dict, Hashable, List, Set, Tuple
+from graph import GRID_CELL_SIZE
+
+Box = Tuple[float, float, float, float]
+
+
+class BoxGrid:
+    """
+    Равномерная сетка ограничивающих прямоугольников (x_min, y_min, x_max, y_max).
+    Элемент регистрируется во всех ячейках, которые задевает его прямоугольник,
+    поэтому запрос точки смотрит только одну ячейку.
+    """
+
+    def __init__(self, cell_size: float = GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], Set[Hashable]] = {}
+        self._items: Dict[Hashable, Tuple[Box, List[Tuple[int, int]]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item) -> bool:
+        return item in self._items
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def insert(self, item: Hashable, box: Box) -> None:
+        self.remove(item)
+        col_min, row_min = self._cell(box[0], box[1])
+        col_max, row_max = self._cell(box[2], box[3])
+        cells = [
+            (col, row)
+            for col in range(col_min, col_max + 1)
+            for row in range(row_min, row_max + 1)
+        ]
+        for cell in cells:
+            self._cells.setdefault(cell, set()).add(item)
+        self._items[item] = (box, cells)
+
+    def remove(self, item: Hashable) -> None:
+        entry = self._items.pop(item, None)
+        if entry is None:
+            return
+        for cell in entry[1]:
+            self._cells[cell].discard(item)
+            if not self._cells[cell]:
+                del self._cells[cell]
+
+    def clear(self) -> None:
+        self._cells.clear()
+        self._items.clear()
+
+    def query(self, x: float, y: float) -> Set[Hashable]:
+        """Элементы, чей прямоугольник содержит точку."""
+        result = set()
+        for item in self._cells.get(self._cell(x, y), ()):
+            x_min, y_min, x_max, y_max = self._items[item][0]
+            if x_min <= x <= x_max and y_min <= y <= y_max:
+                result.add(item)
+        return result
@@ -1,6 +1,7 @@
 import flet as ft
 from automata_operations import build_nfa_from_ui
 from graph import Transition, Node
+from graph_history import BulkReplace
 from application_state import EPSILON_SYMBOL
 
 CHELKA = 450 
@@ -161,8 +162,6 @@ class TableEditor:
             self.refresh_ui()
 
     def apply_changes(self, e):
-        self.app.history.add(self.app.graph)
-        
         for state in self.states:
             for sym in self.symbols:
                 tf = self.cell_fields.get((state, sym))
@@ -174,12 +173,14 @@ class TableEditor:
                     self.app.page.update()
                     return
 
-        current_node_names = {n.name for n in self.app.graph.nodes}
+        nodes_by_name = {n.name: n for n in self.app.graph.nodes}
+        added_nodes = set()
         for i, s_name in enumerate(self.states):
-            if s_name not in current_node_names:
-                self.app.graph.nodes.add(Node(x=150 + i*30, y=150 + i*30, name=s_name))
+            if s_name not in nodes_by_name:
+                node = Node(x=150 + i*30, y=150 + i*30, name=s_name)
+                nodes_by_name[s_name] = node
+                added_nodes.add(node)
 
-        self.app.graph.transitions.clear()
         pair_symbols = {}
         for state in self.states:
             for sym in self.symbols:
@@ -191,11 +192,13 @@ class TableEditor:
                 for t in targets:
                     pair_symbols.setdefault((state, t), set()).add(nfa_sym)
 
-        for (start_n, end_n), sym_set in pair_symbols.items():
-            start_node = next(n for n in self.app.graph.nodes if n.name == start_n)
-            end_node = next(n for n in self.app.graph.nodes if n.name == end_n)
-            symbols_str = "".join(sorted(sym_set))
-            self.app.graph.transitions.add(Transition(start=start_node, end=end_node, symbols=symbols_str))
+        new_transitions = {
+            Transition(start=nodes_by_name[start_n], end=nodes_by_name[end_n], symbols="".join(sorted(sym_set)))
+            for (start_n, end_n), sym_set in pair_symbols.items()
+        }
+
+        edit = BulkReplace(added_nodes, set(self.app.graph.transitions), new_transitions)
+        self.app.history.apply(edit, self.app)
 
         self.app.attr.alphabet = {s for s in self.symbols if s != EPSILON_SYMBOL}
         from draw import draw_nodes
@@ -17,14 +17,32 @@ class Vector2D:
 def dot_product(v1: Vector2D, v2: Vector2D) -> float: pass
 
 
+# --- regex_ast.py ---
+# Регулярные выражения как хэш-консированное дерево: сравнение по ссылке.
+def symbol(char: str) -> 'Regex': pass
+def union(*items: 'Regex') -> 'Regex': pass
+def concat(*parts: 'Regex') -> 'Regex': pass
+def star(inner: 'Regex') -> 'Regex': pass
+def to_string(regex: 'Regex') -> str: pass
+def parse(text: str) -> 'Regex': pass
+def symbols_of(regex: 'Regex') -> set: pass
+
+
+# --- regex_matcher.py ---
+# Ленивый ДКА по производным Бжозовского: проверяется сравнением с NFA.from_regex.
+def derivative(regex: 'Regex', char: str) -> 'Regex': pass
+def compile_regex(text: str) -> 'DerivativeMatcher': pass
+class DerivativeMatcher:
+    def accepts(self, word: str) -> bool: pass
+    def state_count(self) -> int: pass
+# Полный ДКА для графа на холсте; None, если состояний больше max_states.
+def build_dfa(matcher: 'DerivativeMatcher', max_states: int = 300) -> 'DFA': pass
+
+
 # --- automata_operations.py ---
-# Работа со строками (регулярными выражениями).
-def _is_wrapped(regex: str) -> bool: pass
-def _wrap_if_needed(regex: str) -> str: pass
-def _union_regex(left: str | None, right: str | None) -> str | None: pass
-def _concat_regex(*parts: str | None) -> str | None: pass
-# Если в файле присутствует алгоритм исключения состояний:
-def nfa_to_regex_state_elimination(nfa) -> str: pass 
+# Алгоритм исключения состояний:
+def nfa_to_regex_state_elimination(nfa, heuristic: str = "delgado_morais") -> str: pass
+def simplify_regex(regex: str) -> str: pass
 
 
 # --- debug.py ---
@@ -57,9 +75,9 @@ class Graph:
 
 
 # --- graph_history.py ---
-# Тестирование буфера кольцевой истории (добавление, сдвиг при max_count).
+# Тестирование истории изменений (запись дельт, вытеснение по max_count и max_bytes).
 class History:
-    def add(self, action: Graph) -> None: pass
+    def record(self, edit: 'Edit') -> None: pass
     # Методы undo_click/redo_click тестировать сложнее из-за вызова draw_nodes(app)
 
 
@@ -74,7 +92,6 @@ class History:
 # Аналитическая геометрия: проекции точек, пересечения, радиусы.
 def get_clicked_node(click: Vector2D, app: 'Application') -> 'Node': pass
 def get_clicked_transition(click: Vector2D, app: 'Application') -> 'Transition': pass
-def check_self_transition(click: Vector2D, transition: 'Transition', app: 'Application') -> bool: pass
 
 
 # --- canvas_events.py ---
@@ -83,12 +100,14 @@ def _is_inside_canvas(point: Vector2D, app: 'Application') -> bool: pass
 def _event_point(e) -> Vector2D: pass # Проверка маппинга координат из события Flet
 
 
-# --- edit_events.py ---
-# Математическое масштабирование координат всех узлов графа.
-def _scale_graph_positions(app: 'Application', old_scale: float, new_scale: float) -> None: pass
+# --- geometry.py (вид) ---
+# Преобразование вида: экран <-> модель, зум и сдвиг не меняют координаты узлов.
+def view_of(app: 'Application') -> 'View': pass
 
 
-# --- draw.py ---
-# Из модуля рисования можно тестировать чисто математические функции расчетов
-# (если они вынесены из функций, напрямую генерирующих объекты ft.canvas).
-def is_line_intersecting_node(start_p: Vector2D, end_p: Vector2D, app: 'Application') -> bool: pass
\ No newline at end of file
+# --- geometry.py ---
+# Геометрия переходов, общая для отрисовки (draw.py) и проверки кликов (canvas_utils.py).
+def is_line_intersecting_node(start_p: Vector2D, end_p: Vector2D, app: 'Application') -> bool: pass
+def loop_geometry(point: Vector2D, node_radius: float, taken: set) -> 'LoopGeometry': pass
+def line_geometry(start: Vector2D, end: Vector2D, double: bool, node_radius: float) -> 'LineGeometry': pass
+def curve_geometry(start: Vector2D, end: Vector2D, node_radius: float) -> 'CurveGeometry': pass
\ No newline at end of file
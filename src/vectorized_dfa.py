@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import numpy as np
+from collections import defaultdict, deque
+from typing import Dict, List, Sequence
+from compiled_automaton import CompiledAutomaton, compile_from_ui
+
+# Ограничение на число состояний при детерминизации НКА
+MAX_DFA_STATES = 100_000
+
+
+class VectorizedDFA:
+    """
+    ДКА в виде матрицы переходов int32 формы [состояния, символы + 1].
+    Состояние 0 — поглощающий тупик, последний столбец — «символ вне алфавита».
+    Слова одинаковой длины прогоняются вместе: один gather по матрице на позицию.
+    """
+
+    def __init__(self, matrix: np.ndarray, symbols: Sequence[str], start: int, final: np.ndarray):
+        self.matrix = matrix
+        self.symbols = list(symbols)
+        self.start = start
+        self.final = final
+
+        # Слова читаются посимвольно, столбец ищется по коду символа: длинным символам места нет
+        long_symbols = [symbol for symbol in self.symbols if len(symbol) != 1]
+        if long_symbols:
+            raise ValueError(f"Символы алфавита должны быть одиночными знаками: {long_symbols}")
+
+        # Таблица «код символа -> столбец»; всё, что за её пределами, — неизвестный символ
+        unknown = len(self.symbols)
+        max_code = max((ord(symbol) for symbol in self.symbols), default=0)
+        self._lookup = np.full(max_code + 2, unknown, dtype=np.int32)
+        for column, symbol in enumerate(self.symbols):
+            self._lookup[ord(symbol)] = column
+
+    @classmethod
+    def _from_table(cls, rows: List[Dict[str, int]], symbols: Sequence[str],
+                    start: int, finals: Sequence[int]) -> VectorizedDFA:
+        # rows[i] — переходы состояния i (нумерация с 1, 0 занят тупиком)
+        symbols = sorted(symbols)
+        matrix = np.zeros((len(rows) + 1, len(symbols) + 1), dtype=np.int32)
+        for state, row in enumerate(rows, start=1):
+            for column, symbol in enumerate(symbols):
+                matrix[state, column] = row.get(symbol, 0)
+        final = np.zeros(len(rows) + 1, dtype=bool)
+        final[list(finals)] = True
+        return cls(matrix, symbols, start, final)
+
+    @classmethod
+    def from_dfa(cls, dfa) -> VectorizedDFA:
+        """Строит матрицу из DFA automata-lib (в том числе частичного)."""
+        state_ids = {state: ind for ind, state in enumerate(sorted(dfa.states, key=str), start=1)}
+        rows = [{} for _ in state_ids]
+        for state, state_map in dfa.transitions.items():
+            rows[state_ids[state] - 1] = {symbol: state_ids[target] for symbol, target in state_map.items()}
+        return cls._from_table(
+            rows, dfa.input_symbols,
+            state_ids[dfa.initial_state],
+            [state_ids[state] for state in dfa.final_states]
+        )
+
+    @classmethod
+    def from_compiled(cls, automaton: CompiledAutomaton, max_states: int = MAX_DFA_STATES) -> VectorizedDFA:
+        """Детерминизирует скомпилированный НКА (для ДКА число состояний не растет)."""
+        symbols = list(automaton.symbol_ids)
+        state_ids = {0: 0}
+        queue = deque()
+        table = []
+
+        def state_id(mask: int) -> int:
+            if mask not in state_ids:
+                if len(state_ids) > max_states:
+                    raise ValueError(f"Детерминизация превысила {max_states} состояний")
+                state_ids[mask] = len(state_ids)
+                table.append({})
+                queue.append(mask)
+            return state_ids[mask]
+
+        start = state_id(automaton.start_mask)
+        while queue:
+            mask = queue.popleft()
+            table[state_ids[mask] - 1] = {
+                symbol: state_id(automaton.step(mask, symbol))
+                for symbol in symbols
+            }
+
+        finals = [state for mask, state in state_ids.items() if mask & automaton.final_mask]
+        return cls._from_table(table, symbols, start, finals)
+
+    def _columns(self, text: str) -> np.ndarray:
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        return self._lookup[np.minimum(codes, len(self._lookup) - 1)]
+
+    def _run_columns(self, columns: np.ndarray) -> np.ndarray:
+        # columns[позиция, слово]; матрица адресуется плоским индексом
+        states = np.full(columns.shape[1], self.start, dtype=np.int32)
+        flat = self.matrix.ravel()
+        width = self.matrix.shape[1]
+        for position in range(columns.shape[0]):
+            states = flat[states * width + columns[position]]
+        return states
+
+    def run_equal_length(self, words: Sequence[str]) -> np.ndarray:
+        """Итоговые состояния для слов одной длины."""
+        length = len(words[0]) if words else 0
+        columns = self._columns("".join(words)).reshape(len(words), length)
+        return self._run_columns(np.ascontiguousarray(columns.T))
+
+    def accepts_batch(self, words: Sequence[str]) -> np.ndarray:
+        """
+        Массив bool: принимается ли каждое слово (порядок сохраняется).
+        Корпус кодируется целиком один раз, затем слова группируются по длине.
+        """
+        lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+        offsets = np.zeros(len(words), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=offsets[1:])
+        columns = self._columns("".join(words))
+
+        result = np.zeros(len(words), dtype=bool)
+        order = np.argsort(lengths, kind="stable")
+        bounds = np.flatnonzero(np.diff(lengths[order])) + 1
+        for indices in np.split(order, bounds):
+            if len(indices) == 0:
+                continue
+            length = lengths[indices[0]]
+            positions = offsets[indices][None, :] + np.arange(length)[:, None]
+            result[indices] = self.final[self._run_columns(columns[positions])]
+        return result
+
+    def accepts(self, word: str) -> bool:
+        return bool(self.final[self.run_equal_length([word])[0]])
+
+
+def vectorize_from_ui(app: Application) -> VectorizedDFA | None:
+    """Векторизованный ДКА для текущего графа; кэшируется до Graph.touch()."""
+    def build():
+        automaton = compile_from_ui(app)
+        return None if automaton is None else VectorizedDFA.from_compiled(automaton)
+
+    return app.graph.cached(("vectorized", frozenset(app.attr.alphabet)), build)
@@ -0,0 +1,61 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import pickle
+import pytest
+from compiled_automaton import CompiledAutomaton
+from batch_testing import run_batch
+
+
+@pytest.fixture
+def even_a():
+    return CompiledAutomaton(
+        {"even": {"a": {"odd"}, "b": {"even"}}, "odd": {"a": {"even"}, "b": {"odd"}}},
+        start_states={"even"},
+        final_states={"even"},
+    )
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    words = ["", "a", "aa", "ab", "aba", "bbb", "c", "aab"] * 5
+    path = tmp_path / "corpus.txt"
+    path.write_text("\n".join(words) + "\n", encoding="utf-8")
+    return path, words
+
+
+def test_pickle_roundtrip(even_a):
+    assert even_a.accepts("abab")
+    restored = pickle.loads(pickle.dumps(even_a))
+    assert restored.accepts("abab")
+    assert not restored.accepts("ab")
+
+
+def test_batch_single_worker(even_a, corpus, tmp_path):
+    path, words = corpus
+    result_path = tmp_path / "results.txt"
+    result = run_batch(even_a, str(path), str(result_path), workers=1, chunk_size=3)
+
+    expected = [even_a.accepts(word) for word in words]
+    assert result.accepted == sum(expected)
+    assert result.rejected == len(words) - sum(expected)
+    assert result_path.read_text().split() == ["1" if v else "0" for v in expected]
+
+
+def test_batch_process_pool(even_a, corpus, tmp_path):
+    path, words = corpus
+    result_path = tmp_path / "results.txt"
+    result = run_batch(even_a, str(path), str(result_path), workers=2, chunk_size=4)
+
+    expected = [even_a.accepts(word) for word in words]
+    assert result.total == len(words)
+    assert result.accepted == sum(expected)
+    assert result_path.read_text().split() == ["1" if v else "0" for v in expected]
+
+
+def test_batch_reports_progress(even_a, corpus):
+    path, words = corpus
+    totals = []
+    run_batch(even_a, str(path), workers=1, chunk_size=16, progress=lambda result: totals.append(result.total))
+    assert totals == [16, 32, 40]
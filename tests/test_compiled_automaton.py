@@ -0,0 +1,158 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import pytest
+from unittest.mock import MagicMock
+from automata.fa.nfa import NFA
+from compiled_automaton import CompiledAutomaton, compile_from_ui
+from graph import Graph, Node, NodeType, Transition
+from application_state import ApplicationState
+
+
+@pytest.fixture
+def ends_with_ab():
+    return NFA(
+        states={'q0', 'q1', 'q2'},
+        input_symbols={'a', 'b'},
+        transitions={
+            'q0': {'a': {'q0', 'q1'}, 'b': {'q0'}},
+            'q1': {'b': {'q2'}},
+        },
+        initial_state='q0',
+        final_states={'q2'}
+    )
+
+
+def test_matches_automata_lib(ends_with_ab):
+    compiled = CompiledAutomaton.from_nfa(ends_with_ab)
+    for word in ["", "a", "ab", "bab", "abb", "aaab", "abab", "ba"]:
+        assert compiled.accepts(word) == ends_with_ab.accepts_input(word)
+
+
+def test_unknown_symbol_rejects(ends_with_ab):
+    compiled = CompiledAutomaton.from_nfa(ends_with_ab)
+    assert not compiled.accepts("abc")
+
+
+def test_epsilon_closure_in_steps():
+    compiled = CompiledAutomaton(
+        {
+            "s": {"": {"a"}},
+            "a": {"x": {"b"}},
+            "b": {"ε": {"c"}},
+            "c": {"ε": {"b"}},
+        },
+        start_states={"s"},
+        final_states={"c"},
+    )
+    assert compiled.names_of(compiled.start_mask) == {"s", "a"}
+    assert compiled.names_of(compiled.run("x")) == {"b", "c"}
+    assert compiled.accepts("x")
+    assert not compiled.accepts("xx")
+
+
+def test_long_word():
+    compiled = CompiledAutomaton(
+        {"even": {"a": {"odd"}}, "odd": {"a": {"even"}}},
+        start_states={"even"},
+        final_states={"even"},
+    )
+    assert compiled.accepts("a" * 1_000_000)
+    assert not compiled.accepts("a" * 999_999)
+
+
+def _make_app(alphabet):
+    app = MagicMock()
+    app.graph = Graph()
+    app.attr = ApplicationState()
+    app.attr.alphabet = set(alphabet)
+    return app
+
+
+def test_compile_from_ui():
+    app = _make_app({'a'})
+    q0 = Node(0, 0, "q0", NodeType.START)
+    q1 = Node(0, 0, "q1", NodeType.FINAL)
+    app.graph.replace_nodes({q0, q1})
+    app.graph.replace_transitions({Transition(q0, q1, "a"), Transition(q1, q1, "ε")})
+
+    compiled = compile_from_ui(app)
+    assert compiled.accepts("a")
+    assert not compiled.accepts("")
+    assert not compiled.accepts("aa")
+
+
+def test_compile_from_ui_invalid():
+    app = _make_app({'a'})
+    assert compile_from_ui(app) is None
+
+    q0 = Node(0, 0, "q0", NodeType.START)
+    app.graph.replace_nodes({q0})
+    app.graph.replace_transitions({Transition(q0, q0, "b")})
+    app.graph.touch()
+    assert compile_from_ui(app) is None
+
+
+def test_compile_from_ui_cached_until_touch():
+    app = _make_app({'a'})
+    q0 = Node(0, 0, "q0", NodeType.START_FINAL)
+    app.graph.replace_nodes({q0})
+
+    compiled = compile_from_ui(app)
+    assert compile_from_ui(app) is compiled
+
+    app.attr.alphabet.add('b')
+    assert compile_from_ui(app) is not compiled
+
+    app.graph.replace_transitions({Transition(q0, q0, "a")})
+    app.graph.touch()
+    assert compile_from_ui(app).accepts("aa")
+
+
+def test_epsilon_closures_match_search():
+    import random
+    from compiled_automaton import epsilon_closures
+
+    rng = random.Random(7)
+    for _ in range(50):
+        count = rng.randint(1, 12)
+        epsilon = [0] * count
+        for _ in range(rng.randint(0, 2 * count)):
+            epsilon[rng.randrange(count)] |= 1 << rng.randrange(count)
+
+        for state, closure in enumerate(epsilon_closures(epsilon)):
+            reached, stack = {state}, [state]
+            while stack:
+                current = stack.pop()
+                for target in range(count):
+                    if epsilon[current] >> target & 1 and target not in reached:
+                        reached.add(target)
+                        stack.append(target)
+            assert closure == sum(1 << target for target in reached)
+
+
+@pytest.mark.parametrize("checkpoint_every", [None, 1, 4, 7])
+def test_state_trace_matches_run(ends_with_ab, checkpoint_every):
+    from compiled_automaton import StateTrace
+
+    compiled = CompiledAutomaton.from_nfa(ends_with_ab)
+    word = "abbabaab" * 5
+    trace = StateTrace(compiled, word, checkpoint_every)
+    assert len(trace) == len(word) + 1
+
+    positions = [len(word), 3, 0, 17, 18, 19, 12, 40, 1]
+    for position in positions:
+        assert trace.states_at(position) == compiled.run(word[:position])
+
+    with pytest.raises(IndexError):
+        trace.states_at(len(word) + 1)
+
+
+def test_private_copy_has_own_lazy_tables(ends_with_ab):
+    automaton = CompiledAutomaton.from_nfa(ends_with_ab)
+    copy = automaton.private_copy()
+    assert copy.accepts("aab")
+    assert copy._subsets is not automaton._subsets
+    assert len(automaton._subsets) == 1
+    assert copy.table is automaton.table
@@ -2,8 +2,11 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
+import threading
 import pytest
-from debug import get_epsilon_closure
+from unittest.mock import MagicMock, patch
+import debug
+from debug import MAX_SLIDER_DIVISIONS, _slider_divisions, get_epsilon_closure
 
 class MockNFA:
     def __init__(self, transitions):
@@ -76,4 +79,68 @@ def test_missing_state_in_transitions():
         # q1 отсутствует в словаре transitions
     })
     result = get_epsilon_closure(nfa, {"q0"})
-    assert result == {"q0", "q1"}
\ No newline at end of file
+    assert result == {"q0", "q1"}
+
+def test_closure_of_unknown_state_contains_itself():
+    """Тест: Состояние без переходов и вне словаря остается в замыкании."""
+    nfa = MockNFA({
+        "q0": {"": ["q1"]}
+    })
+    assert get_epsilon_closure(nfa, {"q7"}) == {"q7"}
+
+def test_nested_epsilon_cycles():
+    """Тест: Вложенные ε-циклы и хвост из компоненты (проверка сжатия компонент)."""
+    nfa = MockNFA({
+        "q0": {"": ["q1"]},
+        "q1": {"": ["q2"], "a": ["q5"]},
+        "q2": {"": ["q0", "q3"]},
+        "q3": {"ε": ["q4"]},
+        "q4": {"": ["q3"]},
+        "q5": {"": ["q0"]},
+    })
+    assert get_epsilon_closure(nfa, {"q1"}) == {"q0", "q1", "q2", "q3", "q4"}
+    assert get_epsilon_closure(nfa, {"q4"}) == {"q3", "q4"}
+    assert get_epsilon_closure(nfa, {"q5"}) == {"q0", "q1", "q2", "q3", "q4", "q5"}
+
+
+def test_slider_divisions_capped():
+    """Тест: на длинном слове слайдер позиции становится непрерывным."""
+    assert _slider_divisions(0) == 1
+    assert _slider_divisions(MAX_SLIDER_DIVISIONS) == MAX_SLIDER_DIVISIONS
+    assert _slider_divisions(MAX_SLIDER_DIVISIONS + 1) is None
+
+
+def test_autoplay_steps_under_app_lock():
+    """Тест: поток автопроигрывания не делает шаг, пока UI держит блокировку приложения."""
+    app = MagicMock()
+    app.lock = threading.RLock()
+    app.attr.debug_mode = True
+    app.attr.input_string = "a"
+    app.attr.input_position = 0
+    app.attr.autoplay_interval = 0.001
+    stop = threading.Event()
+
+    def step(app, is_auto):
+        app.attr.input_position += 1
+
+    with patch.object(debug, "debug_step_forward", side_effect=step) as step_mock, \
+            patch.object(debug, "check_acceptance"):
+        with app.lock:
+            worker = threading.Thread(target=debug._autoplay, args=(app, stop))
+            worker.start()
+            worker.join(0.05)
+            step_mock.assert_not_called()
+        worker.join(1)
+    assert not worker.is_alive()
+    step_mock.assert_called_once()
+
+
+def test_epsilon_closure_compiles_once_per_nfa():
+    """Тест: повторный запрос по тому же NFA не перестраивает замыкания."""
+    nfa = MockNFA({"q0": {"": ["q1"], "a": ["q2"]}, "q1": {}})
+    with patch.object(debug, "CompiledAutomaton", wraps=debug.CompiledAutomaton) as compiled:
+        assert get_epsilon_closure(nfa, {"q0"}) == {"q0", "q1"}
+        assert get_epsilon_closure(nfa, {"q1"}) == {"q1"}
+        assert compiled.call_count == 1
+        get_epsilon_closure(MockNFA({"q0": {}}), {"q0"})
+        assert compiled.call_count == 2
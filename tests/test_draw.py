@@ -0,0 +1,184 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import pytest
+from unittest.mock import MagicMock
+from application_state import ApplicationState
+from config import ApplicatonConfig
+from draw import Renderer
+from graph import Graph, Node, Transition
+
+
+@pytest.fixture
+def app():
+    app = MagicMock()
+    app.graph = Graph()
+    app.attr = ApplicationState()
+    app.config = ApplicatonConfig()
+    app.renderer = Renderer()
+    return app
+
+
+def _shapes_of(app, element):
+    cache = app.renderer.node_cache if isinstance(element, Node) else app.renderer.transition_cache
+    return cache[element][1]
+
+
+def test_render_dragged_updates_only_affected(app):
+    q0 = Node(100, 100, "q0")
+    q1 = Node(300, 100, "q1")
+    q2 = Node(500, 300, "q2")
+    edge = Transition(q0, q1, "a")
+    neighbour_loop = Transition(q1, q1, "b")
+    far = Transition(q2, q2, "c")
+    app.graph.replace_nodes({q0, q1, q2})
+    app.graph.replace_transitions({edge, neighbour_loop, far})
+
+    app.renderer.render(app)
+    far_shapes = _shapes_of(app, far)
+    edge_shapes = _shapes_of(app, edge)
+    q2_shapes = _shapes_of(app, q2)
+
+    app.renderer.begin_drag(q0, app)
+    assert app.renderer.drag_transitions == {edge, neighbour_loop}
+
+    app.graph.move_node(q0, 150, 200)
+    app.renderer.render_dragged(q0, app)
+
+    assert _shapes_of(app, far) is far_shapes
+    assert _shapes_of(app, edge) is not edge_shapes
+    assert _shapes_of(app, q2) is q2_shapes
+    assert _shapes_of(app, q0)[0].x == 150
+
+
+def test_render_reuses_unchanged_shapes(app):
+    q0 = Node(100, 100, "q0")
+    q1 = Node(300, 100, "q1")
+    edge = Transition(q0, q1, "a")
+    app.graph.replace_nodes({q0, q1})
+    app.graph.replace_transitions({edge})
+
+    app.renderer.render(app)
+    shapes = list(app.ui.drawing_area.shapes)
+    app.ui.drawing_area.update.reset_mock()
+
+    # Ничего не изменилось — обновление канваса не отправляется
+    app.renderer.render(app)
+    app.ui.drawing_area.update.assert_not_called()
+
+    app.graph.selected_node = q1
+    app.renderer.render(app)
+    app.ui.drawing_area.update.assert_called_once()
+    assert _shapes_of(app, q0)[0] in shapes
+    assert _shapes_of(app, edge)[0] in shapes
+    assert _shapes_of(app, q1)[0] not in shapes
+
+
+def test_clicked_transition_uses_rendered_index(app):
+    from canvas_utils import get_clicked_transition
+    from linal import Vector2D
+
+    q0 = Node(100, 100, "q0")
+    q1 = Node(300, 100, "q1")
+    edge = Transition(q0, q1, "a")
+    loop = Transition(q1, q1, "b")
+    app.graph.replace_nodes({q0, q1})
+    app.graph.replace_transitions({edge, loop})
+    app.renderer.render(app)
+
+    assert app.renderer.transition_index.query(200, 100) == {edge}
+    assert get_clicked_transition(Vector2D(200, 101), app) is edge
+    assert get_clicked_transition(Vector2D(200, 160), app) is None
+
+    app.graph.remove_transition(edge)
+    app.renderer.render(app)
+    assert edge not in app.renderer.transition_index
+    assert get_clicked_transition(Vector2D(200, 101), app) is None
+
+
+def test_full_render_batches_edge_geometry(app):
+    from draw import BATCH_GEOMETRY_MIN
+    from geometry import LineGeometry, transition_geometry
+
+    hub = Node(1000, 1000, "hub")
+    leaves = [Node(1000 + 400 * (i % 8), 200 * (i // 8), f"q{i}") for i in range(BATCH_GEOMETRY_MIN + 8)]
+    app.graph.replace_nodes({hub, *leaves})
+    app.graph.replace_transitions({Transition(leaf, hub, "a") for leaf in leaves})
+    app.renderer.render(app)
+
+    for transition in app.graph.transitions:
+        batched = app.renderer.geometry_of(transition)
+        expected = transition_geometry(transition, app)
+        assert type(batched) is type(expected)
+        if isinstance(batched, LineGeometry):
+            assert batched.end.x == pytest.approx(expected.end.x)
+            assert batched.arrow_left.y == pytest.approx(expected.arrow_left.y)
+
+
+def test_offscreen_elements_are_culled(app):
+    inside = Node(100, 100, "in")
+    outside = Node(5000, 100, "out")
+    app.graph.replace_nodes({inside, outside})
+    app.graph.replace_transitions({Transition(outside, outside, "a")})
+    app.renderer.render(app)
+
+    assert _shapes_of(app, outside) == []
+    assert app.renderer.transition_cache[next(iter(app.graph.transitions))][1] == []
+    assert _shapes_of(app, inside) != []
+
+
+def test_zoomed_out_drops_labels_and_merges_pairs(app):
+    from flet import canvas
+    from canvas_utils import get_clicked_transition
+    from linal import Vector2D
+
+    q0 = Node(100, 100, "q0")
+    q1 = Node(300, 100, "q1")
+    forward, back = Transition(q0, q1, "a"), Transition(q1, q0, "b")
+    app.graph.replace_nodes({q0, q1})
+    app.graph.replace_transitions({forward, back})
+    app.attr.canvas_scale = 0.5
+    app.renderer.render(app)
+
+    shapes = app.ui.drawing_area.shapes
+    assert not any(isinstance(shape, canvas.Text) for shape in shapes)
+    # Рисуется переход от узла с меньшим именем, скрытый не выбирается кликом
+    assert len(_shapes_of(app, forward)) == 1
+    assert _shapes_of(app, back) == []
+    assert get_clicked_transition(Vector2D(200, 100), app) is forward
+
+
+def test_dense_zoomed_out_view_is_clustered(app):
+    app.config.lod_cluster_nodes = 10
+    app.attr.canvas_scale = 0.5
+    nodes = [Node(10 + 5 * (i % 10), 10 + 5 * (i // 10), f"q{i}") for i in range(30)]
+    app.graph.replace_nodes(set(nodes))
+    app.graph.replace_transitions({Transition(nodes[0], nodes[-1], "a")})
+    app.renderer.render(app)
+
+    assert app.renderer.detail == "clusters"
+    # Все узлы попали в одну ячейку: круг и число
+    assert len(app.ui.drawing_area.shapes) == 2
+
+    from canvas_utils import get_clicked_node
+    from linal import Vector2D
+    # Узлы под кругом кластера не видны, поэтому и не выбираются
+    assert get_clicked_node(Vector2D(10, 10), app) is None
+
+
+def test_zoom_and_pan_leave_model_untouched(app):
+    from edit_events import set_canvas_scale
+
+    node = Node(100, 100, "q0")
+    app.graph.replace_nodes({node})
+    app.attr.view_offset_x = 40
+    for scale in (1.3, 0.7, 2.0, 1.0):
+        set_canvas_scale(scale, app)
+    assert (node.x, node.y) == (100, 100)
+    assert app.attr.view_offset_x == pytest.approx(40)
+
+    set_canvas_scale(2.0, app)
+    app.renderer.render(app)
+    circle = _shapes_of(app, node)[0]
+    assert (circle.x, circle.y, circle.radius) == (280, 200, 2 * app.config.node_radius)
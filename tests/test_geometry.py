@@ -0,0 +1,82 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import math
+from geometry import curve_geometry, line_geometry, loop_geometry
+from linal import Vector2D
+
+
+def test_line_hit_and_bounds():
+    geometry = line_geometry(Vector2D(0, 0), Vector2D(200, 0), False, 30)
+    assert geometry.start.x == 30 and geometry.end.x == 170
+    assert geometry.hit(Vector2D(100, 4), 5)
+    assert not geometry.hit(Vector2D(100, 8), 5)
+    assert not geometry.hit(Vector2D(10, 0), 5)
+    assert geometry.bounds(5) == (25, -5, 175, 5)
+
+
+def test_curve_hit_follows_bulge():
+    geometry = curve_geometry(Vector2D(0, 0), Vector2D(200, 0), 30)
+    apex = geometry.point_at(0.5)
+    assert geometry.hit(apex, 5)
+    assert not geometry.hit(Vector2D(100, 0), 5)
+    x_min, y_min, x_max, y_max = geometry.bounds(0)
+    assert x_min <= apex.x <= x_max and y_min <= apex.y <= y_max
+
+
+def test_loop_avoids_taken_direction():
+    geometry = loop_geometry(Vector2D(0, 0), 30, {0.0})
+    # Единственное занятое направление — вправо, петля уходит влево
+    assert geometry.direction.x < -0.99
+    on_arc = geometry.arc_center + Vector2D.from_phi_r(math.pi, geometry.arc_radius)
+    assert geometry.hit(on_arc, 5)
+    assert not geometry.hit(geometry.arc_center, 5)
+
+
+def test_vector_rotation_matches_polar_form():
+    import numpy as np
+    from linal import rotate_batch, rotation
+
+    vector = Vector2D(3, 4)
+    for phi in (0.3, -2.0, math.pi):
+        turned = vector.turned(phi)
+        assert math.isclose(turned.length(), 5)
+        assert math.isclose(math.cos(turned.phi() - vector.phi() - phi), 1)
+
+    batch = rotate_batch(np.array([[3.0, 4.0], [1.0, 0.0]]), *rotation(0.3))
+    assert np.allclose(batch[0], vector.turned(0.3).to_tuple())
+
+
+def test_batch_geometry_matches_scalar():
+    import random
+    import numpy as np
+    from geometry import curve_geometries, line_geometries
+
+    rng = random.Random(5)
+    starts = np.array([(rng.uniform(0, 500), rng.uniform(0, 500)) for _ in range(40)])
+    ends = np.array([(rng.uniform(0, 500), rng.uniform(0, 500)) for _ in range(40)])
+    double = np.array([rng.random() < 0.5 for _ in range(40)])
+
+    def same(batch, scalar):
+        for name in batch.__dataclass_fields__:
+            left, right = getattr(batch, name), getattr(scalar, name)
+            if isinstance(left, Vector2D):
+                left, right = left.to_tuple(), right.to_tuple()
+            assert np.allclose(left, right)
+
+    lines = line_geometries(starts, ends, double, 30)
+    curves = curve_geometries(starts, ends, 30)
+    for ind in range(40):
+        start, end = Vector2D(*starts[ind]), Vector2D(*ends[ind])
+        same(lines[ind], line_geometry(start, end, bool(double[ind]), 30))
+        same(curves[ind], curve_geometry(start, end, 30))
+
+
+def test_view_round_trip():
+    from geometry import View
+
+    view = View(1.7, -35.0, 12.5)
+    point = Vector2D(123.4, -56.7)
+    back = view.to_model(view.to_screen(point))
+    assert math.isclose(back.x, point.x) and math.isclose(back.y, point.y)
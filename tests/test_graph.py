@@ -54,7 +54,7 @@ def populated_graph():
     n_final = Node(0, 0, "final", NodeType.FINAL)
     n_start_final = Node(0, 0, "start_final", NodeType.START_FINAL)
     
-    g.nodes.update([n_normal, n_start, n_final, n_start_final])
+    g.replace_nodes([n_normal, n_start, n_final, n_start_final])
     
     nodes_dict = {
         "normal": n_normal,
@@ -67,9 +67,9 @@ def populated_graph():
 def test_graph_default_initialization():
     g = Graph()
     
-    assert isinstance(g.nodes, set)
+    assert isinstance(g.nodes, frozenset)
     assert len(g.nodes) == 0
-    assert isinstance(g.transitions, set)
+    assert isinstance(g.transitions, frozenset)
     assert len(g.transitions) == 0
     assert g.node_counter == 0
     assert g.selected_node is None
@@ -102,4 +102,134 @@ def test_empty_graph_get_states():
     g = Graph()
     
     assert g.get_final_states() == set()
-    assert g.get_start_states() == set()
\ No newline at end of file
+    assert g.get_start_states() == set()
+
+def test_graph_cache_reset_on_touch():
+    g = Graph()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return len(builds)
+
+    assert g.cached("key", build) == 1
+    assert g.cached("key", build) == 1
+    assert g.revision == 0
+
+    g.touch()
+    assert g.revision == 1
+    assert g.cached("key", build) == 2
+
+
+def test_adjacency_index_follows_mutations():
+    graph = Graph()
+    q0 = Node(0, 0, "q0")
+    q1 = Node(0, 0, "q1")
+    forward = Transition(q0, q1, "a")
+    back = Transition(q1, q0, "b")
+    graph.replace_nodes({q0, q1})
+    graph.replace_transitions({forward})
+
+    assert graph.outgoing(q0) == {forward}
+    assert graph.incoming(q1) == {forward}
+    assert graph.transition_between(q0, q1) is forward
+    assert graph.transition_between(q1, q0) is None
+
+    graph.add_transition(back)
+    assert graph.transition_between(q1, q0) is back
+
+    assert graph.remove_node(q1) == {forward, back}
+    assert graph.outgoing(q0) == set()
+    assert graph.transition_between(q0, q1) is None
+
+
+def test_adjacency_index_keeps_parallel_transition():
+    graph = Graph()
+    q0 = Node(0, 0, "q0")
+    q1 = Node(0, 0, "q1")
+    first = Transition(q0, q1, "a")
+    second = Transition(q0, q1, "b")
+    graph.replace_transitions({first, second})
+
+    graph.remove_transition(graph.transition_between(q0, q1))
+    assert graph.transition_between(q0, q1) in {first, second}
+    assert graph.transition_between(q0, q1) in graph.transitions
+
+
+def test_spatial_index_follows_moves():
+    graph = Graph()
+    near = Node(10, 10, "near")
+    far = Node(900, 900, "far")
+    graph.replace_nodes({near, far})
+
+    assert graph.nodes_near(0, 0, 30) == {near}
+    graph.move_node(far, 20, 40)
+    assert graph.nodes_near(0, 0, 30) == {near, far}
+
+    graph.remove_node(near)
+    graph.add_node(Node(-500, -500, "new"))
+    assert graph.nodes_near(0, 0, 30) == {far}
+
+
+def test_nodes_along_covers_segment():
+    import random
+
+    rng = random.Random(3)
+    graph = Graph()
+    graph.replace_nodes({Node(rng.uniform(0, 2000), rng.uniform(0, 2000), f"q{i}") for i in range(300)})
+    for _ in range(50):
+        x1, y1, x2, y2 = (rng.uniform(0, 2000) for _ in range(4))
+        candidates = graph.nodes_along(x1, y1, x2, y2, 45)
+        for node in graph.nodes:
+            # Расстояние от узла до отрезка
+            dx, dy = x2 - x1, y2 - y1
+            t = max(0.0, min(1.0, ((node.x - x1) * dx + (node.y - y1) * dy) / (dx * dx + dy * dy)))
+            dist = ((node.x - x1 - t * dx) ** 2 + (node.y - y1 - t * dy) ** 2) ** 0.5
+            if dist < 45:
+                assert node in candidates
+
+
+def test_node_and_transition_sets_are_read_only():
+    graph = Graph()
+    q0 = Node(0, 0, "q0")
+    with pytest.raises(AttributeError):
+        graph.nodes.add(q0)
+    with pytest.raises(AttributeError):
+        graph.transitions = set()
+
+    graph.add_node(q0)
+    snapshot = graph.nodes
+    graph.add_node(Node(500, 500, "q1"))
+    # Выданный набор не меняется под читающим (например, под отрисовкой)
+    assert snapshot == {q0}
+    assert graph.nodes_near(0, 0, 10) == {q0}
+
+
+def test_remove_hub_node_touches_once():
+    graph = Graph()
+    hub = Node(0, 0, "hub")
+    others = [Node(i * 10, 100, f"q{i}") for i in range(50)]
+    graph.replace_nodes([hub, *others])
+    graph.replace_transitions(
+        [Transition(hub, node, "a") for node in others] + [Transition(node, hub, "b") for node in others]
+    )
+    kept = Transition(others[0], others[1], "c")
+    graph.add_transition(kept)
+
+    revision = graph.revision
+    removed = graph.remove_node(hub)
+    assert graph.revision == revision + 1
+    assert len(removed) == 100
+    assert graph.transitions == {kept}
+    assert graph.outgoing(others[0]) == {kept}
+    assert graph.incoming(others[0]) == set()
+    assert graph.transition_between(others[0], hub) is None
+
+
+def test_graph_equality_compares_nodes():
+    first, second = Graph(), Graph()
+    assert first == second
+    first.add_node(Node(0, 0, "q0"))
+    second.add_node(Node(0, 0, "q0"))
+    # Узлы сравниваются по ссылке, поэтому графы с разными узлами различны
+    assert first != second
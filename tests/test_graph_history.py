@@ -0,0 +1,159 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import pytest
+from unittest.mock import MagicMock, patch
+from graph import Graph, Node, NodeType, Transition
+from graph_history import (
+    History, Edit, AddNode, RemoveNode, AddTransition, MoveNode,
+    ToggleType, EditSymbols, BulkReplace, ReplaceGraph,
+)
+
+
+@pytest.fixture(autouse=True)
+def no_draw():
+    with patch('draw.draw_nodes'):
+        yield
+
+
+@pytest.fixture
+def app():
+    app = MagicMock()
+    app.graph = Graph()
+    app.history = History()
+    return app
+
+
+def apply(app, edit):
+    edit.do(app)
+    app.history.record(edit)
+
+
+def test_add_node_undo_redo(app):
+    node = Node(0, 0, "q0")
+    apply(app, AddNode(node))
+    assert app.graph.nodes == {node}
+    assert app.graph.node_counter == 1
+
+    app.history.undo_click(app)
+    assert app.graph.nodes == set()
+    assert app.graph.node_counter == 0
+
+    app.history.redo_click(app)
+    assert app.graph.nodes == {node}
+
+
+def test_remove_node_restores_transitions(app):
+    a, b = Node(0, 0, "a"), Node(1, 1, "b")
+    ab, ba = Transition(a, b, "x"), Transition(b, a, "y")
+    app.graph.replace_nodes({a, b})
+    app.graph.replace_transitions({ab, ba})
+
+    apply(app, RemoveNode(a))
+    assert app.graph.nodes == {b}
+    assert app.graph.transitions == set()
+
+    app.history.undo_click(app)
+    assert app.graph.nodes == {a, b}
+    assert app.graph.transitions == {ab, ba}
+
+
+def test_field_edits_invalidate_cache(app):
+    node = Node(0, 0, "q0")
+    transition = Transition(node, node, "a")
+    app.graph.replace_nodes({node})
+    app.graph.replace_transitions({transition})
+
+    revision = app.graph.revision
+    apply(app, ToggleType(node, node.type, NodeType.START))
+    apply(app, EditSymbols(transition, "a", "ab"))
+    assert app.graph.revision == revision + 2
+
+    app.history.undo_click(app)
+    app.history.undo_click(app)
+    assert node.type == NodeType.NORMAL
+    assert transition.symbols == "a"
+    assert app.graph.revision == revision + 4
+
+
+def test_move_keeps_cache(app):
+    node = Node(0, 0, "q0")
+    app.graph.replace_nodes({node})
+    app.graph.cache["key"] = 1
+
+    app.graph.move_node(node, 5, 6)
+    app.history.record(MoveNode(node, (0, 0), (5, 6)))
+    app.history.undo_click(app)
+    assert (node.x, node.y) == (0, 0)
+    assert app.graph.cache == {"key": 1}
+
+
+def test_bulk_and_replace(app):
+    old_graph = app.graph
+    a = Node(0, 0, "a")
+    old_transition = Transition(a, a, "x")
+    app.graph.replace_nodes({a})
+    app.graph.replace_transitions({old_transition})
+
+    b = Node(1, 1, "b")
+    new_transition = Transition(a, b, "y")
+    apply(app, BulkReplace({b}, {old_transition}, {new_transition}))
+    assert app.graph.nodes == {a, b}
+    assert app.graph.transitions == {new_transition}
+
+    apply(app, ReplaceGraph(app.graph, Graph()))
+    assert app.graph.nodes == set()
+
+    app.history.undo_click(app)
+    app.history.undo_click(app)
+    assert app.graph is old_graph
+    assert app.graph.nodes == {a}
+    assert app.graph.transitions == {old_transition}
+
+
+def test_new_edit_drops_redo(app):
+    apply(app, AddNode(Node(0, 0, "q0")))
+    app.history.undo_click(app)
+    assert len(app.history.redo_stack) == 1
+
+    apply(app, AddNode(Node(0, 0, "q1")))
+    assert len(app.history.redo_stack) == 0
+    app.history.redo_click(app)
+    assert len(app.graph.nodes) == 1
+
+
+def test_count_and_memory_limits():
+    app = MagicMock()
+    app.graph = Graph()
+    history = History(max_count=3)
+    for i in range(5):
+        history.record(AddTransition(Transition(Node(0, 0, "a"), Node(0, 0, "b"), str(i))))
+    assert len(history.undo_stack) == 3
+    assert history.undo_stack[0].transition.symbols == "2"
+
+    small = History(max_bytes=500)
+    for i in range(10):
+        small.record(RemoveNode(Node(0, 0, str(i)), {Transition(None, None, "a")}))
+    assert small.used_bytes <= 500
+    assert len(small.undo_stack) >= 1
+    assert small.used_bytes == sum(edit.size() for edit in small.undo_stack)
+
+
+def test_edits_cancel_background_layout(app):
+    from application_state import ApplicationState
+
+    app.attr = ApplicationState()
+    app.history.apply(AddNode(Node(0, 0, "q0")), app)
+    assert app.attr.layout_generation == 1
+    app.history.undo_click(app)
+    assert app.attr.layout_generation == 2
+
+
+def test_incomplete_edit_fails_on_creation():
+    class OnlyDo(Edit):
+        def do(self, app):
+            pass
+
+    with pytest.raises(TypeError):
+        OnlyDo()
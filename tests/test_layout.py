@@ -0,0 +1,125 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import numpy as np
+import pytest
+from layout import (
+    REFINE_CHUNKS, bfs_layers_layout, cached_layout, choose_algorithm, compute_layout, fit_to_frame,
+    refine_layout,
+)
+
+
+def test_auto_prefers_layers_for_small_dfa():
+    assert choose_algorithm(2, True) == "circle"
+    assert choose_algorithm(20, True) == "sugiyama"
+    assert choose_algorithm(20, False) == "fr"
+    assert choose_algorithm(5000, True) == "fr"
+
+
+@pytest.mark.parametrize("algorithm", ["auto", "sugiyama", "fr", "circle"])
+def test_layout_shape(algorithm):
+    edges = [(0, 1), (1, 2), (2, 0), (2, 3), (3, 3)]
+    coords = compute_layout(4, edges, algorithm, deterministic=True, time_budget=0.05)
+    assert coords.shape == (4, 2)
+    assert np.isfinite(coords).all()
+
+
+def test_layout_cached_by_structure():
+    edges = [(0, 1), (1, 2)]
+    first = compute_layout(3, edges, "fr", time_budget=0.05)
+    assert compute_layout(3, list(reversed(edges)), "fr", time_budget=0.05) is first
+    assert compute_layout(3, edges + [(2, 2)], "fr", time_budget=0.05) is first
+    assert compute_layout(3, [(0, 2)], "fr", time_budget=0.05) is not first
+
+
+def test_unknown_algorithm():
+    with pytest.raises(ValueError):
+        compute_layout(3, [], "spring", time_budget=0.05)
+
+
+def test_fit_to_frame():
+    coords = np.array([[-1.0, 5.0], [3.0, 5.0], [1.0, 5.0]])
+    fitted = fit_to_frame(coords, 10, 20, 100, 50)
+    assert fitted[:, 0].tolist() == [10, 110, 60]
+    # Все точки на одной высоте — ставятся по центру кадра
+    assert fitted[:, 1].tolist() == [45, 45, 45]
+
+
+def test_bfs_layers_layout():
+    coords = bfs_layers_layout(5, [(0, 1), (0, 2), (2, 3), (3, 0)], roots=[0])
+    assert coords[:, 0].tolist() == [0, 1, 1, 2, 3]
+    # Слой по центру; недостижимая вершина 4 — отдельным слоем
+    assert coords[:, 1].tolist() == [0, -0.5, 0.5, 0, 0]
+
+
+def test_refine_layout_is_progressive_and_cached():
+    edges = [(0, 1), (1, 2), (2, 3), (3, 4), (4, 0), (1, 3)]
+    initial = bfs_layers_layout(5, edges, roots=[0])
+    steps = list(refine_layout(initial, edges, 0.05))
+    assert len(steps) == REFINE_CHUNKS
+    assert all(step.shape == (5, 2) for step in steps)
+    assert cached_layout(5, edges, "fr") is steps[-1]
+
+
+def _import_app():
+    from unittest.mock import MagicMock
+    from application_state import ApplicationState
+    from config import ApplicatonConfig
+    from graph import Graph
+
+    app = MagicMock()
+    app.graph = Graph()
+    app.attr = ApplicationState()
+    app.config = ApplicatonConfig()
+    app.config.layout_algorithm = "fr"
+    app.config.layout_time_budget = 0.05
+    return app
+
+
+def _nfa(count):
+    from automata.fa.nfa import NFA
+
+    states = {f"s{i}" for i in range(count)}
+    transitions = {f"s{i}": {"a": {f"s{(i + 1) % count}", f"s{(i * 7) % count}"}} for i in range(count)}
+    transitions[""] = {"": {"s0"}}
+    return NFA(states=states | {""}, input_symbols={"a"}, transitions=transitions,
+               initial_state="", final_states={"s1"})
+
+
+def test_background_layout_refines_imported_graph():
+    from automata_visualizer import automaton_to_graph, start_background_layout
+
+    app = _import_app()
+    automaton = _nfa(12)
+    app.graph = automaton_to_graph(automaton, app, background=True)
+    start = {node.name: (node.x, node.y) for node in app.graph.nodes}
+    # Первый слой BFS — только стартовое состояние
+    assert min(start.values())[0] == start["s0"][0]
+
+    start_background_layout(automaton, app)
+    worker, *args = app.page.run_thread.call_args.args
+    worker(*args)
+    assert {node.name: (node.x, node.y) for node in app.graph.nodes} != start
+
+    # Раскладка уже в кэше: повторный импорт сразу ставит итоговые позиции, поток не нужен
+    app.page.run_thread.reset_mock()
+    again = automaton_to_graph(automaton, app, background=True)
+    app.graph = again
+    start_background_layout(automaton, app)
+    app.page.run_thread.assert_not_called()
+
+
+def test_background_layout_is_cancelled():
+    from automata_visualizer import automaton_to_graph, cancel_background_layout, start_background_layout
+
+    app = _import_app()
+    automaton = _nfa(15)
+    app.graph = automaton_to_graph(automaton, app, background=True)
+    start = {node.name: (node.x, node.y) for node in app.graph.nodes}
+    start_background_layout(automaton, app)
+    worker, *args = app.page.run_thread.call_args.args
+
+    cancel_background_layout(app)
+    worker(*args)
+    assert {node.name: (node.x, node.y) for node in app.graph.nodes} == start
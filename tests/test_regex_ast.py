@@ -0,0 +1,62 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import pytest
+from regex_ast import EMPTY, EPSILON, concat, parse, star, symbol, to_string, union
+
+
+def test_structurally_equal_nodes_are_shared():
+    a, b = symbol("a"), symbol("b")
+    assert symbol("a") is a
+    assert concat(a, star(b)) is concat(a, star(symbol("b")))
+    assert union(a, b) is union(b, a)
+    assert union(a, union(b, a)) is union(a, b)
+
+
+def test_smart_constructors_simplify():
+    a, b = symbol("a"), symbol("b")
+    assert union(EMPTY, a) is a
+    assert concat(a, EPSILON, b) is concat(a, b)
+    assert concat(a, EMPTY) is EMPTY
+    assert concat() is EPSILON
+    assert star(EMPTY) is EPSILON
+    assert star(star(a)) is star(a)
+    assert star(union(EPSILON, a)) is star(a)
+    assert union(EPSILON, star(a)) is star(a)
+    assert union(EPSILON, concat(a, star(a))) is star(a)
+    assert union(EPSILON, a).nullable and not concat(a, star(b)).nullable
+
+
+def test_to_string():
+    a, b, c = symbol("a"), symbol("b"), symbol("c")
+    assert to_string(concat(union(a, b), star(c))) == "(a|b)c*"
+    assert to_string(star(concat(a, b))) == "(ab)*"
+    assert to_string(star(symbol("ab"))) == "(ab)*"
+    assert sorted(to_string(union(concat(a, b), c)).split("|")) == ["ab", "c"]
+    assert to_string(EMPTY) == "∅"
+    assert to_string(EPSILON) == "ε"
+
+
+def test_deep_expression_renders_without_recursion():
+    regex = symbol("a")
+    for _ in range(5000):
+        regex = star(union(concat(regex, symbol("b")), symbol("c")))
+    assert to_string(regex).count("b") == 5000
+
+
+def test_parse_builds_simplified_tree():
+    a, b = symbol("a"), symbol("b")
+    assert parse("(a|b)*abb") is concat(star(union(a, b)), a, b, b)
+    assert parse("((a))|∅") is a
+    assert parse("(ε|a(a)*)b") is concat(star(a), b)
+    assert parse("a|") is union(a, EPSILON)
+    assert parse("") is EPSILON
+    assert parse("(ab*)*") is star(concat(a, star(b)))
+    assert parse("(" * 3000 + "a" + ")" * 3000) is a
+
+
+@pytest.mark.parametrize("text", ["(a", "a)", "*a", "(|*)"])
+def test_parse_errors(text):
+    with pytest.raises(ValueError):
+        parse(text)
@@ -0,0 +1,76 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import itertools
+import pytest
+from unittest.mock import MagicMock
+from automata.fa.nfa import NFA
+from graph import Graph
+from regex_matcher import attach_matcher, build_dfa, compile_regex, derivative, matcher_from_ui
+from regex_ast import EMPTY, EPSILON, parse
+
+
+@pytest.mark.parametrize("regex", ["(a|b)*abb", "a(ba)*b?", "(ab|a)+b*", "((a|b)(a|b))*", "a*b*a*"])
+def test_matches_like_automata_lib(regex):
+    nfa = NFA.from_regex(regex)
+    matcher = compile_regex(regex)
+    for length in range(7):
+        for word in map(''.join, itertools.product("ab", repeat=length)):
+            assert matcher.accepts(word) == nfa.accepts_input(word), word
+
+
+def test_derivative():
+    assert derivative(parse("ab"), "a") is parse("b")
+    assert derivative(parse("ab"), "b") is EMPTY
+    assert derivative(parse("a*b"), "b") is EPSILON
+    assert derivative(parse("(a|b)*"), "a") is parse("(a|b)*")
+
+
+def test_states_are_built_only_along_tested_words():
+    # Минимальный ДКА для такого выражения — 2^21 состояний
+    matcher = compile_regex("(a|b)*a" + "(a|b)" * 20)
+    word = "ab" * 15
+    assert matcher.accepts(word) == (word[-21] == "a")
+    assert matcher.state_count <= len(word) + 1
+
+
+def test_matchers_shared_by_canonical_form():
+    assert compile_regex("(a|b)*c") is compile_regex("((b|a))*c")
+    assert compile_regex("(a|b)*c") is not compile_regex("(a|b)*d")
+
+
+def test_unsupported_syntax():
+    with pytest.raises(ValueError):
+        compile_regex("a.b")
+
+
+def test_matcher_dropped_when_graph_changes():
+    app = MagicMock()
+    app.graph = Graph()
+    attach_matcher(app.graph, compile_regex("ab"))
+    assert matcher_from_ui(app).accepts("ab")
+    app.graph.touch()
+    assert matcher_from_ui(app) is None
+
+
+@pytest.mark.parametrize("regex", ["(a|b)*abb", "a(ba)*b?", "ε|a", "(ab|ε)*c"])
+def test_dfa_for_graph_agrees_with_matcher(regex):
+    matcher = compile_regex(regex)
+    dfa = build_dfa(matcher).minify()
+    for length in range(6):
+        for word in map(''.join, itertools.product(sorted(dfa.input_symbols), repeat=length)):
+            assert dfa.accepts_input(word) == matcher.accepts(word), word
+
+
+def test_epsilon_is_the_empty_word():
+    # automata-lib читает ε как обычный символ; граф и матчер строятся из одного разбора
+    dfa = build_dfa(compile_regex("ε|a"))
+    assert dfa.input_symbols == {"a"}
+    assert dfa.accepts_input("")
+
+
+def test_dfa_for_graph_is_capped():
+    matcher = compile_regex("(a|b)*a" + "(a|b)" * 20)
+    assert build_dfa(matcher, max_states=100) is None
+    assert matcher.state_count <= 100 * 2 + 1
@@ -0,0 +1,69 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import itertools
+import re
+import pytest
+from automata.fa.nfa import NFA
+from automata_operations import ELIMINATION_HEURISTICS, nfa_to_regex_state_elimination, simplify_regex
+
+
+def _accepts(regex: str, word: str) -> bool:
+    if regex == "∅":
+        return False
+    return re.fullmatch(regex.replace("ε", "(?:)"), word) is not None
+
+
+def _assert_same_language(nfa: NFA, heuristic: str, max_length: int = 6):
+    regex = nfa_to_regex_state_elimination(nfa, heuristic)
+    for length in range(max_length + 1):
+        for word in map(''.join, itertools.product(sorted(nfa.input_symbols), repeat=length)):
+            assert _accepts(regex, word) == nfa.accepts_input(word), (regex, word)
+
+
+@pytest.mark.parametrize("heuristic", ELIMINATION_HEURISTICS)
+def test_language_is_preserved(heuristic):
+    nfa = NFA(
+        states={"q0", "q1", "q2"},
+        input_symbols={"a", "b"},
+        transitions={
+            "q0": {"a": {"q0", "q1"}, "": {"q2"}},
+            "q1": {"b": {"q2"}},
+            "q2": {"a": {"q1"}, "b": {"q0"}},
+        },
+        initial_state="q0",
+        final_states={"q2"},
+    )
+    _assert_same_language(nfa, heuristic)
+
+
+def test_unknown_heuristic():
+    nfa = NFA(states={"q0"}, input_symbols={"a"}, transitions={"q0": {}}, initial_state="q0", final_states={"q0"})
+    with pytest.raises(ValueError):
+        nfa_to_regex_state_elimination(nfa, "random")
+
+
+def test_empty_language():
+    nfa = NFA(states={"q0", "q1"}, input_symbols={"a"}, transitions={"q0": {}, "q1": {"a": {"q1"}}},
+              initial_state="q0", final_states={"q1"})
+    assert nfa_to_regex_state_elimination(nfa) == "∅"
+
+
+def test_long_chain():
+    count = 300
+    nfa = NFA(
+        states={f"q{i}" for i in range(count)},
+        input_symbols={"a"},
+        transitions={f"q{i}": {"a": {f"q{i + 1}"}} if i < count - 1 else {} for i in range(count)},
+        initial_state="q0",
+        final_states={f"q{count - 1}"},
+    )
+    assert nfa_to_regex_state_elimination(nfa).count("a") == count - 1
+
+
+def test_simplify_regex():
+    assert simplify_regex("((a|a))(ε|b(b)*)∅|c**") == "c*"
+    assert simplify_regex("(ab*)*") == "(ab*)*"
+    assert simplify_regex("a|b") == "a|b"
+    assert simplify_regex("∅") == "∅"
@@ -9,6 +9,7 @@ sys.path.append(os.path.join(BASE_DIR, 'src'))
 
 from table import TableEditor
 from graph import Graph, Node
+from graph_history import History
 from application_state import ApplicationState, ApplicationUI
 
 class TestTableLogic(unittest.TestCase):
@@ -18,12 +19,12 @@ class TestTableLogic(unittest.TestCase):
         self.app.attr = ApplicationState()
         self.app.ui = ApplicationUI()
         self.app.page = MagicMock()
-        self.app.history = MagicMock()
+        self.app.history = History()
 
         # Создаем начальные узлы
         self.node_q0 = Node(x=10, y=10, name="q0")
         self.node_q1 = Node(x=20, y=20, name="q1")
-        self.app.graph.nodes = {self.node_q0, self.node_q1}
+        self.app.graph.replace_nodes({self.node_q0, self.node_q1})
         self.app.attr.alphabet = {'a'}
 
         # Инициализируем редактор
@@ -0,0 +1,63 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import pytest
+from automata.fa.dfa import DFA
+from automata.fa.nfa import NFA
+from compiled_automaton import CompiledAutomaton
+from vectorized_dfa import VectorizedDFA
+
+
+WORDS = ["", "a", "b", "ab", "ba", "abb", "aab", "abab", "bbab", "abc", "c", "ababb"]
+
+
+@pytest.fixture
+def ends_with_ab():
+    return NFA(
+        states={'q0', 'q1', 'q2'},
+        input_symbols={'a', 'b'},
+        transitions={
+            'q0': {'a': {'q0', 'q1'}, 'b': {'q0'}},
+            'q1': {'b': {'q2'}},
+        },
+        initial_state='q0',
+        final_states={'q2'}
+    )
+
+
+def test_from_compiled_matches_nfa(ends_with_ab):
+    vectorized = VectorizedDFA.from_compiled(CompiledAutomaton.from_nfa(ends_with_ab))
+    result = vectorized.accepts_batch(WORDS)
+    assert list(result) == [ends_with_ab.accepts_input(word) for word in WORDS]
+
+
+def test_from_dfa_matches_dfa(ends_with_ab):
+    dfa = DFA.from_nfa(ends_with_ab)
+    vectorized = VectorizedDFA.from_dfa(dfa)
+    assert vectorized.matrix.dtype.name == "int32"
+    assert vectorized.matrix.shape == (len(dfa.states) + 1, len(dfa.input_symbols) + 1)
+    assert list(vectorized.accepts_batch(WORDS)) == [dfa.accepts_input(word) for word in WORDS]
+
+
+def test_equal_length_bucket(ends_with_ab):
+    vectorized = VectorizedDFA.from_compiled(CompiledAutomaton.from_nfa(ends_with_ab))
+    assert vectorized.accepts("bab")
+    assert not vectorized.accepts("bba")
+    assert len(vectorized.run_equal_length(["ab", "ba", "bb"])) == 3
+
+
+def test_state_limit():
+    n = 12
+    # Классический пример экспоненциального роста: n-й символ с конца равен 'a'
+    transitions = {"s": {"a": {"s", "p0"}, "b": {"s"}}}
+    transitions.update({f"p{i}": {"a": {f"p{i + 1}"}, "b": {f"p{i + 1}"}} for i in range(n)})
+    compiled = CompiledAutomaton(transitions, start_states={"s"}, final_states={f"p{n}"})
+    with pytest.raises(ValueError):
+        VectorizedDFA.from_compiled(compiled, max_states=100)
+
+
+def test_multichar_symbols_rejected():
+    compiled = CompiledAutomaton({"s": {"ab": {"t"}}}, start_states={"s"}, final_states={"t"})
+    with pytest.raises(ValueError, match="ab"):
+        VectorizedDFA.from_compiled(compiled)